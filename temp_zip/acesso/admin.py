@@ -1,14 +1,85 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.template.response import TemplateResponse
+from .gestao import conceder_modulos, revogar_modulos
 from .models import Modulo, PermissaoModulo
 
+class BancoPrincipalAdmin(admin.ModelAdmin):
+    """
+    Admin que sempre lê do banco principal, mesmo com a réplica local de acesso ativada
+    (a réplica pode estar defasada e não contém a tabela de usuários).
+    """
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(DEFAULT_DB_ALIAS)
+
 @admin.register(Modulo)
-class ModuloAdmin(admin.ModelAdmin):
+class ModuloAdmin(BancoPrincipalAdmin):
     list_display = ('nome', 'descricao')
     search_fields = ('nome',)
 
 @admin.register(PermissaoModulo)
-class PermissaoModuloAdmin(admin.ModelAdmin):
+class PermissaoModuloAdmin(BancoPrincipalAdmin):
     list_display = ('usuario', 'modulo')
     list_filter = ('modulo',)
     search_fields = ('usuario__username', 'modulo__nome')
     raw_id_fields = ('usuario', 'modulo')
+
+
+class SelecionarModulosForm(forms.Form):
+    modulos = forms.ModelMultipleChoiceField(
+        queryset=Modulo.objects.using(DEFAULT_DB_ALIAS).order_by('nome'),
+        widget=forms.CheckboxSelectMultiple,
+        label='Módulos',
+    )
+
+def _acao_modulos(modeladmin, request, queryset, operacao, titulo, mensagem):
+    """
+    Ação em massa com página intermediária para escolher os módulos.
+    
+    Na primeira chamada exibe o formulário; ao confirmar, aplica a operação
+    (conceder/revogar) a todos os usuários selecionados de uma vez.
+    """
+    if 'aplicar' in request.POST:
+        form = SelecionarModulosForm(request.POST)
+        if form.is_valid():
+            total = operacao(
+                queryset.values_list('id', flat=True),
+                [modulo.id for modulo in form.cleaned_data['modulos']],
+            )
+            modeladmin.message_user(request, mensagem.format(total=total, usuarios=queryset.count()), messages.SUCCESS)
+            return None
+    else:
+        form = SelecionarModulosForm()
+    return TemplateResponse(request, 'admin/acesso/selecionar_modulos.html', {
+        **modeladmin.admin_site.each_context(request),
+        'title': titulo,
+        'form': form,
+        'usuarios': queryset,
+        'acao': request.POST['action'],
+        'opts': modeladmin.model._meta,
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    })
+
+@admin.action(description='Conceder módulos aos usuários selecionados')
+def conceder_modulos_acao(modeladmin, request, queryset):
+    return _acao_modulos(
+        modeladmin, request, queryset, conceder_modulos,
+        'Conceder módulos', '{total} permissões garantidas para {usuarios} usuários.',
+    )
+
+@admin.action(description='Revogar módulos dos usuários selecionados')
+def revogar_modulos_acao(modeladmin, request, queryset):
+    return _acao_modulos(
+        modeladmin, request, queryset, revogar_modulos,
+        'Revogar módulos', '{total} permissões removidas de {usuarios} usuários.',
+    )
+
+admin.site.unregister(User)
+
+@admin.register(User)
+class UsuarioAdmin(UserAdmin):
+    actions = [conceder_modulos_acao, revogar_modulos_acao]
@@ -4,3 +4,7 @@ class AcessoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'acesso'
     verbose_name = 'Controle de Acesso'
+
+    def ready(self):
+        # Conecta os sinais de invalidação do cache de permissões
+        from . import signals  # noqa: F401
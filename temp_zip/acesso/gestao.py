@@ -0,0 +1,89 @@
+"""
+Operações em massa sobre módulos e permissões.
+
+Usadas pelo comando de gerenciamento permissoes_modulos, pelas ações do admin
+e pelos scripts populate_modules*. Cada operação executa um número fixo de
+consultas, independente da quantidade de usuários e módulos envolvidos.
+
+As leituras e exclusões usam sempre o banco principal: com a réplica local
+ativa (acesso/replica.py), o roteador enviaria as consultas do app acesso para
+a cópia SQLite, que pode estar desatualizada e não tem a tabela de usuários.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Modulo, PermissaoModulo
+from .utils import invalidar_permissoes
+
+TAMANHO_LOTE = 1000
+
+
+def cadastrar_modulos(modulos):
+    """
+    Cadastra ou atualiza (upsert) o catálogo de módulos em uma única operação.
+
+    Args:
+        modulos: Lista de dicionários com 'nome' e, opcionalmente, 'descricao'
+
+    Returns:
+        Lista com os nomes dos módulos que ainda não existiam
+    """
+    nomes = [modulo['nome'] for modulo in modulos]
+    existentes = set(Modulo.objects.using(DEFAULT_DB_ALIAS).filter(nome__in=nomes).values_list('nome', flat=True))
+    Modulo.objects.bulk_create(
+        [Modulo(nome=modulo['nome'], descricao=modulo.get('descricao', '')) for modulo in modulos],
+        update_conflicts=True,
+        unique_fields=['nome'],
+        update_fields=['descricao'],
+        batch_size=TAMANHO_LOTE,
+    )
+    # bulk_create não envia sinais
+    invalidar_permissoes()
+    return [nome for nome in nomes if nome not in existentes]
+
+
+def conceder_modulos(usuario_ids, modulo_ids):
+    """
+    Concede os módulos a todos os usuários informados (permissões já existentes são ignoradas).
+
+    Args:
+        usuario_ids: IDs dos usuários
+        modulo_ids: IDs dos módulos
+
+    Returns:
+        Número de pares usuário-módulo solicitados
+    """
+    usuario_ids = set(usuario_ids)
+    modulo_ids = set(modulo_ids)
+    permissoes = [
+        PermissaoModulo(usuario_id=usuario_id, modulo_id=modulo_id)
+        for usuario_id in usuario_ids
+        for modulo_id in modulo_ids
+    ]
+    with transaction.atomic():
+        PermissaoModulo.objects.bulk_create(permissoes, ignore_conflicts=True, batch_size=TAMANHO_LOTE)
+    # bulk_create não envia sinais
+    invalidar_permissoes(usuario_ids)
+    return len(permissoes)
+
+
+def revogar_modulos(usuario_ids, modulo_ids):
+    """
+    Revoga os módulos de todos os usuários informados (no banco principal).
+
+    Args:
+        usuario_ids: IDs dos usuários
+        modulo_ids: IDs dos módulos
+
+    Returns:
+        Número de permissões removidas
+    """
+    usuario_ids = set(usuario_ids)
+    permissoes = PermissaoModulo.objects.using(DEFAULT_DB_ALIAS).filter(
+        usuario_id__in=usuario_ids, modulo_id__in=set(modulo_ids)
+    )
+    # Um único DELETE filtrado: QuerySet.delete() buscaria as permissões e enviaria um
+    # post_delete por objeto (ver acesso/signals.py); PermissaoModulo não tem
+    # dependentes, e a invalidação dos snapshots é feita uma vez, logo abaixo
+    removidas = permissoes._raw_delete(DEFAULT_DB_ALIAS)
+    invalidar_permissoes(usuario_ids)
+    return removidas
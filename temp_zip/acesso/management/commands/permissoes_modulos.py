@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from acesso.gestao import conceder_modulos, revogar_modulos
+from acesso.models import Modulo
+
+
+class Command(BaseCommand):
+    help = (
+        "Concede ou revoga módulos para vários usuários de uma vez. "
+        "Ex: python manage.py permissoes_modulos conceder --usuarios ana joao --modulos 'Menu Principal'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('acao', choices=['conceder', 'revogar'])
+        usuarios = parser.add_mutually_exclusive_group(required=True)
+        usuarios.add_argument('--usuarios', nargs='+', metavar='USERNAME', help="Nomes de usuário")
+        usuarios.add_argument('--arquivo-usuarios', metavar='ARQUIVO', help="Arquivo com um nome de usuário por linha")
+        usuarios.add_argument('--todos-usuarios', action='store_true', help="Todos os usuários ativos")
+        modulos = parser.add_mutually_exclusive_group(required=True)
+        modulos.add_argument('--modulos', nargs='+', metavar='NOME', help="Nomes dos módulos")
+        modulos.add_argument('--todos-modulos', action='store_true', help="Todos os módulos cadastrados")
+
+    def handle(self, *args, **options):
+        if options['todos_usuarios']:
+            usuario_ids = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+        else:
+            if options['arquivo_usuarios']:
+                with open(options['arquivo_usuarios'], encoding='utf-8') as arquivo:
+                    nomes = [linha.strip() for linha in arquivo if linha.strip()]
+            else:
+                nomes = options['usuarios']
+            usuario_ids = self._ids_por_nome(User.objects.all(), 'username', nomes, "Usuários não encontrados")
+
+        if options['todos_modulos']:
+            modulo_ids = list(Modulo.objects.using(DEFAULT_DB_ALIAS).values_list('id', flat=True))
+        else:
+            # Módulos lidos do banco principal, e não da réplica local (ver acesso/gestao.py)
+            modulo_ids = self._ids_por_nome(Modulo.objects.using(DEFAULT_DB_ALIAS), 'nome', options['modulos'], "Módulos não encontrados")
+
+        if options['acao'] == 'conceder':
+            total = conceder_modulos(usuario_ids, modulo_ids)
+            self.stdout.write(self.style.SUCCESS(
+                f"{total} permissões garantidas ({len(usuario_ids)} usuários x {len(modulo_ids)} módulos)."
+            ))
+        else:
+            total = revogar_modulos(usuario_ids, modulo_ids)
+            self.stdout.write(self.style.SUCCESS(f"{total} permissões removidas."))
+
+    def _ids_por_nome(self, queryset, campo, nomes, mensagem_erro):
+        """
+        Busca os IDs dos objetos pelo nome em uma única consulta; nomes inexistentes geram erro.
+        """
+        ids = dict(queryset.filter(**{f'{campo}__in': nomes}).values_list(campo, 'id'))
+        faltando = sorted(set(nomes) - set(ids))
+        if faltando:
+            raise CommandError(f"{mensagem_erro}: {', '.join(faltando)}")
+        return list(ids.values())
@@ -27,5 +27,13 @@ class PermissaoModulo(models.Model):
         verbose_name = "Permissão de Módulo"
         verbose_name_plural = "Permissões de Módulos"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Usuário gravado no banco: se a permissão for transferida para outro usuário,
+        # o snapshot de permissões do anterior também precisa ser invalidado
+        instancia._usuario_id_original = instancia.__dict__.get('usuario_id')
+        return instancia
+
     def __str__(self):
         return f"{self.usuario.username} pode acessar {self.modulo.nome}"
@@ -0,0 +1,125 @@
+"""
+Réplica local (SQLite) das tabelas de controle de acesso.
+
+As verificações de permissão só leem as tabelas acesso_modulo e
+acesso_permissaomodulo, que são pequenas e mudam raramente. Com a réplica
+ativada (settings.ACESSO_REPLICA), essas tabelas são copiadas do banco
+principal para um arquivo SQLite local na primeira leitura (cold start) e
+novamente a cada ACESSO_REPLICA_INTERVALO segundos, e o roteador envia para
+ela as leituras do app acesso. As gravações continuam indo para o banco principal.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Modulo, PermissaoModulo
+
+ALIAS_REPLICA = 'acesso_replica'
+
+_lock = threading.Lock()
+_ultima_sincronizacao = None # time.monotonic() da última sincronização bem-sucedida
+_desatualizada = False
+
+
+def sincronizar_replica():
+    """
+    Copia as tabelas de módulos e permissões do banco principal para a réplica.
+
+    As tabelas da réplica são recriadas e preenchidas numa única transação,
+    de modo que leitores (inclusive de outros processos) veem a cópia anterior
+    ou a nova, nunca uma cópia parcial. São 2 consultas ao banco principal.
+    """
+    global _ultima_sincronizacao, _desatualizada
+    modulos = [
+        Modulo(id=id_modulo, nome=nome, descricao=descricao)
+        for id_modulo, nome, descricao in Modulo.objects.using(DEFAULT_DB_ALIAS).values_list('id', 'nome', 'descricao')
+    ]
+    permissoes = [
+        PermissaoModulo(id=id_permissao, usuario_id=usuario_id, modulo_id=modulo_id)
+        for id_permissao, usuario_id, modulo_id in PermissaoModulo.objects.using(DEFAULT_DB_ALIAS).values_list('id', 'usuario_id', 'modulo_id')
+    ]
+
+    conexao = connections[ALIAS_REPLICA]
+    # A tabela de usuários não é replicada: a chave estrangeira de PermissaoModulo
+    # para auth_user não pode ser verificada na réplica
+    with conexao.constraint_checks_disabled():
+        with transaction.atomic(using=ALIAS_REPLICA):
+            existentes = set(conexao.introspection.table_names())
+            with conexao.schema_editor(atomic=False) as editor:
+                for modelo in (PermissaoModulo, Modulo):
+                    if modelo._meta.db_table in existentes:
+                        editor.delete_model(modelo)
+                for modelo in (Modulo, PermissaoModulo):
+                    editor.create_model(modelo)
+            Modulo.objects.using(ALIAS_REPLICA).bulk_create(modulos)
+            PermissaoModulo.objects.using(ALIAS_REPLICA).bulk_create(permissoes)
+
+    _ultima_sincronizacao = time.monotonic()
+    _desatualizada = False
+
+
+def marcar_replica_desatualizada():
+    """
+    Faz com que a próxima leitura sincronize a réplica (chamada quando este processo grava permissões).
+    """
+    global _desatualizada
+    _desatualizada = True
+
+
+def replica_disponivel():
+    """
+    Indica se as leituras podem usar a réplica, sincronizando-a se necessário.
+
+    Se uma nova sincronização falhar, a cópia anterior continua sendo usada até
+    a próxima tentativa; se nunca houve sincronização, as leituras vão para o
+    banco principal.
+    """
+    global _ultima_sincronizacao
+    intervalo = getattr(settings, 'ACESSO_REPLICA_INTERVALO', 300)
+    if (_ultima_sincronizacao is not None and not _desatualizada
+            and time.monotonic() - _ultima_sincronizacao < intervalo):
+        return True
+    with _lock:
+        # Outra thread pode ter sincronizado enquanto esta aguardava
+        if (_ultima_sincronizacao is None or _desatualizada
+                or time.monotonic() - _ultima_sincronizacao >= intervalo):
+            try:
+                sincronizar_replica()
+            except Exception:
+                if _ultima_sincronizacao is None:
+                    return False
+                # Tenta de novo no próximo intervalo
+                _ultima_sincronizacao = time.monotonic()
+    return True
+
+
+class RoteadorReplicaAcesso:
+    """
+    Roteador que envia as leituras do app acesso para a réplica local.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'acesso':
+            return ALIAS_REPLICA if replica_disponivel() else DEFAULT_DB_ALIAS
+        # Objetos relacionados (ex: o usuário de uma permissão lida da réplica) vêm do banco principal
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db == ALIAS_REPLICA:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Objetos da réplica são cópias dos do banco principal
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, ALIAS_REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As tabelas da réplica são criadas pela sincronização
+        if db == ALIAS_REPLICA:
+            return False
+        return None
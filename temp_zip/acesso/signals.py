@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Modulo, PermissaoModulo
+from .utils import invalidar_permissoes
+
+# Com receptores de post_delete conectados, o Django não usa a exclusão rápida
+# em QuerySet.delete(): as exclusões em massa do admin (e as em cascata a partir
+# de Modulo ou User) também enviam um sinal por objeto.
+
+@receiver([post_save, post_delete], sender=PermissaoModulo)
+def permissao_alterada(sender, instance, **kwargs):
+    """
+    Invalida o snapshot de permissões do usuário da permissão alterada e, se ela
+    foi transferida para outro usuário, também o do usuário anterior.
+    """
+    usuario_ids = {instance.usuario_id, getattr(instance, '_usuario_id_original', None)} - {None}
+    invalidar_permissoes(usuario_ids)
+    instance._usuario_id_original = instance.usuario_id
+
+@receiver([post_save, post_delete], sender=Modulo)
+def modulo_alterado(sender, instance, **kwargs):
+    """
+    Invalida os snapshots de todos os usuários (ex: módulo renomeado ou excluído).
+    """
+    invalidar_permissoes()
@@ -1,5 +1,5 @@
 from django import template
-from acesso.models import PermissaoModulo, Modulo
+from acesso.utils import usuario_tem_acesso
 
 register = template.Library()
 
@@ -15,12 +15,5 @@ def has_access(context, nome_modulo):
     if not user.is_authenticated:
         return False
     
-    if user.is_superuser:
-        return True
-        
-    try:
-        modulo = Modulo.objects.get(nome=nome_modulo)
-        return PermissaoModulo.objects.filter(usuario=user, modulo=modulo).exists()
-    except Modulo.DoesNotExist:
-        # Se o módulo não estiver cadastrado, por padrão, nega o acesso.
-        return False
+    # Módulos não cadastrados não aparecem nas permissões: por padrão, o acesso é negado.
+    return usuario_tem_acesso(user, nome_modulo)
@@ -0,0 +1,157 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, TestCase
+
+from .gestao import cadastrar_modulos, conceder_modulos, revogar_modulos
+from .models import Modulo, PermissaoModulo
+from .replica import ALIAS_REPLICA, RoteadorReplicaAcesso
+from .utils import _cache, _versoes, modulos_do_usuario
+
+
+class CachePermissoesTests(TestCase):
+    """
+    Snapshots de permissões no cache, invalidados pelos sinais de PermissaoModulo e Modulo.
+    """
+
+    def setUp(self):
+        _cache().clear()
+        self.usuario = User.objects.create_user('operador')
+        self.consumo = Modulo.objects.create(nome='Gerar Tabela de Consumo')
+        self.teste = Modulo.objects.create(nome='Teste de Bombeamento')
+        PermissaoModulo.objects.create(usuario=self.usuario, modulo=self.consumo)
+
+    def modulos(self):
+        # Um novo objeto de usuário por chamada, como em cada requisição
+        return modulos_do_usuario(User.objects.get(pk=self.usuario.pk))
+
+    def test_snapshot_reaproveitado_entre_requisicoes(self):
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo'})
+        usuario = User.objects.get(pk=self.usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(modulos_do_usuario(usuario), {'Gerar Tabela de Consumo'})
+
+    def test_conceder_permissao_altera_versao_do_usuario(self):
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo'})
+        versao_global, versao_usuario = _versoes(self.usuario.pk)
+        PermissaoModulo.objects.create(usuario=self.usuario, modulo=self.teste)
+        self.assertEqual(_versoes(self.usuario.pk)[0], versao_global)
+        self.assertNotEqual(_versoes(self.usuario.pk)[1], versao_usuario)
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo', 'Teste de Bombeamento'})
+
+    def test_revogar_permissao_altera_versao_do_usuario(self):
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo'})
+        _, versao_usuario = _versoes(self.usuario.pk)
+        PermissaoModulo.objects.filter(usuario=self.usuario).delete()
+        self.assertNotEqual(_versoes(self.usuario.pk)[1], versao_usuario)
+        self.assertEqual(self.modulos(), frozenset())
+
+    def test_alterar_modulo_altera_versao_global(self):
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo'})
+        versao_global, _ = _versoes(self.usuario.pk)
+        self.consumo.nome = 'Consumo'
+        self.consumo.save()
+        self.assertNotEqual(_versoes(self.usuario.pk)[0], versao_global)
+        self.assertEqual(self.modulos(), {'Consumo'})
+
+    def test_transferir_permissao_invalida_o_usuario_anterior(self):
+        outro = User.objects.create_user('outro')
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo'})
+        self.assertEqual(modulos_do_usuario(User.objects.get(pk=outro.pk)), frozenset())
+        permissao = PermissaoModulo.objects.get(usuario=self.usuario)
+        permissao.usuario = outro
+        permissao.save()
+        self.assertEqual(self.modulos(), frozenset())
+        self.assertEqual(modulos_do_usuario(User.objects.get(pk=outro.pk)), {'Gerar Tabela de Consumo'})
+
+    def test_permissoes_de_outro_usuario_nao_invalidam(self):
+        self.assertEqual(self.modulos(), {'Gerar Tabela de Consumo'})
+        _, versao_usuario = _versoes(self.usuario.pk)
+        outro = User.objects.create_user('outro')
+        PermissaoModulo.objects.create(usuario=outro, modulo=self.teste)
+        self.assertEqual(_versoes(self.usuario.pk)[1], versao_usuario)
+
+
+class RoteadorReplicaTests(SimpleTestCase):
+    """
+    Roteamento das leituras do app acesso para a réplica local e das gravações para o banco principal.
+    """
+
+    def setUp(self):
+        self.roteador = RoteadorReplicaAcesso()
+
+    @mock.patch('acesso.replica.replica_disponivel', return_value=True)
+    def test_leituras_do_app_acesso_vao_para_a_replica(self, _):
+        self.assertEqual(self.roteador.db_for_read(Modulo), ALIAS_REPLICA)
+        self.assertEqual(self.roteador.db_for_read(PermissaoModulo), ALIAS_REPLICA)
+
+    @mock.patch('acesso.replica.replica_disponivel', return_value=False)
+    def test_sem_replica_as_leituras_vao_para_o_banco_principal(self, _):
+        self.assertEqual(self.roteador.db_for_read(PermissaoModulo), DEFAULT_DB_ALIAS)
+
+    @mock.patch('acesso.replica.replica_disponivel', return_value=True)
+    def test_gravacoes_vao_para_o_banco_principal(self, _):
+        self.assertEqual(self.roteador.db_for_write(Modulo), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.roteador.db_for_write(PermissaoModulo), DEFAULT_DB_ALIAS)
+
+    def test_outros_apps_nao_sao_roteados(self):
+        self.assertIsNone(self.roteador.db_for_read(User))
+        # O usuário de uma permissão lida da réplica vem do banco principal
+        permissao = PermissaoModulo()
+        permissao._state.db = ALIAS_REPLICA
+        self.assertEqual(self.roteador.db_for_read(User, instance=permissao), DEFAULT_DB_ALIAS)
+
+    def test_migracoes_nao_rodam_na_replica(self):
+        self.assertFalse(self.roteador.allow_migrate(ALIAS_REPLICA, 'acesso'))
+        self.assertIsNone(self.roteador.allow_migrate(DEFAULT_DB_ALIAS, 'acesso'))
+
+
+class GestaoPermissoesTests(TestCase):
+    """
+    Operações em massa sobre módulos e permissões (acesso/gestao.py).
+    """
+
+    def setUp(self):
+        _cache().clear()
+        self.usuarios = [User.objects.create_user(f'usuario{i}') for i in range(3)]
+        cadastrar_modulos([{'nome': 'Gerar Tabela de Consumo'}, {'nome': 'Teste de Bombeamento'}])
+        self.modulo_ids = list(Modulo.objects.values_list('id', flat=True))
+
+    def test_cadastrar_modulos_retorna_apenas_os_novos(self):
+        novos = cadastrar_modulos([{'nome': 'Teste de Bombeamento', 'descricao': 'Testes'}, {'nome': 'Menu Principal'}])
+        self.assertEqual(novos, ['Menu Principal'])
+        self.assertEqual(Modulo.objects.get(nome='Teste de Bombeamento').descricao, 'Testes')
+
+    def test_conceder_e_revogar_atualizam_o_cache(self):
+        usuario_ids = [usuario.pk for usuario in self.usuarios]
+        self.assertEqual(modulos_do_usuario(User.objects.get(pk=usuario_ids[0])), frozenset())
+        conceder_modulos(usuario_ids, self.modulo_ids)
+        self.assertEqual(PermissaoModulo.objects.count(), 6)
+        self.assertEqual(len(modulos_do_usuario(User.objects.get(pk=usuario_ids[0]))), 2)
+
+        self.assertEqual(revogar_modulos(usuario_ids[:2], self.modulo_ids[:1]), 2)
+        self.assertEqual(PermissaoModulo.objects.count(), 4)
+        self.assertEqual(len(modulos_do_usuario(User.objects.get(pk=usuario_ids[0]))), 1)
+        self.assertEqual(len(modulos_do_usuario(User.objects.get(pk=usuario_ids[2]))), 2)
+
+    def test_operacoes_em_massa_com_numero_fixo_de_consultas(self):
+        usuarios = [User(username=f'massa{i}') for i in range(150)]
+        User.objects.bulk_create(usuarios)
+        usuario_ids = list(User.objects.filter(username__startswith='massa').values_list('id', flat=True))
+        modulos = [{'nome': f'Módulo {i}'} for i in range(3)]
+        # SELECT dos existentes e INSERT ... ON CONFLICT
+        with self.assertNumQueries(2):
+            cadastrar_modulos(modulos)
+        modulo_ids = list(Modulo.objects.filter(nome__startswith='Módulo ').values_list('id', flat=True))
+        # 450 pares: um INSERT (dentro de um savepoint; o SQLite limita o lote a 999 parâmetros)
+        with self.assertNumQueries(3):
+            self.assertEqual(conceder_modulos(usuario_ids, modulo_ids), 450)
+        with mock.patch('acesso.gestao.invalidar_permissoes') as invalidar, \
+                mock.patch('acesso.signals.invalidar_permissoes') as invalidar_sinal:
+            # Um único DELETE filtrado, sem sinais por objeto
+            with self.assertNumQueries(1):
+                self.assertEqual(revogar_modulos(usuario_ids, modulo_ids), 450)
+        invalidar.assert_called_once_with(set(usuario_ids))
+        invalidar_sinal.assert_not_called()
+        self.assertFalse(PermissaoModulo.objects.filter(usuario_id__in=usuario_ids).exists())
@@ -1,7 +1,86 @@
+from django.conf import settings
+from django.core.cache import caches
 from django.shortcuts import redirect
 from django.urls import reverse
 from functools import wraps
+import secrets
 from .models import PermissaoModulo
+from .replica import marcar_replica_desatualizada
+
+# Chave da versão global (alterada quando o catálogo de módulos muda)
+_CHAVE_VERSAO_GLOBAL = 'acesso:versao'
+
+def _cache():
+    """
+    Retorna o cache do Django usado para as permissões (ACESSO_CACHE_ALIAS).
+    """
+    return caches[getattr(settings, 'ACESSO_CACHE_ALIAS', 'default')]
+
+def _chave_versao_usuario(usuario_id):
+    """
+    Retorna a chave da versão das permissões de um usuário.
+    """
+    return f'acesso:versao:{usuario_id}'
+
+def _versoes(usuario_id):
+    """
+    Retorna as versões (global, do usuário) das permissões, criando as que não existirem.
+    
+    As versões são tokens aleatórios, e não contadores: se uma versão for removida
+    do cache, a nova nunca coincide com a de um snapshot antigo.
+    """
+    cache = _cache()
+    chaves = [_CHAVE_VERSAO_GLOBAL, _chave_versao_usuario(usuario_id)]
+    versoes = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in versoes:
+            cache.add(chave, secrets.token_hex(8), None)
+            versoes[chave] = cache.get(chave)
+    return versoes[chaves[0]], versoes[chaves[1]]
+
+def invalidar_permissoes(usuario_ids=None):
+    """
+    Invalida os snapshots de permissões guardados no cache (e a réplica local, se houver).
+    
+    Chamada pelos sinais de PermissaoModulo/Modulo; operações em massa que não
+    enviam sinais (bulk_create, update) devem chamá-la explicitamente.
+    
+    Args:
+        usuario_ids: IDs dos usuários afetados; None invalida todos os usuários
+    """
+    marcar_replica_desatualizada()
+    cache = _cache()
+    if usuario_ids is None:
+        cache.set(_CHAVE_VERSAO_GLOBAL, secrets.token_hex(8), None)
+    else:
+        cache.set_many({_chave_versao_usuario(usuario_id): secrets.token_hex(8) for usuario_id in set(usuario_ids)}, None)
+
+def modulos_do_usuario(user):
+    """
+    Retorna o conjunto com os nomes dos módulos que o usuário pode acessar.
+    
+    As permissões são carregadas com uma única consulta e guardadas no cache do
+    Django como um snapshot versionado por usuário (ver invalidar_permissoes),
+    por no máximo ACESSO_CACHE_TTL segundos. Durante a requisição o conjunto
+    também fica memorizado no objeto do usuário, de modo que o decorator e a tag
+    has_access não repetem consultas na mesma página.
+    
+    Com o cache local em memória (padrão), a invalidação por sinais só alcança
+    o processo onde a alteração foi feita; nos demais, o TTL limita o atraso.
+    """
+    modulos = getattr(user, '_modulos_acesso', None)
+    if modulos is None:
+        cache = _cache()
+        versao_global, versao_usuario = _versoes(user.pk)
+        chave = f'acesso:modulos:{user.pk}:{versao_global}:{versao_usuario}'
+        modulos = cache.get(chave)
+        if modulos is None:
+            modulos = frozenset(
+                PermissaoModulo.objects.filter(usuario=user).values_list('modulo__nome', flat=True)
+            )
+            cache.set(chave, modulos, getattr(settings, 'ACESSO_CACHE_TTL', 300))
+        user._modulos_acesso = modulos
+    return modulos
 
 def usuario_tem_acesso(user, nome_modulo):
     """
@@ -9,7 +88,7 @@ def usuario_tem_acesso(user, nome_modulo):
     """
     if user.is_superuser:
         return True
-    return PermissaoModulo.objects.filter(usuario=user, modulo__nome=nome_modulo).exists()
+    return nome_modulo in modulos_do_usuario(user)
 
 def acesso_requerido(nome_modulo, redirect_url='menu_principal'):
     """
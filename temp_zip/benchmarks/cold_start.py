@@ -0,0 +1,220 @@
+"""
+Benchmark de cold start da aplicação.
+
+Para cada URL de pocos_app/urls.py inicia um interpretador novo, importa
+pocos_project.wsgi.application e faz a primeira requisição pelo test client
+do Django. Registra o tempo de boot e da primeira requisição, o tempo de
+importação por pacote de primeiro nível (-X importtime) e o pico de memória
+(RSS), e emite JSON para acompanhar regressões entre versões.
+
+Uso (a partir do diretório do projeto):
+    python benchmarks/cold_start.py --usuario admin --saida cold_start.json
+    python benchmarks/cold_start.py --settings settings_local --pythonpath /caminho --repeticoes 5
+
+Sem --usuario as requisições são anônimas (mede o redirecionamento para o login).
+As URLs de exportação recebem na sessão parâmetros de exemplo, como após uma geração.
+O -X importtime acrescenta um pequeno custo aos tempos medidos; use --sem-importtime
+para medir apenas os tempos.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from importtime import DIRETORIO_PROJETO, agrupar_por_pacote, ambiente, interpretar_importtime
+
+# Dados de exemplo enviados às views de processamento e guardados na sessão para as exportações
+PARAMETROS_CONSUMO = {
+    "data_inicio": "2024-01-01", "data_fim": "2024-12-31",
+    "horimetro_inicial": "0", "horimetro_final": "2000",
+    "hidrometro_inicial": "0", "hidrometro_final": "14000",
+    "max_horimetro_diario": "12", "max_hidrometro_diario": "90",
+    "ne": "10", "nd": "20", "apresentar_niveis": "mensal",
+    "meses_selecionados": ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"],
+    "registrar_sabados": "on", "registrar_domingos": "on", "semente": "1",
+}
+PARAMETROS_TESTE = {
+    "bombeamento-data_inicio": "2025-01-01", "bombeamento-hora_inicial": "08:00",
+    "bombeamento-nivel_inicial": "10", "bombeamento-nivel_final": "30",
+    "bombeamento-vazao_inicial": "20", "bombeamento-vazao_final": "10",
+    "bombeamento-tempo_estabilizacao_min": "180", "bombeamento-tempo_total_horas": "24",
+    "bombeamento-semente": "1",
+    "recuperacao-data_inicio": "2025-01-02", "recuperacao-hora_inicial": "08:00",
+    "recuperacao-hora_final": "20:00", "recuperacao-tempo_estabilizacao_min": "120",
+    "recuperacao-num_leituras": "10",
+}
+
+# Sessão equivalente à deixada pelas views de processamento (parâmetros limpos, em JSON)
+SESSAO_CONSUMO = {"parametros": {
+    "data_inicio": "2024-01-01", "data_fim": "2024-12-31",
+    "horimetro_inicial": 0.0, "horimetro_final": 2000.0,
+    "hidrometro_inicial": 0.0, "hidrometro_final": 14000.0,
+    "max_horimetro_diario": 12.0, "max_hidrometro_diario": 90.0,
+    "ne": 10.0, "nd": 20.0, "apresentar_niveis": "mensal",
+    "meses_selecionados": ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"],
+    "registrar_sabados": True, "registrar_domingos": True, "semente": 1,
+}}
+SESSAO_TESTE = {
+    "params_bombeamento": {
+        "data_inicio": "2025-01-01", "hora_inicial": "08:00:00",
+        "nivel_inicial": 10.0, "nivel_final": 30.0, "vazao_inicial": 20.0, "vazao_final": 10.0,
+        "tempo_estabilizacao_min": 180, "tempo_total_horas": 24, "semente": 1,
+    },
+    "params_recuperacao": {
+        "data_inicio": "2025-01-02", "hora_inicial": "08:00:00", "hora_final": "20:00:00",
+        "tempo_estabilizacao_min": 120, "num_leituras": 10,
+    },
+}
+
+# Código executado em cada interpretador novo: argv = [url, usuario, dados da requisição em JSON]
+CODIGO_REQUISICAO = r'''
+import json, resource, sys, time
+inicio = time.perf_counter()
+from pocos_project.wsgi import application
+boot = time.perf_counter() - inicio
+
+from django.test import Client
+url, usuario, dados = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+cliente = Client(raise_request_exception=False)
+if usuario:
+    from django.contrib.auth.models import User
+    cliente.force_login(User.objects.get(username=usuario))
+    if dados["sessao"]:
+        sessao = cliente.session
+        sessao.update(dados["sessao"])
+        sessao.save()
+
+inicio = time.perf_counter()
+if dados["post"]:
+    resposta = cliente.post(url, dados["post"])
+else:
+    resposta = cliente.get(url)
+if resposta.streaming:
+    for _ in resposta.streaming_content:
+        pass
+requisicao = time.perf_counter() - inicio
+
+pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    pico /= 1024 # bytes no macOS, KB no Linux
+print(json.dumps({"status": resposta.status_code, "boot_s": boot, "requisicao_s": requisicao, "pico_rss_kb": pico}))
+'''
+
+# Lista as rotas de pocos_app/urls.py (executado em um interpretador à parte)
+CODIGO_ROTAS = r'''
+import json, django
+django.setup()
+from pocos_app.urls import urlpatterns
+print(json.dumps(["/" + str(padrao.pattern) for padrao in urlpatterns]))
+'''
+
+
+def dados_da_requisicao(url):
+    """
+    Retorna o corpo do POST e os dados de sessão de exemplo para a URL.
+    """
+    return {
+        "/gerar-tabela/process/": {"post": PARAMETROS_CONSUMO, "sessao": None},
+        "/exportar-xlsx/": {"post": None, "sessao": SESSAO_CONSUMO},
+        "/teste-bombeamento/process/": {"post": PARAMETROS_TESTE, "sessao": None},
+        "/teste-bombeamento/exportar-xlsx/": {"post": None, "sessao": SESSAO_TESTE},
+    }.get(url, {"post": None, "sessao": None})
+
+
+def listar_rotas(env):
+    """
+    Retorna as rotas de pocos_app/urls.py.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-c", CODIGO_ROTAS], cwd=DIRETORIO_PROJETO, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(resultado.stdout)
+
+
+def medir_url(url, usuario, env, importtime=True):
+    """
+    Mede o cold start e a primeira requisição de uma URL em um interpretador novo.
+
+    Returns:
+        Dicionário com status, tempos (ms), pico de RSS (MB) e tempo de importação por pacote
+
+    Raises:
+        RuntimeError: Se o interpretador medido terminar com erro
+    """
+    comando = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    comando += ["-c", CODIGO_REQUISICAO, url, usuario or "", json.dumps(dados_da_requisicao(url))]
+    resultado = subprocess.run(comando, cwd=DIRETORIO_PROJETO, env=env, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        erro = [linha for linha in resultado.stderr.splitlines() if not linha.startswith("import time:")]
+        raise RuntimeError(f"{url}:\n" + "\n".join(erro[-20:]))
+    medicao = json.loads(resultado.stdout.strip().splitlines()[-1])
+    pacotes = agrupar_por_pacote(interpretar_importtime(resultado.stderr)) if importtime else {}
+    return {
+        "status": medicao["status"],
+        "boot_ms": medicao["boot_s"] * 1000,
+        "requisicao_ms": medicao["requisicao_s"] * 1000,
+        "total_ms": (medicao["boot_s"] + medicao["requisicao_s"]) * 1000,
+        "pico_rss_mb": medicao["pico_rss_kb"] / 1024,
+        "importacoes_ms": {pacote: dados["tempo_ms"] for pacote, dados in pacotes.items()},
+    }
+
+
+def resumir(medicoes, limite_pacotes):
+    """
+    Combina as repetições de uma URL: mediana e mínimo dos tempos, máximo do RSS.
+    """
+    resumo = {"status": medicoes[-1]["status"], "repeticoes": len(medicoes)}
+    for campo in ("boot_ms", "requisicao_ms", "total_ms"):
+        valores = [medicao[campo] for medicao in medicoes]
+        resumo[campo] = {"mediana": round(statistics.median(valores), 3), "minimo": round(min(valores), 3)}
+    resumo["pico_rss_mb"] = round(max(medicao["pico_rss_mb"] for medicao in medicoes), 1)
+    pacotes = {}
+    for medicao in medicoes:
+        for pacote, tempo in medicao["importacoes_ms"].items():
+            pacotes.setdefault(pacote, []).append(tempo)
+    medianas = sorted(((pacote, statistics.median(tempos)) for pacote, tempos in pacotes.items()), key=lambda item: item[1], reverse=True)
+    resumo["importacoes_ms"] = {pacote: round(tempo, 3) for pacote, tempo in medianas[:limite_pacotes]}
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--settings", help="Módulo de settings do Django")
+    parser.add_argument("--pythonpath", help="Diretório adicional para o PYTHONPATH")
+    parser.add_argument("--usuario", help="Usuário existente usado no login (sem ele, requisições anônimas)")
+    parser.add_argument("--urls", nargs="+", help="URLs a medir (padrão: todas as de pocos_app/urls.py)")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Interpretadores novos por URL")
+    parser.add_argument("--pacotes", type=int, default=15, help="Número de pacotes no detalhamento das importações")
+    parser.add_argument("--sem-importtime", action="store_true", help="Não usa -X importtime")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    env = ambiente(args.settings, args.pythonpath)
+    urls = args.urls or listar_rotas(env)
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "settings": env["DJANGO_SETTINGS_MODULE"],
+        "usuario": args.usuario,
+        "urls": {},
+    }
+    for url in urls:
+        medicoes = [medir_url(url, args.usuario, env, not args.sem_importtime) for _ in range(args.repeticoes)]
+        resultado["urls"][url] = resumir(medicoes, args.pacotes)
+        print(f"{url}: {resultado['urls'][url]['total_ms']['mediana']:.0f} ms", file=sys.stderr)
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(saida)
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main()
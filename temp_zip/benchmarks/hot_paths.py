@@ -0,0 +1,231 @@
+"""
+Benchmarks das funções de geração e exportação.
+
+Mede tempo (mínimo e mediana de --repeticoes execuções) e pico de memória
+alocada (tracemalloc, numa execução à parte) de cada caso, variando o tamanho
+do período (1 mês a 30 anos), os filtros de meses e de fins de semana e o
+número de leituras dos testes de bombeamento/recuperação. Os resultados podem
+ser gravados como baseline e comparados com uma baseline anterior; casos mais
+lentos ou com mais memória que a tolerância são sinalizados (código de saída 1).
+
+Uso (a partir do diretório do projeto):
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --salvar-baseline /tmp/atual.json
+    python benchmarks/hot_paths.py --baseline /tmp/atual.json
+    python benchmarks/hot_paths.py --filtro exportar_para_xlsx --repeticoes 5
+
+Por padrão os resultados são comparados com benchmarks/baseline.json, medida
+na versão original do código (commit "baseline", antes da vetorização), com os
+mesmos casos: as chamadas com rng= foram feitas sem esse argumento, que não
+existia. Para acompanhar regressões a partir da versão atual, grave uma nova
+baseline com --salvar-baseline e passe-a em --baseline (--baseline "" desativa
+a comparação).
+
+As baselines dependem da máquina: compare apenas resultados do mesmo ambiente
+(a baseline versionada foi medida com Python 3.11, em Linux).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, time as hora
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pocos_app.utils import (  # noqa: E402
+    MESES_MAP, dias_do_periodo, distribuir_valores, exportar_para_xlsx,
+    gerar_datas_periodo, gerar_tabela_dados, mascara_consumo,
+)
+from pocos_app.utils_teste import (  # noqa: E402
+    gerar_teste_bombeamento, gerar_teste_recuperacao, gerar_teste_xlsx_file,
+)
+
+DATA_INICIO = date(2000, 1, 1)
+PERIODOS = {"1m": date(2000, 1, 31), "1a": date(2000, 12, 31), "10a": date(2009, 12, 31), "30a": date(2029, 12, 31)}
+MESES = {"todos": list(MESES_MAP), "seca": ["mai", "jun", "jul", "ago", "set"]}
+FINS_DE_SEMANA = {"com_fds": (True, True), "sem_fds": (False, False)}
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+HORAS_BOMBEAMENTO = [24, 72, 720]
+LEITURAS_RECUPERACAO = [10, 100, 1000]
+
+
+def parametros_consumo(periodo, meses, fins_de_semana):
+    """
+    Monta parâmetros válidos da tabela de consumo (médias de 8 h e 100 m³ por dia de consumo).
+    """
+    sabados, domingos = FINS_DE_SEMANA[fins_de_semana]
+    dias = dias_do_periodo(DATA_INICIO, PERIODOS[periodo])
+    dias_consumo = int(mascara_consumo(dias, MESES[meses], sabados, domingos).sum())
+    return {
+        "data_inicio": DATA_INICIO, "data_fim": PERIODOS[periodo],
+        "horimetro_inicial": 1000.0, "horimetro_final": 1000.0 + 8 * dias_consumo,
+        "hidrometro_inicial": 5000.0, "hidrometro_final": 5000.0 + 100 * dias_consumo,
+        "max_horimetro_diario": 20.0, "max_hidrometro_diario": 400.0,
+        "ne": 10.5, "nd": 40.25, "apresentar_niveis": "mensal",
+        "meses_selecionados": MESES[meses],
+        "registrar_sabados": sabados, "registrar_domingos": domingos,
+        "semente": 1,
+    }
+
+
+def parametros_bombeamento(horas):
+    """
+    Monta parâmetros do teste de bombeamento com a duração informada.
+    """
+    return {
+        "data_inicio": date(2025, 1, 1), "hora_inicial": hora(8, 0),
+        "nivel_inicial": 10.0, "nivel_final": 30.0, "vazao_inicial": 20.0, "vazao_final": 10.0,
+        "tempo_estabilizacao_min": 180, "tempo_total_horas": horas, "semente": 1,
+    }
+
+
+def parametros_recuperacao(leituras):
+    """
+    Monta parâmetros do teste de recuperação com o número de leituras informado.
+    """
+    return {
+        "data_inicio": date(2025, 1, 2), "hora_inicial": hora(8, 0), "hora_final": hora(20, 0),
+        "tempo_estabilizacao_min": 120, "num_leituras": leituras,
+    }
+
+
+def casos():
+    """
+    Gera os casos do benchmark como pares (nome, preparar).
+
+    preparar() é executada fora da medição e retorna a função medida (sem argumentos).
+    """
+    for periodo in PERIODOS:
+        for meses in MESES:
+            yield (f"gerar_datas_periodo[{periodo},{meses}]",
+                   lambda periodo=periodo, meses=meses: lambda: gerar_datas_periodo(DATA_INICIO, PERIODOS[periodo], MESES[meses]))
+
+    for num_valores in (31, 366, 3653, 10958):
+        yield (f"distribuir_valores[n={num_valores}]",
+               lambda n=num_valores: lambda: distribuir_valores(5.0 * n, n, 10.0, rng=1))
+
+    for periodo in PERIODOS:
+        for meses in MESES:
+            for fins_de_semana in FINS_DE_SEMANA:
+                yield (f"gerar_tabela_dados[{periodo},{meses},{fins_de_semana}]",
+                       lambda p=parametros_consumo(periodo, meses, fins_de_semana): lambda: gerar_tabela_dados(p))
+
+    for periodo in PERIODOS:
+        def preparar(periodo=periodo):
+            parametros = parametros_consumo(periodo, "todos", "com_fds")
+            df = gerar_tabela_dados(parametros)
+            return lambda: exportar_para_xlsx(df, parametros)
+        yield f"exportar_para_xlsx[{periodo}]", preparar
+
+    for horas in HORAS_BOMBEAMENTO:
+        yield (f"gerar_teste_bombeamento[{horas}h]",
+               lambda p=parametros_bombeamento(horas): lambda: gerar_teste_bombeamento(p))
+
+    for leituras in LEITURAS_RECUPERACAO:
+        yield (f"gerar_teste_recuperacao[leituras={leituras}]",
+               lambda p=parametros_recuperacao(leituras): lambda: gerar_teste_recuperacao(p, 30.0, 10.0, rng=1))
+
+    for horas in HORAS_BOMBEAMENTO:
+        for leituras in (LEITURAS_RECUPERACAO[0], LEITURAS_RECUPERACAO[-1]):
+            def preparar(horas=horas, leituras=leituras):
+                params_b = parametros_bombeamento(horas)
+                params_r = parametros_recuperacao(leituras)
+                df_b = gerar_teste_bombeamento(params_b)
+                df_r = gerar_teste_recuperacao(params_r, 30.0, 10.0, rng=1)
+                return lambda: gerar_teste_xlsx_file(df_b, df_r, params_b, params_r, 30.0, 10.0)
+            yield f"gerar_teste_xlsx_file[{horas}h,leituras={leituras}]", preparar
+
+
+def medir(funcao, repeticoes):
+    """
+    Mede o tempo de várias execuções e o pico de memória alocada numa execução extra.
+
+    Returns:
+        Dicionário {tempo_min_s, tempo_mediana_s, memoria_pico_kb}
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "tempo_min_s": min(tempos),
+        "tempo_mediana_s": statistics.median(tempos),
+        "memoria_pico_kb": pico / 1024,
+    }
+
+
+def comparar(resultado, base, tolerancia_tempo, tolerancia_memoria):
+    """
+    Compara um resultado com a baseline do mesmo caso.
+
+    Returns:
+        Lista de alertas (vazia se o caso estiver dentro das tolerâncias)
+    """
+    alertas = []
+    if resultado["tempo_min_s"] > base["tempo_min_s"] * (1 + tolerancia_tempo):
+        alertas.append(f"tempo {resultado['tempo_min_s'] / base['tempo_min_s']:.2f}x")
+    if resultado["memoria_pico_kb"] > base["memoria_pico_kb"] * (1 + tolerancia_memoria):
+        alertas.append(f"memória {resultado['memoria_pico_kb'] / base['memoria_pico_kb']:.2f}x")
+    return alertas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--filtro", action="append", help="Executa apenas os casos cujo nome contém o texto (pode repetir)")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO,
+                        help="Arquivo JSON de baseline para comparação (padrão: benchmarks/baseline.json)")
+    parser.add_argument("--salvar-baseline", help="Grava os resultados como baseline neste arquivo")
+    parser.add_argument("--tolerancia-tempo", type=float, default=0.25, help="Aumento de tempo tolerado (padrão: 25%%)")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.10, help="Aumento de memória tolerado (padrão: 10%%)")
+    parser.add_argument("--json", action="store_true", help="Emite os resultados em JSON")
+    args = parser.parse_args()
+
+    base = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)["casos"]
+
+    resultados = {}
+    regressoes = 0
+    if not args.json:
+        print(f"{'Caso':<58} {'Tempo mín (ms)':>15} {'Mediana (ms)':>13} {'Memória (KB)':>13}  Comparação")
+    for nome, preparar in casos():
+        if args.filtro and not any(filtro in nome for filtro in args.filtro):
+            continue
+        resultado = medir(preparar(), args.repeticoes)
+        resultados[nome] = resultado
+        comparacao = ""
+        if nome in base:
+            alertas = comparar(resultado, base[nome], args.tolerancia_tempo, args.tolerancia_memoria)
+            regressoes += bool(alertas)
+            comparacao = ("REGRESSÃO: " + ", ".join(alertas)) if alertas else f"ok ({resultado['tempo_min_s'] / base[nome]['tempo_min_s']:.2f}x)"
+        elif base:
+            comparacao = "sem baseline"
+        if not args.json:
+            print(f"{nome:<58} {1000 * resultado['tempo_min_s']:>15.2f} {1000 * resultado['tempo_mediana_s']:>13.2f} "
+                  f"{resultado['memoria_pico_kb']:>13.1f}  {comparacao}")
+
+    documento = {"repeticoes": args.repeticoes, "python": sys.version.split()[0], "casos": resultados}
+    if args.json:
+        print(json.dumps(documento, indent=2, ensure_ascii=False))
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+    if regressoes:
+        print(f"{regressoes} caso(s) acima da baseline.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Relatório de tempo de importação do projeto (python -X importtime).
+
+Inicia um interpretador novo, carrega a aplicação WSGI e resolve uma rota (por
+padrão o menu), e agrupa o tempo de importação por pacote de primeiro nível.
+Serve para conferir que o caminho do menu/login não carrega numpy, pandas e
+openpyxl, que só devem ser importados pelas views de geração e exportação.
+
+Uso (a partir do diretório do projeto):
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --cenario geracao --json
+    python benchmarks/importtime.py --settings settings_local --pythonpath /caminho/do/settings
+
+Sai com código 1 se algum pacote pesado for importado no cenário 'menu'.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+DIRETORIO_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PACOTES_PESADOS = ("numpy", "pandas", "openpyxl")
+
+# Código executado no interpretador medido, por cenário
+CENARIOS = {
+    # Cold start + página do menu (rota, view e template com as tags de acesso)
+    "menu": (
+        "import pocos_project.wsgi\n"
+        "from django.urls import resolve\n"
+        "from django.template.loader import get_template\n"
+        "resolve('/')\n"
+        "get_template('pocos_app/menu.html')\n"
+    ),
+    # Cold start + primeira geração/exportação (carrega os módulos de geração)
+    "geracao": (
+        "import pocos_project.wsgi\n"
+        "from django.urls import resolve\n"
+        "resolve('/gerar-tabela/process/')\n"
+        "import pocos_app.utils, pocos_app.utils_teste, pocos_app.armazenamento\n"
+    ),
+}
+
+_LINHA_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def ambiente(settings=None, pythonpath=None):
+    """
+    Monta as variáveis de ambiente do interpretador medido.
+
+    Args:
+        settings: Módulo de settings do Django (padrão: DJANGO_SETTINGS_MODULE ou pocos_project.settings)
+        pythonpath: Diretório adicional para o PYTHONPATH (ex: onde está o módulo de settings)
+    """
+    env = dict(os.environ)
+    env["DJANGO_SETTINGS_MODULE"] = settings or env.get("DJANGO_SETTINGS_MODULE", "pocos_project.settings")
+    caminhos = [DIRETORIO_PROJETO] + ([pythonpath] if pythonpath else [])
+    if env.get("PYTHONPATH"):
+        caminhos.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(caminhos)
+    return env
+
+
+def interpretar_importtime(saida):
+    """
+    Converte a saída de -X importtime em uma lista de importações.
+
+    Returns:
+        Lista de dicionários {modulo, nivel, proprio_us, acumulado_us}, na ordem da saída
+    """
+    importacoes = []
+    for linha in saida.splitlines():
+        correspondencia = _LINHA_IMPORTTIME.match(linha)
+        if correspondencia:
+            proprio, acumulado, recuo, modulo = correspondencia.groups()
+            importacoes.append({
+                "modulo": modulo,
+                "nivel": (len(recuo) - 1) // 2,
+                "proprio_us": int(proprio),
+                "acumulado_us": int(acumulado),
+            })
+    return importacoes
+
+
+def agrupar_por_pacote(importacoes):
+    """
+    Soma o tempo próprio de importação dos módulos de cada pacote de primeiro nível.
+
+    Returns:
+        Dicionário {pacote: {"modulos": n, "tempo_ms": t}}, do mais lento para o mais rápido
+    """
+    pacotes = {}
+    for importacao in importacoes:
+        pacote = importacao["modulo"].split(".")[0]
+        dados = pacotes.setdefault(pacote, {"modulos": 0, "tempo_ms": 0.0})
+        dados["modulos"] += 1
+        dados["tempo_ms"] += importacao["proprio_us"] / 1000
+    return dict(sorted(pacotes.items(), key=lambda item: item[1]["tempo_ms"], reverse=True))
+
+
+def medir_importacoes(codigo, settings=None, pythonpath=None):
+    """
+    Executa o código em um interpretador novo com -X importtime.
+
+    Returns:
+        Tupla (importacoes, pacotes), ver interpretar_importtime e agrupar_por_pacote
+
+    Raises:
+        RuntimeError: Se o interpretador medido terminar com erro
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=DIRETORIO_PROJETO, env=ambiente(settings, pythonpath),
+        capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        erro = [linha for linha in resultado.stderr.splitlines() if not linha.startswith("import time:")]
+        raise RuntimeError("\n".join(erro[-20:]))
+    importacoes = interpretar_importtime(resultado.stderr)
+    return importacoes, agrupar_por_pacote(importacoes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cenario", choices=sorted(CENARIOS), default="menu")
+    parser.add_argument("--settings", help="Módulo de settings do Django")
+    parser.add_argument("--pythonpath", help="Diretório adicional para o PYTHONPATH")
+    parser.add_argument("--limite", type=int, default=25, help="Número de pacotes exibidos na tabela")
+    parser.add_argument("--json", action="store_true", help="Emite o resultado em JSON")
+    args = parser.parse_args()
+
+    importacoes, pacotes = medir_importacoes(CENARIOS[args.cenario], args.settings, args.pythonpath)
+    pesados = [pacote for pacote in PACOTES_PESADOS if pacote in pacotes]
+    total_ms = sum(dados["tempo_ms"] for dados in pacotes.values())
+
+    if args.json:
+        print(json.dumps({
+            "cenario": args.cenario,
+            "total_ms": round(total_ms, 3),
+            "modulos": len(importacoes),
+            "pacotes": {pacote: {"modulos": dados["modulos"], "tempo_ms": round(dados["tempo_ms"], 3)} for pacote, dados in pacotes.items()},
+            "pacotes_pesados": pesados,
+        }, indent=2))
+    else:
+        print(f"Cenário: {args.cenario} - {len(importacoes)} módulos, {total_ms:.1f} ms de importação")
+        print(f"{'Pacote':<30} {'Módulos':>8} {'Tempo (ms)':>12} {'%':>6}")
+        for pacote, dados in list(pacotes.items())[:args.limite]:
+            print(f"{pacote:<30} {dados['modulos']:>8} {dados['tempo_ms']:>12.1f} {100 * dados['tempo_ms'] / total_ms:>6.1f}")
+        print(f"Pacotes pesados importados: {', '.join(pesados) if pesados else 'nenhum'}")
+
+    if args.cenario == "menu" and pesados:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
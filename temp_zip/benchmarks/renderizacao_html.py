@@ -0,0 +1,82 @@
+"""
+Benchmark do renderizador de tabelas HTML (pocos_app/renderizacao.py) contra DataFrame.to_html.
+
+Renderiza as tabelas completas de consumo (1 mês a 30 anos) e dos testes de
+bombeamento/recuperação com os dois métodos e compara o tempo (mínimo de
+--repeticoes execuções) e o tamanho do HTML gerado.
+
+Uso (a partir do diretório do projeto):
+    python benchmarks/renderizacao_html.py
+    python benchmarks/renderizacao_html.py --repeticoes 10 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hot_paths import PERIODOS, parametros_bombeamento, parametros_consumo, parametros_recuperacao  # noqa: E402
+from pocos_app.renderizacao import CASAS_CONSUMO, CASAS_TESTE, renderizar_tabela  # noqa: E402
+from pocos_app.utils import gerar_tabela_dados  # noqa: E402
+from pocos_app.utils_teste import gerar_teste_bombeamento, gerar_teste_recuperacao  # noqa: E402
+
+
+def tabelas():
+    """
+    Gera as tabelas do benchmark como tuplas (nome, DataFrame, casas decimais, classes).
+    """
+    for periodo in PERIODOS:
+        df = gerar_tabela_dados(parametros_consumo(periodo, "todos", "com_fds"))
+        yield f"consumo[{periodo}]", df, CASAS_CONSUMO, "table table-striped"
+    for horas in (24, 720):
+        yield (f"bombeamento[{horas}h]", gerar_teste_bombeamento(parametros_bombeamento(horas)),
+               CASAS_TESTE, "table table-striped table-hover text-center")
+    yield ("recuperacao[leituras=1000]", gerar_teste_recuperacao(parametros_recuperacao(1000), 30.0, 10.0, rng=1),
+           CASAS_TESTE, "table table-striped table-hover text-center")
+
+
+def tempo_minimo(funcao, repeticoes):
+    """
+    Retorna o menor tempo (s) de várias execuções e o resultado da última.
+    """
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Emite os resultados em JSON")
+    args = parser.parse_args()
+
+    resultados = {}
+    if not args.json:
+        print(f"{'Tabela':<28} {'Linhas':>7} {'to_html (ms)':>13} {'Novo (ms)':>10} {'Ganho':>7} "
+              f"{'to_html (KB)':>13} {'Novo (KB)':>10}")
+    for nome, df, casas, classes in tabelas():
+        tempo_pandas, html_pandas = tempo_minimo(lambda: df.to_html(classes=classes, index=False), args.repeticoes)
+        tempo_novo, html_novo = tempo_minimo(lambda: renderizar_tabela(df, casas, classes=classes), args.repeticoes)
+        resultados[nome] = {
+            "linhas": len(df),
+            "to_html_ms": round(tempo_pandas * 1000, 3),
+            "renderizador_ms": round(tempo_novo * 1000, 3),
+            "ganho": round(tempo_pandas / tempo_novo, 1),
+            "to_html_kb": round(len(html_pandas.encode("utf-8")) / 1024, 1),
+            "renderizador_kb": round(len(html_novo.encode("utf-8")) / 1024, 1),
+        }
+        if not args.json:
+            resultado = resultados[nome]
+            print(f"{nome:<28} {resultado['linhas']:>7} {resultado['to_html_ms']:>13.1f} {resultado['renderizador_ms']:>10.1f} "
+                  f"{resultado['ganho']:>6.1f}x {resultado['to_html_kb']:>13.1f} {resultado['renderizador_kb']:>10.1f}")
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
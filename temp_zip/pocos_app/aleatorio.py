@@ -0,0 +1,33 @@
+"""
+Geradores de números aleatórios por requisição.
+
+Cada geração usa o seu próprio numpy.random.Generator, criado a partir de uma
+semente registrada junto aos parâmetros. Assim requisições concorrentes não
+compartilham o estado global do numpy e qualquer tabela pode ser regenerada.
+"""
+import secrets
+
+import numpy as np
+
+
+def nova_semente():
+    """
+    Gera uma nova semente aleatória (inteiro de 32 bits, serializável em JSON).
+    """
+    return secrets.randbits(32)
+
+
+def obter_gerador(semente=None):
+    """
+    Retorna um numpy.random.Generator a partir de uma semente.
+
+    Args:
+        semente: None (semente imprevisível), inteiro ou um Generator já criado,
+            que é devolvido sem alteração
+
+    Returns:
+        numpy.random.Generator
+    """
+    if isinstance(semente, np.random.Generator):
+        return semente
+    return np.random.default_rng(semente)
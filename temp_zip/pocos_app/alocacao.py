@@ -0,0 +1,251 @@
+"""
+Alocação de totais em valores diários com limite máximo por dia.
+
+Os valores são obtidos projetando pesos aleatórios no conjunto
+{soma = total, 0 <= x <= limite} (simplex com limites superiores).
+"""
+import numpy as np
+
+from .aleatorio import obter_gerador
+
+
+def projetar_simplex_limitado(pesos, total, limites):
+    """
+    Projeta os pesos no conjunto {x : soma(x) = total, 0 <= x <= limites}.
+
+    A projeção euclidiana tem a forma x = clip(pesos - tau, 0, limites). A soma
+    de x em função de tau é linear por partes e não crescente, com pontos de
+    quebra em (pesos - limites) e pesos; ordenando esses pontos o nível tau é
+    obtido de forma fechada ("water-filling"), em O(n log n) e sem laços Python.
+
+    Args:
+        pesos: Array com os valores a projetar
+        total: Soma desejada
+        limites: Limite máximo por item (escalar ou array do mesmo tamanho de pesos)
+
+    Returns:
+        Array numpy float com os valores projetados
+
+    Raises:
+        ValueError: Se o total for negativo ou maior que a soma dos limites
+    """
+    pesos = np.asarray(pesos, dtype=float)
+    limites = np.broadcast_to(np.asarray(limites, dtype=float), pesos.shape)
+    soma_limites = float(np.sum(limites))
+    tolerancia = 1e-9 * max(1.0, abs(total), soma_limites)
+
+    if total < -tolerancia or total > soma_limites + tolerancia:
+        raise ValueError(
+            f"Impossível distribuir {total} em {pesos.size} valores com soma máxima de {soma_limites}."
+        )
+    if total >= soma_limites:
+        return limites.copy()
+    if total <= 0:
+        return np.zeros_like(pesos)
+
+    inferiores = np.sort(pesos - limites) # A partir daqui o valor deixa de estar no limite
+    superiores = np.sort(pesos) # A partir daqui o valor chega a zero
+    pontos = np.sort(np.concatenate((inferiores, superiores)))
+    somas = _soma_excedente(superiores, pontos) - _soma_excedente(inferiores, pontos)
+
+    # Primeiro ponto de quebra cuja soma já não excede o total; tau está no segmento anterior
+    j = min(max(int(np.searchsorted(-somas, -total, side="left")), 1), len(pontos) - 1)
+    inclinacao = somas[j - 1] - somas[j]
+    if inclinacao > 0:
+        tau = pontos[j - 1] + (somas[j - 1] - total) * (pontos[j] - pontos[j - 1]) / inclinacao
+    else:
+        tau = pontos[j]
+    valores = np.clip(pesos - tau, 0, limites)
+
+    # O resíduo de ponto flutuante vai para os valores que não estão em nenhum dos extremos
+    residuo = total - np.sum(valores)
+    livres = (valores > 0) & (valores < limites)
+    if residuo != 0 and livres.any():
+        valores[livres] = np.clip(valores[livres] + residuo / np.count_nonzero(livres), 0, limites[livres])
+    return valores
+
+
+def _soma_excedente(ordenados, pontos):
+    """
+    Calcula soma(max(ordenados - t, 0)) para cada t em pontos.
+
+    Args:
+        ordenados: Array em ordem crescente
+        pontos: Array com os valores de t
+    """
+    n = len(ordenados)
+    # cauda[k] = soma de ordenados[k:]
+    cauda = np.zeros(n + 1)
+    cauda[:n] = np.cumsum(ordenados[::-1])[::-1]
+    k = np.searchsorted(ordenados, pontos, side="right")
+    return cauda[k] - pontos * (n - k)
+
+
+def alocar_aleatorio(total, num_valores, limites, rng=None):
+    """
+    Distribui um total em valores aleatórios que respeitam os limites por item.
+
+    Args:
+        total: Valor total a ser distribuído
+        num_valores: Número de valores a gerar
+        limites: Limite máximo por item (escalar ou array com num_valores itens)
+        rng: Semente ou numpy.random.Generator (ver obter_gerador)
+
+    Returns:
+        Array numpy float que soma o total e respeita os limites
+    """
+    pesos = obter_gerador(rng).random(num_valores)
+    pesos = pesos / np.sum(pesos) * total
+    return projetar_simplex_limitado(pesos, total, limites)
+
+
+def alocar_tempo_e_volume_inteiros(total_horas, total_volume, num_valores, max_horas_diario, max_volume_diario, vazao_maxima, escala=1000, rng=None):
+    """
+    Distribui o tempo de captação e o volume de forma conjunta, em unidades inteiras (milésimos por padrão).
+
+    As horas são sorteadas primeiro; o volume é então alocado numa única
+    projeção com o limite por dia min(max_volume_diario, horas_i * vazao_maxima),
+    de modo que a vazão máxima é respeitada por construção, sem ajustes posteriores.
+    A projeção é feita na unidade 1/escala e convertida para int64 pelo método
+    do maior resto, de modo que as somas são exatas e os limites (máximos
+    diários e vazão máxima) valem para os valores arredondados.
+
+    Args:
+        total_horas: Tempo total a ser distribuído (diferença do horímetro)
+        total_volume: Volume total a ser distribuído (diferença do hidrômetro)
+        num_valores: Número de dias com consumo
+        max_horas_diario: Valor máximo diário do horímetro
+        max_volume_diario: Valor máximo diário do hidrômetro
+        vazao_maxima: Vazão máxima (volume por hora)
+        escala: Número de unidades inteiras por unidade real
+        rng: Semente ou numpy.random.Generator (ver obter_gerador)
+
+    Returns:
+        Tupla (horas, volumes) de arrays numpy int64 em unidades de 1/escala
+    """
+    rng = obter_gerador(rng)
+    total_horas = int(round(total_horas * escala))
+    total_volume = int(round(total_volume * escala))
+
+    limite_horas = limites_inteiros(
+        tempo_maximo_diario(max_horas_diario, max_volume_diario, vazao_maxima, escala), total_horas, num_valores, escala,
+    )
+    horas = apportionar_maior_resto(alocar_aleatorio(total_horas, num_valores, limite_horas, rng), total_horas, limite_horas)
+
+    # fmin ignora o NaN de 0 * inf quando não há vazão máxima
+    limites_volume = limites_inteiros(np.fmin(max_volume_diario, horas / escala * vazao_maxima), total_volume, num_valores, escala)
+    volumes = apportionar_maior_resto(alocar_aleatorio(total_volume, num_valores, limites_volume, rng), total_volume, limites_volume)
+    return horas, volumes
+
+
+def tempo_maximo_diario(max_horas_diario, max_volume_diario, vazao_maxima, escala=1000):
+    """
+    Máximo diário de horas usado na grade de 1/escala.
+
+    Com a vazão máxima, as horas de um dia não podem exigir mais volume que o
+    máximo diário de volume arredondado para baixo ao 1/escala; assim o limite de
+    vazão de cada dia (horas_i * vazao_maxima) nunca passa do máximo de volume, e
+    a soma desses limites comporta qualquer volume total permitido pela vazão.
+
+    Args:
+        max_horas_diario: Valor máximo diário do horímetro
+        max_volume_diario: Valor máximo diário do hidrômetro
+        vazao_maxima: Vazão máxima (volume por hora; inf se não houver)
+        escala: Número de unidades inteiras por unidade real
+
+    Returns:
+        Máximo diário de horas (real)
+    """
+    if not 0 < vazao_maxima < float("inf"):
+        return max_horas_diario
+    return min(max_horas_diario, int(limite_na_grade(max_volume_diario, escala)) / escala / vazao_maxima)
+
+
+def limite_na_grade(limites, escala=1000):
+    """
+    Converte limites reais para a unidade inteira 1/escala, arredondando para baixo.
+
+    Valores inteiros que respeitam o resultado respeitam também os limites reais.
+
+    Args:
+        limites: Limite real (escalar ou array)
+        escala: Número de unidades inteiras por unidade real
+
+    Returns:
+        Limite(s) int64 em unidades de 1/escala
+    """
+    return np.floor(np.asarray(limites, dtype=float) * escala + 1e-6).astype(np.int64)
+
+
+def limites_inteiros(limites, total, num_valores, escala=1000):
+    """
+    Converte limites reais por item para a unidade 1/escala de modo que comportem o total.
+
+    Os limites são arredondados para baixo (limite_na_grade); só quando a soma
+    resultante não comporta o total (um total que cabe nos limites reais, mas não
+    na grade de 1/escala) eles são arredondados para cima, e cada valor pode então
+    exceder o seu limite em menos de 1/escala.
+
+    Args:
+        limites: Limite real por item (escalar ou array com num_valores itens)
+        total: Soma inteira a distribuir, em unidades de 1/escala
+        num_valores: Número de itens
+        escala: Número de unidades inteiras por unidade real
+
+    Returns:
+        Limite(s) int64 em unidades de 1/escala
+    """
+    inferiores = limite_na_grade(limites, escala)
+    if np.broadcast_to(inferiores, num_valores).sum() >= total:
+        return inferiores
+    return np.ceil(np.asarray(limites, dtype=float) * escala - 1e-6).astype(np.int64)
+
+
+def apportionar_maior_resto(valores, total, limites):
+    """
+    Converte valores reais em inteiros pelo método do maior resto.
+
+    Cada valor é truncado e as unidades que faltam para o total são dadas, uma
+    a uma, aos itens com maior parte fracionária que ainda estejam abaixo do limite.
+
+    Args:
+        valores: Array float (já na unidade inteira) com soma próxima de total
+        total: Soma inteira desejada
+        limites: Limite inteiro por item (escalar ou array)
+
+    Returns:
+        Array numpy int64 que soma exatamente total e respeita os limites
+
+    Raises:
+        ValueError: Se o total não couber nos limites
+    """
+    valores = np.asarray(valores, dtype=float)
+    limites = np.broadcast_to(np.asarray(limites, dtype=np.int64), valores.shape)
+    inteiros = np.clip(np.floor(valores).astype(np.int64), 0, limites)
+
+    faltam = int(total - inteiros.sum())
+    while faltam > 0:
+        candidatos = np.flatnonzero(inteiros < limites)
+        if len(candidatos) == 0:
+            raise ValueError(f"Impossível distribuir {total} unidades com os limites informados.")
+        escolhidos = candidatos[_maiores(valores[candidatos] - inteiros[candidatos], faltam)]
+        inteiros[escolhidos] += 1
+        faltam -= len(escolhidos)
+    while faltam < 0:
+        # Erro de ponto flutuante para cima: retira dos menores restos
+        candidatos = np.flatnonzero(inteiros > 0)
+        if len(candidatos) == 0:
+            raise ValueError(f"Impossível distribuir {total} unidades com os limites informados.")
+        escolhidos = candidatos[_maiores(inteiros[candidatos] - valores[candidatos], -faltam)]
+        inteiros[escolhidos] -= 1
+        faltam += len(escolhidos)
+    return inteiros
+
+
+def _maiores(valores, k):
+    """
+    Índices dos k maiores valores (todos, se houver no máximo k), em O(n).
+    """
+    if k >= len(valores):
+        return np.arange(len(valores))
+    return np.argpartition(-valores, k - 1)[:k]
@@ -0,0 +1,302 @@
+"""
+Armazenamento no servidor das tabelas geradas.
+
+Cada resultado recebe uma chave opaca e é gravado em disco em forma colunar
+(um arquivo .npy por coluna), de modo que a leitura é feita por memory-map,
+sem reconstruir DataFrames a partir de listas de dicionários. Arquivos prontos
+(ex: planilhas exportadas em segundo plano) também podem ser guardados. Os
+resultados expiram após um TTL e os menos usados recentemente são removidos
+quando o tamanho total passa do limite configurado.
+
+Configuração (settings, todos opcionais):
+    POCOS_RESULTADOS_DIR: diretório dos resultados (padrão: <tmp>/pocos_resultados)
+    POCOS_RESULTADOS_TTL: segundos sem acesso até um resultado expirar (padrão: 6 horas)
+    POCOS_RESULTADOS_MAX_BYTES: tamanho máximo total em disco (padrão: 256 MB)
+    POCOS_RESULTADOS_INTERVALO_LIMPEZA: intervalo mínimo, em segundos, entre as limpezas
+        feitas ao gravar um resultado (padrão: 60); entre duas limpezas o tamanho total
+        pode passar do limite pelo que for gravado no intervalo
+"""
+import json
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+_FORMATO_CHAVE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_ARQUIVO_META = "meta.json"
+_ARQUIVO_DADOS = "arquivo.bin"
+
+
+class ArmazenamentoResultados:
+    """
+    Armazena tabelas geradas em disco, com TTL e remoção LRU por tamanho.
+
+    O último acesso de cada resultado é o mtime do seu meta.json, o que mantém
+    o controle de LRU/TTL consistente entre processos que compartilham o diretório.
+    A limpeza percorre o diretório inteiro; por isso, ao gravar, ela é feita no
+    máximo uma vez a cada intervalo_limpeza segundos.
+    """
+
+    def __init__(self, diretorio, ttl, max_bytes, intervalo_limpeza=60):
+        self.diretorio = diretorio
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.intervalo_limpeza = intervalo_limpeza
+        self._ultima_limpeza = None
+
+    def salvar(self, tabelas, metadados=None):
+        """
+        Grava um resultado e retorna a sua chave.
+
+        Args:
+            tabelas: Dicionário {nome: DataFrame}
+            metadados: Dicionário serializável em JSON guardado junto ao resultado
+
+        Returns:
+            Chave opaca do resultado
+        """
+        def gravar(temporario, meta):
+            for nome_tabela, df in tabelas.items():
+                colunas = []
+                for indice, nome_coluna in enumerate(df.columns):
+                    arquivo = f"{len(meta['tabelas'])}_{indice}.npy"
+                    np.save(os.path.join(temporario, arquivo), _coluna_para_array(df[nome_coluna]), allow_pickle=False)
+                    colunas.append([nome_coluna, arquivo])
+                meta["tabelas"][nome_tabela] = {"colunas": colunas, "linhas": len(df)}
+
+        return self._gravar(gravar, metadados)
+
+    def salvar_arquivo(self, escrever, metadados=None):
+        """
+        Grava um arquivo (ex: um XLSX exportado) como resultado e retorna a sua chave.
+
+        Args:
+            escrever: Função que recebe o arquivo binário de destino e grava o conteúdo
+            metadados: Dicionário serializável em JSON guardado junto ao resultado
+
+        Returns:
+            Chave opaca do resultado (ver caminho_arquivo)
+        """
+        def gravar(temporario, meta):
+            with open(os.path.join(temporario, _ARQUIVO_DADOS), "wb") as destino:
+                escrever(destino)
+            meta["arquivo"] = _ARQUIVO_DADOS
+
+        return self._gravar(gravar, metadados)
+
+    def caminho_arquivo(self, chave):
+        """
+        Retorna o caminho do arquivo gravado com salvar_arquivo, ou None se não existir/expirou.
+        """
+        meta = self._ler_meta(chave)
+        if meta is None or not meta.get("arquivo"):
+            return None
+        return os.path.join(self.diretorio, chave, meta["arquivo"])
+
+    def colunas(self, chave, nome_tabela):
+        """
+        Retorna as colunas de uma tabela como arrays numpy mapeados em memória (somente leitura).
+
+        Returns:
+            Dicionário ordenado {nome_coluna: array}, ou None se o resultado não existir/expirou
+        """
+        meta = self._ler_meta(chave)
+        if meta is None or nome_tabela not in meta["tabelas"]:
+            return None
+        caminho = os.path.join(self.diretorio, chave)
+        try:
+            return {
+                nome: np.load(os.path.join(caminho, arquivo), mmap_mode="r", allow_pickle=False)
+                for nome, arquivo in meta["tabelas"][nome_tabela]["colunas"]
+            }
+        except FileNotFoundError:
+            # Removido por outro processo durante a leitura
+            return None
+
+    def carregar(self, chave, nome_tabela):
+        """
+        Retorna uma tabela como DataFrame (colunas numéricas sem cópia), ou None.
+        """
+        colunas = self.colunas(chave, nome_tabela)
+        if colunas is None:
+            return None
+        return pd.DataFrame(colunas, copy=False)
+
+    def metadados(self, chave):
+        """
+        Retorna os metadados gravados com o resultado, ou None.
+        """
+        meta = self._ler_meta(chave)
+        return None if meta is None else meta["metadados"]
+
+    def remover(self, chave):
+        """
+        Remove um resultado (ignora chaves inexistentes ou inválidas).
+        """
+        if chave and _FORMATO_CHAVE.match(chave):
+            shutil.rmtree(os.path.join(self.diretorio, chave), ignore_errors=True)
+
+    def limpar(self):
+        """
+        Remove os resultados expirados e, se necessário, os menos usados recentemente
+        até que o tamanho total fique dentro do limite.
+        """
+        agora = time.time()
+        self._ultima_limpeza = agora
+        entradas = []
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return
+        for nome in nomes:
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                if nome.startswith(".tmp-"):
+                    # Gravação interrompida há mais de um TTL
+                    if agora - os.path.getmtime(caminho) > self.ttl:
+                        shutil.rmtree(caminho, ignore_errors=True)
+                    continue
+                ultimo_acesso = os.path.getmtime(os.path.join(caminho, _ARQUIVO_META))
+                tamanho = sum(entrada.stat().st_size for entrada in os.scandir(caminho))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if agora - ultimo_acesso > self.ttl:
+                shutil.rmtree(caminho, ignore_errors=True)
+            else:
+                entradas.append((ultimo_acesso, tamanho, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(caminho, ignore_errors=True)
+            total -= tamanho
+
+    def anexar_arquivo(self, chave, nome, escrever):
+        """
+        Grava um arquivo derivado (ex: o XLSX de uma tabela) dentro de um resultado existente.
+
+        O anexo expira e é removido junto com o resultado.
+
+        Args:
+            chave: Chave do resultado
+            nome: Nome do anexo (ex: 'xlsx')
+            escrever: Função que recebe o arquivo binário de destino e grava o conteúdo
+
+        Returns:
+            Caminho do anexo, ou None se o resultado não existe mais (antes ou durante a gravação)
+        """
+        if self._ler_meta(chave) is None:
+            return None
+        caminho = os.path.join(self.diretorio, chave)
+        try:
+            descritor, temporario = tempfile.mkstemp(prefix=".tmp-", dir=caminho)
+        except FileNotFoundError:
+            return None
+        try:
+            with os.fdopen(descritor, "wb") as destino:
+                escrever(destino)
+            destino_final = os.path.join(caminho, f"anexo_{nome}")
+            # A substituição torna o anexo visível de forma atômica
+            os.replace(temporario, destino_final)
+        except FileNotFoundError:
+            # Resultado removido durante a gravação
+            return None
+        except BaseException:
+            try:
+                os.remove(temporario)
+            except FileNotFoundError:
+                pass
+            raise
+        return destino_final
+
+    def caminho_anexo(self, chave, nome):
+        """
+        Retorna o caminho de um anexo gravado com anexar_arquivo, ou None se não existir.
+        """
+        if self._ler_meta(chave) is None:
+            return None
+        caminho = os.path.join(self.diretorio, chave, f"anexo_{nome}")
+        return caminho if os.path.exists(caminho) else None
+
+    def _gravar(self, gravar, metadados):
+        """
+        Cria um resultado em um diretório temporário e o torna visível de forma atômica.
+
+        Args:
+            gravar: Função (diretorio_temporario, meta) que grava os arquivos e completa o meta
+            metadados: Metadados do resultado
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        chave = secrets.token_urlsafe(16)
+        temporario = tempfile.mkdtemp(prefix=".tmp-", dir=self.diretorio)
+        try:
+            meta = {"tabelas": {}, "metadados": metadados or {}}
+            gravar(temporario, meta)
+            with open(os.path.join(temporario, _ARQUIVO_META), "w", encoding="utf-8") as arquivo_meta:
+                json.dump(meta, arquivo_meta, default=str)
+            # A renomeação torna o resultado visível de forma atômica
+            os.rename(temporario, os.path.join(self.diretorio, chave))
+        except BaseException:
+            shutil.rmtree(temporario, ignore_errors=True)
+            raise
+        if self._ultima_limpeza is None or time.time() - self._ultima_limpeza >= self.intervalo_limpeza:
+            self.limpar()
+        return chave
+
+    def _ler_meta(self, chave):
+        """
+        Lê o meta.json de um resultado válido e registra o acesso (LRU).
+        """
+        if not chave or not _FORMATO_CHAVE.match(chave):
+            return None
+        caminho = os.path.join(self.diretorio, chave, _ARQUIVO_META)
+        try:
+            if time.time() - os.path.getmtime(caminho) > self.ttl:
+                self.remover(chave)
+                return None
+            with open(caminho, encoding="utf-8") as arquivo_meta:
+                meta = json.load(arquivo_meta)
+            os.utime(caminho)
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta
+
+
+def _coluna_para_array(serie):
+    """
+    Converte uma coluna em um array numpy sem objetos Python (necessário para o memory-map).
+
+    Colunas de texto viram arrays unicode de largura fixa; colunas de objetos com
+    números e None viram float (None -> NaN).
+    """
+    if serie.dtype.kind in "biuf":
+        return serie.to_numpy()
+    valores = serie.to_numpy(dtype=object)
+    if all(isinstance(valor, str) for valor in valores):
+        return valores.astype(str)
+    return pd.to_numeric(serie, errors="raise").to_numpy(dtype=float)
+
+
+_armazenamento = None
+
+
+def obter_armazenamento():
+    """
+    Retorna a instância do armazenamento configurada a partir dos settings.
+    """
+    global _armazenamento
+    if _armazenamento is None:
+        _armazenamento = ArmazenamentoResultados(
+            diretorio=getattr(settings, "POCOS_RESULTADOS_DIR", os.path.join(tempfile.gettempdir(), "pocos_resultados")),
+            ttl=getattr(settings, "POCOS_RESULTADOS_TTL", 6 * 60 * 60),
+            max_bytes=getattr(settings, "POCOS_RESULTADOS_MAX_BYTES", 256 * 1024 * 1024),
+            intervalo_limpeza=getattr(settings, "POCOS_RESULTADOS_INTERVALO_LIMPEZA", 60),
+        )
+    return _armazenamento
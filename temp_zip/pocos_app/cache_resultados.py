@@ -0,0 +1,151 @@
+"""
+Cache em memória de tabelas geradas e arquivos XLSX, indexado pelos parâmetros.
+
+Como a geração é determinística para os mesmos parâmetros e semente, o hash
+canônico dos parâmetros limpos identifica o resultado. Reenvios do mesmo
+formulário e downloads repetidos são servidos do cache, sem gerar a tabela
+nem montar a planilha novamente. Os contadores de acertos e faltas seguem no
+registro de desempenho de cada geração (registro.registro_geracao).
+
+Configuração (settings, opcional):
+    POCOS_CACHE_MAX_BYTES: tamanho máximo aproximado do cache (padrão: 64 MB)
+    POCOS_CACHE_MAX_ITEM_BYTES: tamanho máximo de um item (padrão: 1/4 do cache)
+"""
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, time
+
+from django.conf import settings
+
+
+def chave_parametros(parametros):
+    """
+    Calcula o hash canônico dos parâmetros limpos (incluindo a semente).
+
+    A ordem das chaves e das listas de códigos (ex: meses selecionados) não
+    altera o resultado, e datas/horas são normalizadas para ISO, de modo que
+    os parâmetros do formulário e os recuperados da sessão têm o mesmo hash.
+    """
+    def normalizar(valor):
+        if isinstance(valor, (date, time)):
+            return valor.isoformat()
+        if isinstance(valor, (list, tuple)):
+            return sorted(valor) if all(isinstance(item, str) for item in valor) else list(valor)
+        return valor
+
+    canonico = json.dumps(
+        {chave: normalizar(valor) for chave, valor in parametros.items()},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def tamanho_aproximado(valor):
+    """
+    Estima o tamanho em bytes de um valor guardado no cache.
+    """
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if hasattr(valor, "memory_usage"):
+        # DataFrame pandas
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """
+    Cache LRU limitado pelo tamanho total dos valores, seguro para threads.
+
+    Os valores guardados são compartilhados entre requisições e não devem ser alterados.
+    """
+
+    def __init__(self, max_bytes, max_item_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes or max_bytes // 4, max_bytes)
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        """
+        Retorna o valor guardado para a chave, ou None (contabiliza acerto/falta).
+        """
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def aceita(self, tamanho):
+        """
+        Indica se um valor com o tamanho informado (em bytes) seria guardado.
+
+        Permite evitar a leitura em memória de arquivos grandes que não seriam guardados.
+        """
+        return tamanho <= self.max_item_bytes
+
+    def guardar(self, chave, valor):
+        """
+        Guarda um valor, removendo os itens menos usados recentemente se necessário.
+
+        Valores maiores que o limite por item não são guardados.
+        """
+        tamanho = tamanho_aproximado(valor)
+        if not self.aceita(tamanho):
+            return
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_removido
+
+    def estatisticas(self):
+        """
+        Retorna os contadores do cache: acertos, faltas, itens e bytes ocupados.
+        """
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+            }
+
+    def limpar(self):
+        """
+        Remove todos os itens (os contadores são mantidos).
+        """
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    """
+    Retorna a instância do cache do processo, configurada a partir dos settings.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheResultados(
+                    getattr(settings, "POCOS_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                    getattr(settings, "POCOS_CACHE_MAX_ITEM_BYTES", None),
+                )
+    return _cache
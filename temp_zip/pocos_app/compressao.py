@@ -0,0 +1,139 @@
+"""
+Compressão das respostas dinâmicas (páginas de resultados, API de dados, CSV).
+
+O Whitenoise comprime apenas os arquivos estáticos. O CompressaoMiddleware
+comprime as respostas de tipos textuais (HTML, JSON, CSV, texto) com brotli,
+se o pacote 'brotli' estiver instalado e o cliente o aceitar, ou com gzip,
+escolhendo pelo cabeçalho Accept-Encoding (respeitando os pesos q). Respostas
+pequenas e tipos já comprimidos (XLSX, ZIP, Parquet, imagens) são enviados
+sem alteração. Respostas em streaming são comprimidas bloco a bloco.
+
+Configuração (settings, opcional):
+    POCOS_COMPRESSAO_MIN_BYTES: tamanho mínimo para comprimir (padrão: 1024)
+    POCOS_COMPRESSAO_NIVEL_BROTLI: qualidade do brotli, 0 a 11 (padrão: 5)
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from .medicao import medir
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, apenas gzip
+    brotli = None
+
+TIPOS_COMPRESSIVEIS = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+)
+
+# Bytes aleatórios no cabeçalho gzip (mitigação de BREACH, como no GZipMiddleware do Django)
+_MAX_BYTES_ALEATORIOS = 100
+
+
+def codificacao_aceita(accept_encoding):
+    """
+    Escolhe a codificação da resposta a partir do cabeçalho Accept-Encoding.
+
+    Returns:
+        'br', 'gzip' ou None
+    """
+    pesos = {}
+    for item in accept_encoding.split(','):
+        partes = [parte.strip() for parte in item.split(';')]
+        nome = partes[0].lower()
+        if not nome:
+            continue
+        peso = 1.0
+        for parametro in partes[1:]:
+            if parametro.startswith('q='):
+                try:
+                    peso = float(parametro[2:])
+                except ValueError:
+                    peso = 0.0
+        pesos[nome] = peso
+    coringa = pesos.get('*', 0.0)
+    candidatas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    aceitas = [(pesos.get(nome, coringa), nome) for nome in candidatas]
+    # Em caso de empate, a ordem de preferência (brotli antes de gzip)
+    peso, nome = max(aceitas, key=lambda item: (item[0], -candidatas.index(item[1])))
+    return nome if peso > 0 else None
+
+
+def _comprimir_brotli(conteudo):
+    return brotli.compress(conteudo, quality=getattr(settings, 'POCOS_COMPRESSAO_NIVEL_BROTLI', 5))
+
+
+def _comprimir_sequencia_brotli(sequencia):
+    compressor = brotli.Compressor(quality=getattr(settings, 'POCOS_COMPRESSAO_NIVEL_BROTLI', 5))
+    for bloco in sequencia:
+        dados = compressor.process(bloco)
+        if dados:
+            yield dados
+        # Envia o que já foi comprimido de cada bloco, sem esperar o fim da resposta
+        dados = compressor.flush()
+        if dados:
+            yield dados
+    yield compressor.finish()
+
+
+class CompressaoMiddleware:
+    """
+    Comprime respostas textuais com brotli ou gzip, conforme o Accept-Encoding.
+
+    Deve vir antes dos middlewares que alteram o conteúdo da resposta (logo
+    após o MedicaoTempoMiddleware, para que a compressão também seja medida).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = getattr(settings, 'POCOS_COMPRESSAO_MIN_BYTES', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header('Content-Encoding'):
+            return response
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not tipo.startswith(TIPOS_COMPRESSIVEIS):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+        if response.streaming and response.is_async:
+            # A aplicação roda em WSGI; respostas assíncronas são enviadas como estão
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = codificacao_aceita(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if codificacao == 'br':
+                response.streaming_content = _comprimir_sequencia_brotli(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=_MAX_BYTES_ALEATORIOS,
+                )
+            # O tamanho comprimido só é conhecido ao final do envio
+            del response.headers['Content-Length']
+        else:
+            with medir('compressao'):
+                if codificacao == 'br':
+                    comprimido = _comprimir_brotli(response.content)
+                else:
+                    comprimido = compress_string(response.content, max_random_bytes=_MAX_BYTES_ALEATORIOS)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+
+        # Um ETag forte não vale para o conteúdo comprimido (RFC 9110, seção 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codificacao
+        return response
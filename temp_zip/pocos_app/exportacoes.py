@@ -0,0 +1,235 @@
+"""
+Exportações em segundo plano.
+
+As planilhas grandes são montadas por um pool local de threads, fora da
+thread da requisição: a view enfileira a tarefa e responde na hora com o seu
+identificador, e o navegador consulta o andamento (linhas já escritas) até
+poder baixar o arquivo, que é gravado no armazenamento de resultados.
+
+As tarefas ficam registradas na memória do processo. Em ambientes serverless,
+em que a instância pode ser congelada após a resposta ou a consulta seguinte
+pode chegar a outra instância, a consulta pode não encontrar a tarefa; nesse
+caso a página recorre à exportação síncrona.
+
+O mesmo pool monta, de forma especulativa, a planilha de uma tabela recém-gerada
+(settings.POCOS_PREPARAR_XLSX), gravando-a como anexo do resultado. Essas tarefas
+têm um limite próprio de execuções simultâneas (além dele não são criadas) e são
+descartadas se a sessão ou o resultado deixarem de existir antes de começarem.
+
+Configuração (settings, opcional):
+    POCOS_EXPORTACAO_WORKERS: número de threads do pool (padrão: 2)
+    POCOS_EXPORTACAO_TTL: segundos que uma tarefa concluída fica registrada (padrão: 1 hora)
+    POCOS_PREPARAR_XLSX_MAX: tarefas especulativas simultâneas (padrão: 1)
+"""
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections
+
+from .armazenamento import obter_armazenamento
+from .registro import registrar
+
+logger = logging.getLogger(__name__)
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+ERRO = 'erro'
+DESCARTADA = 'descartada'
+
+
+class TarefaExportacao:
+    """
+    Estado de uma exportação: andamento, arquivo gerado ou erro.
+    """
+
+    def __init__(self, nome_arquivo, tipo_conteudo, linhas_total=None, nome_modulo=None):
+        self.id = secrets.token_urlsafe(12)
+        self.nome_arquivo = nome_arquivo
+        self.tipo_conteudo = tipo_conteudo
+        self.nome_modulo = nome_modulo  # Módulo exigido para acompanhar e baixar a exportação
+        self.estado = PENDENTE
+        self.linhas_escritas = 0
+        self.linhas_total = linhas_total
+        self.chave_arquivo = None
+        self.url_arquivo = None  # URL de download, se não for a padrão (baixar_exportacao)
+        self.erro = None
+        self.criada_em = time.time()
+        self.concluida_em = None
+
+    def registrar_progresso(self, linhas_escritas, linhas_total=None):
+        """
+        Atualiza o número de linhas já escritas (chamada pela função de exportação).
+        """
+        self.linhas_escritas = linhas_escritas
+        if linhas_total is not None:
+            self.linhas_total = linhas_total
+
+    def como_dicionario(self):
+        """
+        Retorna o estado da tarefa em um dicionário serializável em JSON.
+        """
+        percentual = None
+        if self.estado == CONCLUIDA:
+            percentual = 100
+        elif self.linhas_total:
+            # O arquivo ainda precisa ser fechado depois da última linha
+            percentual = min(99, int(100 * self.linhas_escritas / self.linhas_total))
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'linhas_escritas': self.linhas_escritas,
+            'linhas_total': self.linhas_total,
+            'percentual': percentual,
+            'erro': self.erro,
+        }
+
+
+class FilaExportacoes:
+    """
+    Pool de threads que executa as exportações e registro das tarefas.
+    """
+
+    def __init__(self, max_workers, ttl, max_especulativas=1):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.max_especulativas = max_especulativas
+        self._executor = None
+        self._tarefas = {}
+        self._especulativas = 0
+        self._lock = threading.Lock()
+
+    def enfileirar(self, exportar, nome_arquivo, tipo_conteudo, cache=None, chave_cache=None,
+                   anexo=None, especulativa=False, valida=None, nome_modulo=None):
+        """
+        Enfileira uma exportação e retorna a tarefa correspondente.
+
+        Args:
+            exportar: Função (tarefa, destino) que grava o arquivo em destino e
+                informa o andamento com tarefa.registrar_progresso
+            nome_arquivo: Nome do arquivo para o download
+            tipo_conteudo: Content-Type do arquivo
+            cache: Cache de resultados (opcional); arquivos pequenos o suficiente também são guardados nele
+            chave_cache: Chave do arquivo no cache
+            anexo: Tupla (chave do resultado, nome do anexo) para gravar o arquivo como anexo
+                de um resultado existente, em vez de um resultado novo
+            especulativa: Tarefa especulativa (sujeita ao limite max_especulativas)
+            valida: Função sem argumentos chamada antes de começar; se retornar False, a tarefa é descartada
+            nome_modulo: Módulo de acesso da view que iniciou a exportação (ver acesso_requerido)
+
+        Returns:
+            A tarefa, ou None se for especulativa e o limite de tarefas especulativas foi atingido
+        """
+        tarefa = TarefaExportacao(nome_arquivo, tipo_conteudo, nome_modulo=nome_modulo)
+        with self._lock:
+            if especulativa:
+                if self._especulativas >= self.max_especulativas:
+                    return None
+                self._especulativas += 1
+            self._remover_expiradas()
+            self._tarefas[tarefa.id] = tarefa
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='exportacao')
+        self._executor.submit(self._executar, tarefa, exportar, cache, chave_cache, anexo, especulativa, valida)
+        return tarefa
+
+    def obter(self, tarefa_id):
+        """
+        Retorna a tarefa com o identificador informado, ou None.
+        """
+        with self._lock:
+            return self._tarefas.get(tarefa_id)
+
+    def _executar(self, tarefa, exportar, cache, chave_cache, anexo, especulativa, valida):
+        inicio = time.perf_counter()
+        try:
+            if valida is not None and not valida():
+                tarefa.estado = DESCARTADA
+                return
+            tarefa.estado = EXECUTANDO
+            armazenamento = obter_armazenamento()
+            if anexo is None:
+                tarefa.chave_arquivo = armazenamento.salvar_arquivo(
+                    lambda destino: exportar(tarefa, destino),
+                    {'nome_arquivo': tarefa.nome_arquivo},
+                )
+                caminho = armazenamento.caminho_arquivo(tarefa.chave_arquivo)
+            else:
+                caminho = armazenamento.anexar_arquivo(anexo[0], anexo[1], lambda destino: exportar(tarefa, destino))
+                if caminho is None:
+                    # O resultado expirou ou foi substituído por uma nova geração
+                    tarefa.estado = DESCARTADA
+                    return
+            if cache is not None and caminho is not None:
+                with open(caminho, 'rb') as arquivo:
+                    tamanho = arquivo.seek(0, 2)
+                    if cache.aceita(tamanho):
+                        arquivo.seek(0)
+                        cache.guardar(chave_cache, arquivo.read())
+            tarefa.estado = CONCLUIDA
+        except Exception as e:
+            logger.exception('Erro na exportação %s (%s).', tarefa.id, tarefa.nome_arquivo)
+            tarefa.erro = str(e)
+            tarefa.estado = ERRO
+        finally:
+            if especulativa:
+                with self._lock:
+                    self._especulativas -= 1
+            duracao = time.perf_counter() - inicio
+            tarefa.concluida_em = time.time()
+            registrar(
+                logger, 'exportacao', tarefa=tarefa.id, arquivo=tarefa.nome_arquivo, estado=tarefa.estado,
+                especulativa=especulativa, linhas=tarefa.linhas_escritas, duracao_ms=duracao * 1000,
+                espera_ms=(tarefa.concluida_em - tarefa.criada_em - duracao) * 1000,
+            )
+
+    def _remover_expiradas(self):
+        agora = time.time()
+        expiradas = [
+            tarefa_id for tarefa_id, tarefa in self._tarefas.items()
+            if tarefa.concluida_em is not None and agora - tarefa.concluida_em > self.ttl
+        ]
+        for tarefa_id in expiradas:
+            del self._tarefas[tarefa_id]
+
+
+_fila = None
+_lock_fila = threading.Lock()
+
+
+def obter_fila():
+    """
+    Retorna a fila de exportações configurada a partir dos settings.
+    """
+    global _fila
+    with _lock_fila:
+        if _fila is None:
+            _fila = FilaExportacoes(
+                max_workers=getattr(settings, 'POCOS_EXPORTACAO_WORKERS', 2),
+                ttl=getattr(settings, 'POCOS_EXPORTACAO_TTL', 60 * 60),
+                max_especulativas=getattr(settings, 'POCOS_PREPARAR_XLSX_MAX', 1),
+            )
+    return _fila
+
+
+def sessao_ativa(chave_sessao):
+    """
+    Indica se a sessão ainda existe e não expirou (usada para descartar tarefas especulativas de sessões expiradas).
+
+    SessionStore.exists() só verifica a chave: uma sessão expirada que ainda não
+    foi apagada (clearsessions) continuaria valendo. A sessão é então carregada,
+    o que nos backends do Django descarta as expiradas; uma sessão expirada ou
+    inexistente volta vazia ou com outra chave.
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    try:
+        sessao = engine.SessionStore(chave_sessao)
+        return bool(sessao.load()) and sessao.session_key == chave_sessao
+    finally:
+        # Fecha as conexões abertas por esta thread do pool
+        connections.close_all()
@@ -0,0 +1,139 @@
+"""
+Exportação da tabela de Consumo em formatos para carga em outras ferramentas.
+
+- CSV: gerado em blocos (streaming), com as convenções brasileiras da planilha:
+  separador ';', vírgula decimal, as mesmas casas decimais e datas DD/MM/AAAA.
+- Parquet e Arrow (IPC): colunares e tipados (Data como date32, medidas como
+  float64, "Unidade" como categórica/dicionário e as demais colunas como texto).
+
+Parquet e Arrow dependem do pacote opcional 'pyarrow', que não faz parte do
+requirements.txt (é grande demais para o deploy serverless); sem ele, apenas o
+CSV fica disponível.
+"""
+import csv
+import importlib.util
+import io
+
+import numpy as np
+
+from .renderizacao import CASAS_CONSUMO, formatar_decimais
+
+SEPARADOR_CSV = ";"
+LINHAS_POR_BLOCO_CSV = 4096
+
+# Colunas de texto com poucos valores distintos, gravadas como categóricas no Parquet/Arrow
+COLUNAS_CATEGORICAS = ("Unidade",)
+
+
+def parquet_disponivel():
+    """
+    Indica se o pacote opcional pyarrow está instalado (exportação Parquet/Arrow).
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _colunas_csv(bloco, casas):
+    """
+    Converte as colunas de um bloco em listas de valores para o CSV (números com vírgula decimal).
+    """
+    colunas = []
+    for nome in bloco.columns:
+        if nome in casas:
+            texto = formatar_decimais(bloco[nome].to_numpy(), casas[nome])
+            colunas.append(np.char.replace(texto, ".", ",").tolist())
+        else:
+            colunas.append(bloco[nome].tolist())
+    return colunas
+
+
+def gerar_csv(df, casas=CASAS_CONSUMO):
+    """
+    Gera o CSV da tabela em blocos de bytes UTF-8, para uma resposta em streaming.
+
+    Cada bloco de LINHAS_POR_BLOCO_CSV linhas é formatado de uma vez (operações
+    vetorizadas por coluna), de modo que o CSV inteiro nunca fica em memória.
+
+    Args:
+        df: DataFrame com a tabela (datas já formatadas como DD/MM/AAAA)
+        casas: Casas decimais por coluna numérica
+
+    Yields:
+        Bytes do cabeçalho e de cada bloco de linhas
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=SEPARADOR_CSV, lineterminator="\r\n")
+    escritor.writerow(df.columns)
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO_CSV):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO_CSV]
+        escritor.writerows(zip(*_colunas_csv(bloco, casas)))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Tabela vazia: apenas o cabeçalho
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _datas_de_texto(datas):
+    """
+    Converte strings DD/MM/AAAA em um array datetime64[D] sem laço por dia.
+    """
+    # Reordena os caracteres de DD/MM/AAAA para AAAA-MM-DD (inverso de utils.formatar_datas)
+    caracteres = np.asarray(datas, dtype="U10").view("U1").reshape(-1, 10)[:, [6, 7, 8, 9, 2, 3, 4, 5, 0, 1]]
+    caracteres[:, [4, 7]] = "-"
+    return np.ascontiguousarray(caracteres).view("U10").ravel().astype("datetime64[D]")
+
+
+def tabela_arrow(df, casas=CASAS_CONSUMO):
+    """
+    Converte a tabela em uma pyarrow.Table com tipos adequados a cada coluna.
+
+    Args:
+        df: DataFrame com a tabela
+        casas: Colunas numéricas (gravadas como float64; vazios viram nulos)
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow as pa
+
+    colunas = {}
+    for nome in df.columns:
+        valores = df[nome].to_numpy()
+        if nome == "Data":
+            colunas[nome] = pa.array(_datas_de_texto(valores), type=pa.date32())
+        elif nome in casas:
+            colunas[nome] = pa.array(np.asarray(valores, dtype=float), type=pa.float64(), from_pandas=True)
+        elif nome in COLUNAS_CATEGORICAS:
+            colunas[nome] = pa.array(valores.tolist(), type=pa.string()).dictionary_encode()
+        else:
+            colunas[nome] = pa.array(valores.tolist(), type=pa.string())
+    return pa.table(colunas)
+
+
+def escrever_parquet(df, destino):
+    """
+    Grava a tabela em Parquet.
+
+    Args:
+        df: DataFrame com a tabela
+        destino: Caminho ou arquivo binário de destino
+    """
+    import pyarrow.parquet as pq
+
+    pq.write_table(tabela_arrow(df), destino)
+
+
+def escrever_arrow(df, destino):
+    """
+    Grava a tabela no formato de arquivo Arrow (IPC), lido sem conversão por pyarrow, polars, DuckDB etc.
+
+    Args:
+        df: DataFrame com a tabela
+        destino: Caminho ou arquivo binário de destino
+    """
+    import pyarrow as pa
+
+    tabela = tabela_arrow(df)
+    with pa.ipc.new_file(destino, tabela.schema) as escritor:
+        escritor.write_table(tabela)
@@ -75,6 +75,14 @@ class ParametrosForm(forms.Form):
         initial=True # Manter selecionado por padrão
     )
     
+    # Semente do gerador aleatório (uma nova é sorteada se não for informada)
+    semente = forms.IntegerField(
+        label='Semente (opcional)',
+        min_value=0,
+        required=False,
+        help_text='Informe a semente de uma geração anterior para reproduzir exatamente a mesma tabela.'
+    )
+    
     def clean(self):
         cleaned_data = super().clean()
         
@@ -167,6 +175,20 @@ class ParametrosForm(forms.Form):
                 
                 if vazao_media_total > vazao_maxima:
                     raise forms.ValidationError(f'A vazão média total necessária ({vazao_media_total:.2f} m³/h) excede a vazão máxima diária permitida ({vazao_maxima:.2f} m³/h). Ajuste os parâmetros.')
-                
+
+                # 4. Os valores diários da tabela têm 3 casas decimais: os totais precisam caber
+                # nos máximos diários arredondados para baixo ao milésimo
+                from .alocacao import limite_na_grade, tempo_maximo_diario
+                horas_milesimos = round(diferenca_horimetro * 1000)
+                volume_milesimos = round(diferenca_hidrometro * 1000)
+                max_horas_milesimos = int(limite_na_grade(tempo_maximo_diario(max_horimetro_diario, max_hidrometro_diario, vazao_maxima)))
+                max_volume_milesimos = int(limite_na_grade(max_hidrometro_diario))
+                if horas_milesimos > dias_consumo * max_horas_milesimos:
+                    raise forms.ValidationError(f'O tempo total ({diferenca_horimetro:.3f} h) não cabe em {dias_consumo} dias com o Valor Máximo Diário do Horímetro em 3 casas decimais ({max_horas_milesimos / 1000:.3f} h). Ajuste os parâmetros.')
+                if volume_milesimos > dias_consumo * max_volume_milesimos:
+                    raise forms.ValidationError(f'O volume total ({diferenca_hidrometro:.3f} m³) não cabe em {dias_consumo} dias com o Valor Máximo Diário do Hidrômetro em 3 casas decimais ({max_volume_milesimos / 1000:.3f} m³). Ajuste os parâmetros.')
+                if volume_milesimos > horas_milesimos * vazao_maxima + 1e-6:
+                    raise forms.ValidationError(f'O volume total ({diferenca_hidrometro:.3f} m³) excede a vazão máxima ({vazao_maxima:.2f} m³/h) aplicada ao tempo total em 3 casas decimais ({horas_milesimos / 1000:.3f} h). Ajuste os parâmetros.')
+
         return cleaned_data
 
@@ -31,6 +31,14 @@ class TesteBombeamentoForm(forms.Form):
         min_value=1,
         help_text='Período total do teste de bombeamento.'
     )
+    
+    # Semente do gerador aleatório dos dois testes (uma nova é sorteada se não for informada)
+    semente = forms.IntegerField(
+        label='Semente (opcional)',
+        min_value=0,
+        required=False,
+        help_text='Informe a semente de uma geração anterior para reproduzir exatamente os mesmos testes.'
+    )
 
     def clean(self):
         cleaned_data = super().clean()
@@ -0,0 +1,125 @@
+"""
+Medição do tempo das requisições por etapa (Server-Timing).
+
+O MedicaoTempoMiddleware abre uma medição para cada requisição e, ao final,
+envia as etapas medidas no cabeçalho Server-Timing (visível na aba de rede do
+navegador) e no evento de log 'requisicao' (logger 'pocos_app.medicao', ver registro.py).
+Inclui sempre o tempo total e o número e o tempo das consultas ao banco.
+
+As etapas são marcadas no código com o gerenciador de contexto medir(nome),
+que fora de uma requisição (scripts, benchmarks, threads de fundo) não faz
+nada. O custo por etapa é de duas leituras do relógio, e o das consultas ao
+banco uma chamada de função a mais, baixo o bastante para uso em produção.
+"""
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.contrib.sessions.serializers import JSONSerializer
+from django.db import connections
+
+from .registro import registrar
+
+logger = logging.getLogger(__name__)
+
+# Medição da requisição em andamento: {etapa: [duração em segundos, ocorrências]}
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+@contextmanager
+def medir(nome):
+    """
+    Mede o tempo do bloco e o acumula na etapa 'nome' da requisição atual.
+
+    Args:
+        nome: Nome da etapa no Server-Timing (letras, números, '_' e '-')
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapa = medicao.setdefault(nome, [0.0, 0])
+        etapa[0] += time.perf_counter() - inicio
+        etapa[1] += 1
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    """
+    execute_wrapper que acumula o número e o tempo das consultas ao banco.
+    """
+    with medir('db'):
+        return execute(sql, params, many, context)
+
+
+def cabecalho_server_timing(medicao, total):
+    """
+    Monta o valor do cabeçalho Server-Timing.
+
+    Args:
+        medicao: Etapas medidas {nome: [duração em segundos, ocorrências]}
+        total: Duração total da requisição em segundos
+
+    Returns:
+        String no formato 'total;dur=12.3, db;dur=1.2;desc="3 consultas", ...'
+    """
+    partes = [f'total;dur={total * 1000:.1f}']
+    for nome, (duracao, ocorrencias) in medicao.items():
+        if nome == 'db':
+            partes.append(f'db;dur={duracao * 1000:.1f};desc="{ocorrencias} consultas"')
+        else:
+            partes.append(f'{nome};dur={duracao * 1000:.1f}')
+    return ', '.join(partes)
+
+
+class MedicaoTempoMiddleware:
+    """
+    Mede cada requisição e envia as etapas no Server-Timing e no log.
+
+    Deve ser o primeiro middleware (ou logo após o SecurityMiddleware), para
+    que o total inclua os demais middlewares, como a gravação da sessão.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicao = {}
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(_medir_consulta))
+                response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        total = time.perf_counter() - inicio
+
+        response['Server-Timing'] = cabecalho_server_timing(medicao, total)
+        tempo_db, consultas = medicao.get('db', (0.0, 0))
+        registrar(
+            logger, 'requisicao',
+            metodo=request.method, caminho=request.path, status=response.status_code,
+            total_ms=total * 1000, db_consultas=consultas, db_ms=tempo_db * 1000,
+            **{f'{nome}_ms': duracao * 1000 for nome, (duracao, _) in medicao.items() if nome != 'db'},
+        )
+        return response
+
+
+class SerializadorSessaoJSON(JSONSerializer):
+    """
+    Serializador JSON da sessão (o padrão do Django) com medição da etapa 'sessao'.
+    """
+
+    def dumps(self, obj):
+        with medir('sessao'):
+            return super().dumps(obj)
+
+    def loads(self, data):
+        with medir('sessao'):
+            return super().loads(data)
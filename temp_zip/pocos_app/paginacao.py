@@ -0,0 +1,99 @@
+"""
+Paginação das tabelas do armazenamento de resultados para a API de dados.
+
+Trabalha diretamente sobre as colunas mapeadas em memória (ver
+ArmazenamentoResultados.colunas): só as linhas e colunas da página pedida são
+lidas do disco e convertidas para JSON, de modo que o custo de cada página
+não depende do tamanho do período gerado.
+"""
+import re
+
+import numpy as np
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+# Filtro de mês no formato AAAA-MM
+_FORMATO_MES = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+
+
+class ParametrosPaginaInvalidos(ValueError):
+    """
+    Parâmetros de página inválidos (offset, limit, colunas ou mês).
+    """
+
+
+def _inteiro(valor, padrao, nome, minimo, maximo=None):
+    if valor in (None, ""):
+        return padrao
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ParametrosPaginaInvalidos(f"'{nome}' deve ser um número inteiro.") from None
+    if numero < minimo or (maximo is not None and numero > maximo):
+        limite = f"estar entre {minimo} e {maximo}" if maximo is not None else f"ser maior ou igual a {minimo}"
+        raise ParametrosPaginaInvalidos(f"'{nome}' deve {limite}.")
+    return numero
+
+
+def _valores_json(valores):
+    """
+    Converte um array numpy em lista Python, trocando NaN por None (JSON não aceita NaN).
+    """
+    if valores.dtype.kind == "f":
+        nulos = np.isnan(valores)
+        if nulos.any():
+            lista = valores.astype(object)
+            lista[nulos] = None
+            return lista.tolist()
+    return valores.tolist()
+
+
+def pagina_de_colunas(colunas, offset=None, limit=None, nomes=None, mes=None):
+    """
+    Seleciona uma faixa de linhas de uma tabela armazenada.
+
+    Args:
+        colunas: Dicionário ordenado {nome_coluna: array} (ver ArmazenamentoResultados.colunas)
+        offset: Índice da primeira linha (após o filtro de mês; padrão: 0)
+        limit: Número máximo de linhas (padrão: LIMITE_PADRAO, máximo: LIMITE_MAXIMO)
+        nomes: Colunas retornadas, na ordem pedida (padrão: todas)
+        mes: Filtro de mês 'AAAA-MM', aplicado à coluna 'Data' (dd/mm/aaaa)
+
+    Returns:
+        Dicionário {colunas, linhas, total, offset, limit}, em que 'total' é o
+        número de linhas após o filtro e 'linhas' é uma lista de listas
+
+    Raises:
+        ParametrosPaginaInvalidos: Se algum parâmetro for inválido
+    """
+    offset = _inteiro(offset, 0, "offset", 0)
+    limit = _inteiro(limit, LIMITE_PADRAO, "limit", 1, LIMITE_MAXIMO)
+
+    nomes = list(nomes) if nomes else list(colunas)
+    desconhecidas = [nome for nome in nomes if nome not in colunas]
+    if desconhecidas:
+        raise ParametrosPaginaInvalidos(f"Colunas inexistentes: {', '.join(desconhecidas)}.")
+
+    total = len(next(iter(colunas.values()))) if colunas else 0
+    if mes:
+        correspondencia = _FORMATO_MES.match(mes)
+        if correspondencia is None:
+            raise ParametrosPaginaInvalidos("'mes' deve estar no formato AAAA-MM.")
+        if "Data" not in colunas:
+            raise ParametrosPaginaInvalidos("Esta tabela não tem a coluna 'Data' para o filtro de mês.")
+        ano, numero_mes = correspondencia.groups()
+        indices = np.flatnonzero(np.char.endswith(np.asarray(colunas["Data"]), f"/{numero_mes}/{ano}"))
+        total = len(indices)
+        selecao = indices[offset:offset + limit]
+    else:
+        selecao = slice(offset, min(offset + limit, total))
+
+    valores = [_valores_json(np.asarray(colunas[nome][selecao])) for nome in nomes]
+    return {
+        "colunas": nomes,
+        "linhas": [list(linha) for linha in zip(*valores)],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+    }
@@ -0,0 +1,97 @@
+"""
+Registro (logging) estruturado e amostrado do pocos_app.
+
+Os eventos são gravados com registrar(logger, evento, **campos) como uma linha
+'evento=... chave=valor ...', e os campos também seguem no registro de log
+(atributos 'evento' e 'campos') para formatadores estruturados. A mensagem só
+é montada se algum handler a emitir, e eventos abaixo do nível do logger não
+custam mais que uma comparação.
+
+Eventos frequentes podem ser amostrados (settings, opcional):
+    POCOS_LOG_AMOSTRAGEM: {evento: fração registrada entre 0 e 1} (padrão: 1 para todos)
+
+Avisos e erros (nível WARNING ou acima) nunca são amostrados.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger_geracao = logging.getLogger('pocos_app.geracao')
+
+
+class _Campos:
+    """
+    Formata os campos como 'chave=valor' apenas quando a mensagem é emitida.
+    """
+
+    def __init__(self, campos):
+        self.campos = campos
+
+    def __str__(self):
+        partes = []
+        for chave, valor in self.campos.items():
+            if isinstance(valor, float):
+                valor = f'{valor:.1f}'
+            elif not isinstance(valor, (str, int)) or (isinstance(valor, str) and (not valor or ' ' in valor)):
+                valor = json.dumps(valor, ensure_ascii=False, default=str)
+            partes.append(f'{chave}={valor}')
+        return ' '.join(partes)
+
+
+def taxa_amostragem(evento):
+    """
+    Retorna a fração dos eventos do tipo informado que deve ser registrada.
+    """
+    if not settings.configured:
+        # Uso fora do Django (scripts, benchmarks)
+        return 1.0
+    return getattr(settings, 'POCOS_LOG_AMOSTRAGEM', {}).get(evento, 1.0)
+
+
+def registrar(logger, evento, nivel=logging.INFO, **campos):
+    """
+    Registra um evento estruturado, respeitando o nível do logger e a amostragem.
+
+    Args:
+        logger: Logger de destino
+        evento: Nome do evento (ex: 'geracao', 'requisicao')
+        nivel: Nível do registro (padrão: INFO)
+        **campos: Campos do evento
+    """
+    if not logger.isEnabledFor(nivel):
+        return
+    if nivel < logging.WARNING:
+        taxa = taxa_amostragem(evento)
+        if taxa < 1.0 and random.random() >= taxa:
+            return
+    logger.log(nivel, 'evento=%s %s', evento, _Campos(campos), extra={'evento': evento, 'campos': campos})
+
+
+@contextmanager
+def registro_geracao(tipo, **campos):
+    """
+    Mede uma geração e grava o registro de desempenho (evento 'geracao') ao final.
+
+    O bloco pode acrescentar campos ao dicionário retornado, como o número de
+    linhas ('linhas') e se o resultado veio do cache ('cache'). O registro leva
+    também os contadores acumulados do cache de resultados do processo
+    (cache_acertos, cache_faltas, cache_itens e cache_bytes).
+
+    Args:
+        tipo: Tipo da geração (ex: 'tabela_consumo', 'xlsx_consumo')
+        **campos: Campos iniciais do registro
+    """
+    registro = dict(campos)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if logger_geracao.isEnabledFor(logging.INFO):
+            from .cache_resultados import obter_cache
+            estatisticas = {f'cache_{nome}': valor for nome, valor in obter_cache().estatisticas().items()}
+            registrar(logger_geracao, 'geracao', tipo=tipo, duracao_ms=duracao_ms, **registro, **estatisticas)
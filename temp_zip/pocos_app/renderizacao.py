@@ -0,0 +1,123 @@
+"""
+Renderização rápida das tabelas de resultados em HTML.
+
+Substitui DataFrame.to_html nas páginas de resultados. Cada coluna é
+formatada de uma vez (operações vetorizadas do numpy sobre o array inteiro)
+com o número de casas decimais fixo do esquema da tabela, o texto é escapado
+apenas quando contém caracteres especiais, e as linhas são montadas com
+str.join. O HTML gerado é mínimo (sem atributos de estilo por célula) e
+traz no cabeçalho as casas decimais de cada coluna (data-casas), usadas pelo
+script das tabelas paginadas para formatar as linhas carregadas depois.
+"""
+import html
+
+import numpy as np
+
+# Casas decimais por coluna (as mesmas da planilha exportada)
+CASAS_CONSUMO = {
+    "Horimetro": 3,
+    "Medidor de Vazão": 3,
+    "Tempo de Captação (h)": 2,
+    "Volume diário (m3)": 3,
+    "Volume acumulado Mensal (m3)": 3,
+    "Valor": 2,
+    "Nível Estático (NE)": 2,
+    "Nível Dinâmico (ND)": 2,
+}
+CASAS_TESTE = {
+    "Tempo (min)": 1,
+    "Nível (m)": 1,
+    "Vazão (m³/h)": 1,
+}
+
+_CARACTERES_ESPECIAIS = ("&", "<", ">", '"', "'")
+
+
+def formatar_decimais(valores, casas):
+    """
+    Formata um array de números com casas decimais fixas, sem laço em Python.
+
+    Os valores são arredondados para inteiros na escala 10**casas (meio para
+    longe do zero) e as partes inteira e decimal são convertidas para texto
+    pelo numpy. NaN vira texto vazio.
+
+    Args:
+        valores: Array numpy de números
+        casas: Número de casas decimais
+
+    Returns:
+        Array numpy de strings
+    """
+    valores = np.asarray(valores, dtype=float)
+    nulos = np.isnan(valores)
+    escala = 10 ** casas
+    # Arredondamento "meio para longe do zero" sobre o valor decimal (como o Excel):
+    # a pequena folga relativa corrige o erro binário de valores como 1.235 * 100
+    absolutos_float = np.abs(np.where(nulos, 0.0, valores)) * escala
+    absolutos = np.floor(absolutos_float * (1 + 4 * np.finfo(float).eps) + 0.5).astype(np.int64)
+    escalados = np.where(valores < 0, -absolutos, absolutos)
+    texto = (absolutos // escala).astype(str)
+    if casas:
+        decimais = np.char.zfill((absolutos % escala).astype(str), casas)
+        texto = np.char.add(np.char.add(texto, "."), decimais)
+    texto = np.where(escalados < 0, np.char.add("-", texto), texto)
+    if nulos.any():
+        texto = np.where(nulos, "", texto)
+    return texto
+
+
+def formatar_coluna(valores, casas=None):
+    """
+    Converte uma coluna em lista de strings prontas para o HTML (escapadas).
+
+    Args:
+        valores: Array numpy (ou Series) com os valores da coluna
+        casas: Casas decimais para colunas de ponto flutuante (None: representação padrão)
+
+    Returns:
+        Lista de strings
+    """
+    valores = np.asarray(valores)
+    if valores.dtype.kind == "f" and casas is not None:
+        return formatar_decimais(valores, casas).tolist()
+    if valores.dtype.kind == "f":
+        texto = valores.astype(str)
+        return np.where(np.isnan(valores), "", texto).tolist()
+    if valores.dtype.kind in "biu":
+        return valores.astype(str).tolist()
+    textos = ["" if valor is None else str(valor) for valor in valores.tolist()]
+    # Escapar só se algum valor da coluna tiver caracteres especiais (caso raro)
+    juntos = "".join(textos)
+    if any(caractere in juntos for caractere in _CARACTERES_ESPECIAIS):
+        textos = [html.escape(texto) for texto in textos]
+    return textos
+
+
+def renderizar_tabela(colunas, casas=None, classes="table"):
+    """
+    Renderiza uma tabela em HTML.
+
+    Args:
+        colunas: DataFrame ou dicionário ordenado {nome_coluna: array}
+        casas: Casas decimais por coluna (ex: CASAS_CONSUMO)
+        classes: Classes CSS do elemento <table>
+
+    Returns:
+        String com o HTML da tabela
+    """
+    casas = casas or {}
+    nomes = list(colunas.keys())
+    cabecalho = []
+    celulas = []
+    for nome in nomes:
+        valores = np.asarray(colunas[nome])
+        # As casas decimais só se aplicam a colunas de ponto flutuante
+        casas_coluna = casas.get(nome) if valores.dtype.kind == "f" else None
+        atributo = "" if casas_coluna is None else f' data-casas="{casas_coluna}"'
+        cabecalho.append(f"<th{atributo}>{html.escape(str(nome))}</th>")
+        celulas.append(formatar_coluna(valores, casas_coluna))
+    corpo = "".join(["<tr><td>" + "</td><td>".join(linha) + "</td></tr>" for linha in zip(*celulas)])
+    return (
+        f'<table class="{html.escape(classes)}"><thead><tr>{"".join(cabecalho)}</tr></thead>'
+        f"<tbody>{corpo}</tbody></table>"
+    )
@@ -1,3 +1,923 @@
-from django.test import TestCase
+import gzip
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from acesso.models import Modulo, PermissaoModulo
+
+from .alocacao import (
+    alocar_aleatorio, alocar_tempo_e_volume_inteiros, apportionar_maior_resto,
+    projetar_simplex_limitado,
+)
+from . import compressao
+from .armazenamento import ArmazenamentoResultados
+from .cache_resultados import CacheResultados, chave_parametros, obter_cache
+from .compressao import CompressaoMiddleware, codificacao_aceita
+from .exportacoes import CONCLUIDA, DESCARTADA, FilaExportacoes, obter_fila, sessao_ativa
+from .formatos import escrever_arrow, escrever_parquet, gerar_csv, parquet_disponivel, tabela_arrow
+from .forms import ParametrosForm
+from .medicao import MedicaoTempoMiddleware, _medicao_atual, cabecalho_server_timing, medir
+from .paginacao import LIMITE_MAXIMO, LIMITE_PADRAO, ParametrosPaginaInvalidos, pagina_de_colunas
+from .registro import registrar, registro_geracao
+from .renderizacao import CASAS_CONSUMO, formatar_decimais, renderizar_tabela
+from .utils import (
+    CABECALHOS_XLSX, FORMATOS_XLSX, dias_do_periodo, distribuir_valores, formatar_datas, gerar_tabela_dados,
+)
+from .views import _parametros_para_sessao
+
+
+class AlocacaoTests(SimpleTestCase):
+    """
+    Alocador do simplex limitado (pocos_app/alocacao.py) e distribuir_valores.
+    """
+
+    def test_projecao_soma_total_e_respeita_limites(self):
+        rng = np.random.default_rng(1)
+        for _ in range(50):
+            n = int(rng.integers(1, 500))
+            limites = rng.uniform(0.5, 5.0, n)
+            total = rng.uniform(0, limites.sum())
+            valores = projetar_simplex_limitado(rng.normal(size=n), total, limites)
+            self.assertAlmostEqual(valores.sum(), total, delta=1e-9 * max(1.0, total))
+            self.assertTrue(np.all(valores >= 0))
+            self.assertTrue(np.all(valores <= limites))
+
+    def test_projecao_total_impossivel(self):
+        with self.assertRaises(ValueError):
+            projetar_simplex_limitado(np.ones(3), 10, 3)
+
+    def test_maior_resto_soma_exata_e_respeita_limites(self):
+        rng = np.random.default_rng(2)
+        for _ in range(50):
+            n = int(rng.integers(1, 500))
+            limites = rng.integers(1, 5000, n)
+            total = int(rng.integers(0, limites.sum() + 1))
+            valores = alocar_aleatorio(total, n, limites, rng)
+            inteiros = apportionar_maior_resto(valores, total, limites)
+            self.assertEqual(inteiros.dtype, np.int64)
+            self.assertEqual(int(inteiros.sum()), total)
+            self.assertTrue(np.all((inteiros >= 0) & (inteiros <= limites)))
+
+    def test_alocacao_reproduzivel_com_a_mesma_semente(self):
+        np.testing.assert_array_equal(alocar_aleatorio(100, 30, 5, rng=42), alocar_aleatorio(100, 30, 5, rng=42))
+        self.assertFalse(np.array_equal(alocar_aleatorio(100, 30, 5, rng=42), alocar_aleatorio(100, 30, 5, rng=43)))
+
+    def test_distribuir_valores_soma_exata_em_milesimos(self):
+        valores = distribuir_valores(1234.567, 3653, 1.0, rng=7)
+        self.assertEqual(len(valores), 3653)
+        milesimos = np.rint(np.array(valores) * 1000).astype(np.int64)
+        self.assertEqual(int(milesimos.sum()), 1234567)
+        self.assertTrue(np.all(milesimos <= 1000))
+        self.assertTrue(all(valor >= 0 for valor in valores))
+
+    def test_distribuir_valores_no_limite(self):
+        self.assertEqual(distribuir_valores(100, 10, 10, rng=1), [10.0] * 10)
+
+    def test_distribuir_valores_reproduzivel(self):
+        self.assertEqual(distribuir_valores(50.5, 20, 4, rng=3), distribuir_valores(50.5, 20, 4, rng=3))
+
+
+def casos_tempo_e_volume(semente, quantidade):
+    """
+    Gera entradas válidas aleatórias (dias, totais, máximos diários e vazão máxima) para alocar_tempo_e_volume_inteiros.
+    """
+    rng = np.random.default_rng(semente)
+    for _ in range(quantidade):
+        dias = int(rng.integers(1, 400))
+        max_horas = round(float(rng.uniform(1, 24)), 3)
+        max_volume = round(float(rng.uniform(1, 200)), 3)
+        vazao_maxima = max_volume / max_horas
+        total_horas = round(float(rng.uniform(0.2, 0.95)) * dias * max_horas, 3)
+        capacidade = min(dias * max_volume, total_horas * vazao_maxima)
+        total_volume = round(float(rng.uniform(0.05, 0.95)) * capacidade, 3)
+        yield dias, total_horas, total_volume, max_horas, max_volume, vazao_maxima
+
+
+class TempoEVolumeTests(SimpleTestCase):
+    """
+    Alocação conjunta de tempo de captação e volume com vazão máxima.
+    """
+
+    def test_inteiros_somas_exatas_limites_e_vazao(self):
+        for dias, total_horas, total_volume, max_horas, max_volume, vazao in casos_tempo_e_volume(1, 200):
+            horas, volumes = alocar_tempo_e_volume_inteiros(total_horas, total_volume, dias, max_horas, max_volume, vazao, rng=5)
+            self.assertEqual(int(horas.sum()), round(total_horas * 1000))
+            self.assertEqual(int(volumes.sum()), round(total_volume * 1000))
+            self.assertTrue(np.all((horas >= 0) & (horas <= round(max_horas * 1000))))
+            self.assertTrue(np.all((volumes >= 0) & (volumes <= round(max_volume * 1000))))
+            self.assertTrue(np.all(volumes <= horas * vazao + 1e-6))
+
+    def test_limites_arredondados_para_baixo_quando_cabem_na_grade(self):
+        # 16.8798 h/dia: nenhum dia pode ter 16.880 h
+        horas, _ = alocar_tempo_e_volume_inteiros(100 * 16.879, 100.0, 100, 16.8798, 50, 50 / 16.8798, rng=3)
+        self.assertEqual(int(horas.max()), 16879)
+
+    def test_totais_que_so_cabem_nos_limites_reais(self):
+        # Regressões: os limites arredondados para o milésimo não comportavam o total
+        horas, volumes = alocar_tempo_e_volume_inteiros(9878.013, 9000.0, 423, 23.3523, 100, 100 / 23.3523, rng=4)
+        self.assertEqual(int(horas.sum()), 9878013)
+        self.assertEqual(int(volumes.sum()), 9000000)
+        self.assertTrue(np.all(horas <= 23353))
+
+    def test_total_que_nao_cabe_na_grade_levanta_value_error(self):
+        # 75.5 m³ em todos os 48 dias exige 18.6428 h por dia, que não existe em milésimos
+        # (o formulário rejeita estes parâmetros; ver ParametrosFormTests)
+        with self.assertRaises(ValueError):
+            alocar_tempo_e_volume_inteiros(894.8544, 3624.0, 48, 18.6428, 75.5, 75.5 / 18.6428, rng=4)
+
+    def test_reproduzivel_com_a_mesma_semente(self):
+        primeiro = alocar_tempo_e_volume_inteiros(300.5, 1500.25, 60, 8, 50, 50 / 8, rng=11)
+        segundo = alocar_tempo_e_volume_inteiros(300.5, 1500.25, 60, 8, 50, 50 / 8, rng=11)
+        np.testing.assert_array_equal(primeiro[0], segundo[0])
+        np.testing.assert_array_equal(primeiro[1], segundo[1])
+
+
+def parametros_consumo(**alteracoes):
+    """
+    Parâmetros de uma tabela de Consumo de 3 anos, com todos os meses e fins de semana.
+    """
+    parametros = {
+        'data_inicio': date(2022, 1, 1), 'data_fim': date(2024, 12, 31),
+        'horimetro_inicial': 1000.5, 'horimetro_final': 7500.123,
+        'hidrometro_inicial': 20000.25, 'hidrometro_final': 65000.777,
+        'max_horimetro_diario': 12, 'max_hidrometro_diario': 90,
+        'meses_selecionados': ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez'],
+        'registrar_sabados': True, 'registrar_domingos': True,
+        'ne': 10.0, 'nd': 20.0, 'apresentar_niveis': 'mensal', 'semente': 123,
+    }
+    parametros.update(alteracoes)
+    return parametros
+
+
+class TabelaConsumoTests(SimpleTestCase):
+    """
+    Invariantes da tabela de Consumo gerada em milésimos inteiros.
+    """
+
+    def verificar_invariantes(self, parametros):
+        df = gerar_tabela_dados(parametros)
+        self.assertEqual(df['Horimetro'].iloc[-1], round(parametros['horimetro_final'], 3))
+        self.assertEqual(df['Medidor de Vazão'].iloc[-1], round(parametros['hidrometro_final'], 3))
+        horas = np.rint(df['Tempo de Captação (h)'].to_numpy() * 1000)
+        volumes = np.rint(df['Volume diário (m3)'].to_numpy() * 1000)
+        self.assertEqual(horas.sum(), round((parametros['horimetro_final'] - parametros['horimetro_inicial']) * 1000))
+        self.assertEqual(volumes.sum(), round((parametros['hidrometro_final'] - parametros['hidrometro_inicial']) * 1000))
+        self.assertTrue(np.all(horas <= parametros['max_horimetro_diario'] * 1000))
+        self.assertTrue(np.all(volumes <= parametros['max_hidrometro_diario'] * 1000))
+        vazao_maxima = parametros['max_hidrometro_diario'] / parametros['max_horimetro_diario']
+        self.assertTrue(np.all(volumes <= horas * vazao_maxima + 1e-6))
+        return df
+
+    def test_leituras_finais_exatas_e_limites(self):
+        self.verificar_invariantes(parametros_consumo())
+
+    def test_invariantes_com_dias_sem_consumo(self):
+        df = self.verificar_invariantes(parametros_consumo(
+            meses_selecionados=['mar', 'abr', 'mai', 'set'], registrar_domingos=False,
+            horimetro_final=3000.0, hidrometro_final=30000.0,
+        ))
+        # Dias fora dos meses selecionados não têm consumo
+        janeiro = df['Data'].str.endswith('/01/2023').to_numpy()
+        self.assertTrue(np.all(df.loc[janeiro, 'Tempo de Captação (h)'] == 0))
+
+    def test_mesma_semente_gera_a_mesma_tabela(self):
+        self.assertTrue(gerar_tabela_dados(parametros_consumo()).equals(gerar_tabela_dados(parametros_consumo())))
+        self.assertFalse(gerar_tabela_dados(parametros_consumo()).equals(gerar_tabela_dados(parametros_consumo(semente=124))))
+
+
+def dados_formulario(**alteracoes):
+    """
+    Dados (POST) válidos do formulário da tabela de Consumo, com todos os meses e fins de semana.
+    """
+    dados = {
+        'data_inicio': '2024-01-01', 'data_fim': '2024-12-31',
+        'horimetro_inicial': '1000', 'horimetro_final': '4000',
+        'hidrometro_inicial': '5000', 'hidrometro_final': '25000',
+        'max_horimetro_diario': '12', 'max_hidrometro_diario': '90',
+        'meses_selecionados': [codigo for codigo, _ in ParametrosForm.MESES],
+        'registrar_sabados': 'on', 'registrar_domingos': 'on', 'apresentar_niveis': 'mensal',
+    }
+    dados.update(alteracoes)
+    return dados
+
+
+class ParametrosFormTests(SimpleTestCase):
+    """
+    Validação dos totais da tabela de Consumo contra os máximos diários em milésimos.
+    """
+
+    def test_parametros_validos(self):
+        self.assertTrue(ParametrosForm(dados_formulario()).is_valid())
+
+    def test_tempo_total_que_so_cabe_no_maximo_real(self):
+        # 423 dias x 23.3523 h comportam 9878.013 h, mas 423 x 23.352 h não
+        form = ParametrosForm(dados_formulario(
+            data_inicio='2024-01-01', data_fim='2025-02-26',
+            horimetro_inicial='0', horimetro_final='9878.013',
+            hidrometro_inicial='0', hidrometro_final='9000',
+            max_horimetro_diario='23.3523', max_hidrometro_diario='100',
+        ))
+        self.assertFalse(form.is_valid())
+        self.assertIn('Horímetro em 3 casas decimais', form.non_field_errors()[0])
+
+    def test_volume_no_limite_da_vazao_fora_da_grade(self):
+        # 48 dias x 75.5 m³ exigem 18.6428 h em todos os dias
+        form = ParametrosForm(dados_formulario(
+            data_inicio='2024-01-01', data_fim='2024-02-17',
+            horimetro_inicial='0', horimetro_final='894.8544',
+            hidrometro_inicial='0', hidrometro_final='3624',
+            max_horimetro_diario='18.6428', max_hidrometro_diario='75.5',
+        ))
+        self.assertFalse(form.is_valid())
+        self.assertIn('3 casas decimais', form.non_field_errors()[0])
+
+
+class PaginacaoTests(SimpleTestCase):
+    """
+    Páginas da API de dados sobre as colunas armazenadas (pocos_app/paginacao.py).
+    """
+
+    def setUp(self):
+        # 2023-12-01 a 2024-02-29: 31 + 31 + 29 linhas
+        dias = dias_do_periodo(date(2023, 12, 1), date(2024, 2, 29))
+        niveis = np.full(len(dias), np.nan)
+        niveis[30] = 10.5
+        self.colunas = {
+            'Data': formatar_datas(dias),
+            'Valor': np.arange(len(dias), dtype=float),
+            'Nível Estático (NE)': niveis,
+        }
+
+    def test_pagina_padrao(self):
+        pagina = pagina_de_colunas(self.colunas)
+        self.assertEqual(pagina['total'], 91)
+        self.assertEqual((pagina['offset'], pagina['limit']), (0, LIMITE_PADRAO))
+        self.assertEqual(len(pagina['linhas']), 91)
+        self.assertEqual(pagina['colunas'], ['Data', 'Valor', 'Nível Estático (NE)'])
+        self.assertEqual(pagina['linhas'][0], ['01/12/2023', 0.0, None])
+        self.assertEqual(pagina['linhas'][30], ['31/12/2023', 30.0, 10.5])
+
+    def test_offset_e_limit(self):
+        pagina = pagina_de_colunas(self.colunas, offset='85', limit='10')
+        self.assertEqual([linha[1] for linha in pagina['linhas']], [85.0, 86.0, 87.0, 88.0, 89.0, 90.0])
+        self.assertEqual(pagina_de_colunas(self.colunas, offset='91')['linhas'], [])
+        self.assertEqual(pagina_de_colunas(self.colunas, offset='500')['linhas'], [])
+        self.assertEqual(pagina_de_colunas(self.colunas, limit=str(LIMITE_MAXIMO))['limit'], LIMITE_MAXIMO)
+
+    def test_limites_invalidos(self):
+        for parametros in ({'offset': '-1'}, {'offset': 'abc'}, {'limit': '0'},
+                           {'limit': str(LIMITE_MAXIMO + 1)}, {'limit': '1.5'}):
+            with self.subTest(**parametros), self.assertRaises(ParametrosPaginaInvalidos):
+                pagina_de_colunas(self.colunas, **parametros)
+
+    def test_selecao_de_colunas(self):
+        pagina = pagina_de_colunas(self.colunas, limit='2', nomes=['Valor', 'Data'])
+        self.assertEqual(pagina['linhas'], [[0.0, '01/12/2023'], [1.0, '02/12/2023']])
+        with self.assertRaises(ParametrosPaginaInvalidos):
+            pagina_de_colunas(self.colunas, nomes=['Vazão'])
+
+    def test_filtro_de_mes(self):
+        pagina = pagina_de_colunas(self.colunas, mes='2024-02')
+        self.assertEqual(pagina['total'], 29)
+        self.assertEqual(pagina['linhas'][0][0], '01/02/2024')
+        self.assertEqual(pagina['linhas'][-1][0], '29/02/2024')
+        # offset e limit valem dentro do mês filtrado
+        pagina = pagina_de_colunas(self.colunas, mes='2024-01', offset='29', limit='10')
+        self.assertEqual(pagina['total'], 31)
+        self.assertEqual([linha[0] for linha in pagina['linhas']], ['30/01/2024', '31/01/2024'])
+        self.assertEqual(pagina_de_colunas(self.colunas, mes='2022-12')['total'], 0)
+
+    def test_filtro_de_mes_invalido(self):
+        for mes in ('2024-13', '2024-1', '01/2024'):
+            with self.subTest(mes=mes), self.assertRaises(ParametrosPaginaInvalidos):
+                pagina_de_colunas(self.colunas, mes=mes)
+        with self.assertRaises(ParametrosPaginaInvalidos):
+            pagina_de_colunas({'Valor': np.arange(3.0)}, mes='2024-01')
+
+
+class CompressaoTests(SimpleTestCase):
+    """
+    Compressão das respostas dinâmicas conforme o Accept-Encoding (pocos_app/compressao.py).
+    """
+
+    HTML = ('<table>' + '<tr><td>01/01/2024</td><td>8:15</td><td>12,345</td></tr>' * 200 + '</table>').encode()
+
+    def responder(self, resposta, accept_encoding=None):
+        cabecalhos = {} if accept_encoding is None else {'HTTP_ACCEPT_ENCODING': accept_encoding}
+        requisicao = RequestFactory().get('/', **cabecalhos)
+        return CompressaoMiddleware(lambda request: resposta)(requisicao)
+
+    def test_codificacao_aceita(self):
+        self.assertEqual(codificacao_aceita('gzip, deflate'), 'gzip')
+        self.assertIsNone(codificacao_aceita(''))
+        self.assertIsNone(codificacao_aceita('identity'))
+        self.assertIsNone(codificacao_aceita('gzip;q=0'))
+        self.assertIsNone(codificacao_aceita('*;q=0'))
+        self.assertEqual(codificacao_aceita('*'), 'br' if compressao.brotli is not None else 'gzip')
+        with mock.patch.object(compressao, 'brotli', object()):
+            self.assertEqual(codificacao_aceita('gzip, br'), 'br')
+            self.assertEqual(codificacao_aceita('br;q=0.5, gzip'), 'gzip')
+        with mock.patch.object(compressao, 'brotli', None):
+            self.assertEqual(codificacao_aceita('br, gzip'), 'gzip')
+            self.assertIsNone(codificacao_aceita('br'))
+
+    def test_comprime_html_com_gzip(self):
+        resposta = HttpResponse(self.HTML, content_type='text/html; charset=utf-8')
+        resposta['ETag'] = '"abc"'
+        resposta = self.responder(resposta, 'gzip')
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resposta.content), self.HTML)
+        self.assertEqual(resposta['Content-Length'], str(len(resposta.content)))
+        self.assertIn('Accept-Encoding', resposta['Vary'])
+        self.assertEqual(resposta['ETag'], 'W/"abc"')
+
+    def test_sem_accept_encoding_nao_comprime(self):
+        for accept_encoding in (None, 'identity', 'gzip;q=0'):
+            with self.subTest(accept_encoding=accept_encoding):
+                resposta = self.responder(HttpResponse(self.HTML, content_type='text/html'), accept_encoding)
+                self.assertFalse(resposta.has_header('Content-Encoding'))
+                self.assertEqual(resposta.content, self.HTML)
+                self.assertIn('Accept-Encoding', resposta['Vary'])
+
+    def test_resposta_pequena_nao_comprime(self):
+        resposta = self.responder(HttpResponse(b'{"total": 0}', content_type='application/json'), 'gzip')
+        self.assertFalse(resposta.has_header('Content-Encoding'))
+        self.assertEqual(resposta.content, b'{"total": 0}')
+
+    def test_tipos_nao_textuais_e_ja_codificados_nao_comprimem(self):
+        planilha = FileResponse(io.BytesIO(b'PK' + b'0' * 5000), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        resposta = self.responder(planilha, 'gzip')
+        self.assertFalse(resposta.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(resposta.streaming_content), b'PK' + b'0' * 5000)
+
+        codificada = HttpResponse(self.HTML, content_type='text/html')
+        codificada['Content-Encoding'] = 'br'
+        self.assertEqual(self.responder(codificada, 'gzip').content, self.HTML)
+
+    def test_streaming_assincrono_nao_comprime(self):
+        async def blocos():
+            yield self.HTML
+
+        resposta = self.responder(StreamingHttpResponse(blocos(), content_type='text/csv'), 'gzip')
+        self.assertFalse(resposta.has_header('Content-Encoding'))
+
+    def test_streaming_textual_comprime_bloco_a_bloco(self):
+        blocos = [self.HTML[:3000], self.HTML[3000:]]
+        resposta = StreamingHttpResponse(iter(blocos), content_type='text/csv; charset=utf-8')
+        resposta['Content-Length'] = str(len(self.HTML))
+        resposta = self.responder(resposta, 'gzip')
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertFalse(resposta.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(resposta.streaming_content)), self.HTML)
+
+
+class AcessoExportacoesTests(TestCase):
+    """
+    Consulta e download de exportações em segundo plano exigem o módulo da view que as iniciou.
+    """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('operador')
+        modulo = Modulo.objects.create(nome='Gerar Tabela de Consumo')
+        self.permissao = PermissaoModulo.objects.create(usuario=self.usuario, modulo=modulo)
+        # Descartada antes de começar: nenhum arquivo é gravado
+        self.tarefa = obter_fila().enfileirar(
+            lambda tarefa, destino: None, 'dados_poco.xlsx', 'application/octet-stream',
+            valida=lambda: False, nome_modulo='Gerar Tabela de Consumo',
+        )
+        self.client.force_login(self.usuario)
+        sessao = self.client.session
+        sessao['exportacoes'] = [self.tarefa.id]
+        sessao.save()
+
+    def test_usuario_com_acesso_consulta_a_exportacao(self):
+        resposta = self.client.get(reverse('status_exportacao', args=[self.tarefa.id]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['id'], self.tarefa.id)
+
+    def test_acesso_revogado_bloqueia_consulta_e_download(self):
+        self.permissao.delete()
+        for nome_url in ('status_exportacao', 'baixar_exportacao'):
+            resposta = self.client.get(reverse(nome_url, args=[self.tarefa.id]))
+            self.assertRedirects(resposta, reverse('menu_principal'), fetch_redirect_response=False)
+
+    def test_exportacao_de_outra_sessao_nao_encontrada(self):
+        self.client.logout()
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('status_exportacao', args=[self.tarefa.id]))
+        self.assertEqual(resposta.status_code, 404)
+
+
+class TabelaConsumoViewTests(TestCase):
+    """
+    Parâmetros que a alocação não consegue distribuir voltam ao formulário em vez de gerar um erro 500.
+    """
+
+    def setUp(self):
+        usuario = User.objects.create_user('operador')
+        modulo = Modulo.objects.create(nome='Gerar Tabela de Consumo')
+        PermissaoModulo.objects.create(usuario=usuario, modulo=modulo)
+        self.client.force_login(usuario)
+
+    @mock.patch('pocos_app.utils.gerar_tabela_dados', side_effect=ValueError('Impossível distribuir 10 unidades.'))
+    def test_geracao_inviavel_volta_ao_formulario(self, _):
+        resposta = self.client.post(reverse('gerar_tabela_consumo_process'), dados_formulario(semente='918273'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTemplateUsed(resposta, 'pocos_app/index.html')
+        self.assertIn('Impossível distribuir 10 unidades.', resposta.context['form'].non_field_errors()[0])
+        self.assertNotIn('parametros', self.client.session)
+
+    @mock.patch('pocos_app.utils.gerar_tabela_dados', side_effect=ValueError('Impossível distribuir 10 unidades.'))
+    def test_regeneracao_inviavel_na_exportacao_volta_ao_formulario(self, _):
+        form = ParametrosForm(dados_formulario(semente='918274'))
+        self.assertTrue(form.is_valid())
+        sessao = self.client.session
+        sessao['parametros'] = _parametros_para_sessao(form.cleaned_data)
+        sessao.save()
+        resposta = self.client.get(reverse('exportar_dados', args=['csv']))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTemplateUsed(resposta, 'pocos_app/index.html')
+        self.assertIn('Impossível distribuir 10 unidades.', resposta.context['form'].non_field_errors()[0])
+
+
+class ArmazenamentoTests(SimpleTestCase):
+    """
+    Armazenamento colunar em disco: leitura por memory-map, TTL, LRU por tamanho e gravação atômica.
+    """
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+        self.armazenamento = ArmazenamentoResultados(self.diretorio, ttl=60, max_bytes=10 ** 9)
+
+    def tabela(self, linhas=10):
+        return pd.DataFrame({
+            'Data': [f'{dia:02d}/01/2024' for dia in range(1, linhas + 1)],
+            'Volume': np.arange(linhas, dtype=float),
+            'NE': [None] * (linhas - 1) + [10.5],
+        })
+
+    def envelhecer(self, chave, segundos):
+        # O último acesso de um resultado é o mtime do seu meta.json
+        caminho = os.path.join(self.diretorio, chave, 'meta.json')
+        instante = time.time() - segundos
+        os.utime(caminho, (instante, instante))
+
+    def test_colunas_lidas_por_memory_map(self):
+        chave = self.armazenamento.salvar({'consumo': self.tabela()}, {'semente': 1})
+        colunas = self.armazenamento.colunas(chave, 'consumo')
+        self.assertEqual(list(colunas), ['Data', 'Volume', 'NE'])
+        self.assertIsInstance(colunas['Volume'], np.memmap)
+        self.assertFalse(colunas['Volume'].flags.writeable)
+        self.assertEqual(colunas['Data'][0], '01/01/2024')
+        self.assertTrue(np.isnan(colunas['NE'][0]))
+        self.assertEqual(self.armazenamento.carregar(chave, 'consumo')['NE'].iloc[-1], 10.5)
+        self.assertEqual(self.armazenamento.metadados(chave), {'semente': 1})
+        self.assertIsNone(self.armazenamento.colunas(chave, 'outra'))
+
+    def test_chaves_invalidas_sao_ignoradas(self):
+        os.makedirs(os.path.join(self.diretorio, 'fora'))
+        for chave in (None, '', '..', '../fora', 'curta', 'a' * 65):
+            self.assertIsNone(self.armazenamento.colunas(chave, 'consumo'))
+            self.armazenamento.remover(chave)
+        self.assertTrue(os.path.isdir(os.path.join(self.diretorio, 'fora')))
+
+    def test_resultado_expira_apos_o_ttl(self):
+        chave = self.armazenamento.salvar({'consumo': self.tabela()})
+        self.envelhecer(chave, 30)
+        self.assertIsNotNone(self.armazenamento.colunas(chave, 'consumo'))
+        # A leitura renovou o acesso; sem acesso por mais de um TTL, o resultado expira
+        self.envelhecer(chave, 61)
+        self.assertIsNone(self.armazenamento.colunas(chave, 'consumo'))
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, chave)))
+
+    def test_limpeza_remove_os_menos_usados_recentemente(self):
+        chaves = [self.armazenamento.salvar({'consumo': self.tabela(1000)}) for _ in range(3)]
+        tamanho = sum(entrada.stat().st_size for entrada in os.scandir(os.path.join(self.diretorio, chaves[0])))
+        for segundos, chave in zip((30, 10, 20), chaves):
+            self.envelhecer(chave, segundos)
+        self.armazenamento.max_bytes = 2 * tamanho
+        self.armazenamento.limpar()
+        self.assertEqual(sorted(os.listdir(self.diretorio)), sorted(chaves[1:]))
+
+    def test_limpeza_ao_gravar_e_limitada_pelo_intervalo(self):
+        armazenamento = ArmazenamentoResultados(self.diretorio, ttl=60, max_bytes=10 ** 9, intervalo_limpeza=60)
+        with mock.patch.object(armazenamento, 'limpar', wraps=armazenamento.limpar) as limpar:
+            for _ in range(3):
+                armazenamento.salvar({'consumo': self.tabela()})
+            self.assertEqual(limpar.call_count, 1)
+            armazenamento._ultima_limpeza -= 60
+            armazenamento.salvar({'consumo': self.tabela()})
+            self.assertEqual(limpar.call_count, 2)
+
+    def test_gravacao_interrompida_nao_deixa_resultado(self):
+        def escrever(destino):
+            destino.write(b'parcial')
+            raise RuntimeError('falha na exportação')
+
+        with self.assertRaises(RuntimeError):
+            self.armazenamento.salvar_arquivo(escrever)
+        self.assertEqual(os.listdir(self.diretorio), [])
+
+    def test_anexo_de_resultado_removido_durante_a_gravacao(self):
+        chave = self.armazenamento.salvar({'consumo': self.tabela()})
+
+        def escrever(destino):
+            destino.write(b'PK')
+            self.armazenamento.remover(chave)
+
+        self.assertIsNone(self.armazenamento.anexar_arquivo(chave, 'xlsx', escrever))
+        self.assertEqual(os.listdir(self.diretorio), [])
+
+    def test_anexo_visivel_apos_a_gravacao(self):
+        chave = self.armazenamento.salvar({'consumo': self.tabela()})
+        self.assertIsNone(self.armazenamento.caminho_anexo(chave, 'xlsx'))
+        caminho = self.armazenamento.anexar_arquivo(chave, 'xlsx', lambda destino: destino.write(b'PK'))
+        self.assertEqual(self.armazenamento.caminho_anexo(chave, 'xlsx'), caminho)
+        with open(caminho, 'rb') as arquivo:
+            self.assertEqual(arquivo.read(), b'PK')
+        self.assertFalse([nome for nome in os.listdir(os.path.dirname(caminho)) if nome.startswith('.tmp-')])
+
+
+class CacheResultadosTests(SimpleTestCase):
+    """
+    Cache LRU por tamanho (cache_resultados.py) e chave canônica dos parâmetros.
+    """
+
+    def test_remove_os_menos_usados_recentemente_pelo_tamanho(self):
+        cache = CacheResultados(max_bytes=300, max_item_bytes=200)
+        cache.guardar('a', b'a' * 100)
+        cache.guardar('b', b'b' * 100)
+        self.assertEqual(cache.obter('a'), b'a' * 100)
+        cache.guardar('c', b'c' * 150)
+        # 'b' é o menos usado recentemente: 'a' foi lido depois de guardado
+        self.assertIsNone(cache.obter('b'))
+        self.assertIsNotNone(cache.obter('a'))
+        self.assertEqual(cache.estatisticas()['bytes'], 250)
+
+    def test_substituir_item_atualiza_o_tamanho(self):
+        cache = CacheResultados(max_bytes=300)
+        cache.guardar('a', b'a' * 50)
+        cache.guardar('a', b'a' * 70)
+        self.assertEqual(cache.estatisticas(), {'acertos': 0, 'faltas': 0, 'itens': 1, 'bytes': 70})
+
+    def test_itens_maiores_que_o_limite_nao_sao_guardados(self):
+        cache = CacheResultados(max_bytes=1000, max_item_bytes=100)
+        self.assertTrue(cache.aceita(100))
+        self.assertFalse(cache.aceita(101))
+        cache.guardar('grande', b'x' * 101)
+        self.assertIsNone(cache.obter('grande'))
+        self.assertEqual(cache.estatisticas()['itens'], 0)
+        # Por padrão, o limite por item é 1/4 do cache
+        self.assertEqual(CacheResultados(max_bytes=1000).max_item_bytes, 250)
+
+    def test_contadores_de_acertos_e_faltas(self):
+        cache = CacheResultados(max_bytes=1000)
+        cache.obter('a')
+        cache.guardar('a', b'a')
+        cache.obter('a')
+        cache.obter('a')
+        estatisticas = cache.estatisticas()
+        self.assertEqual((estatisticas['acertos'], estatisticas['faltas']), (2, 1))
+
+    def test_chave_estavel_para_parametros_equivalentes(self):
+        parametros = parametros_consumo()
+        equivalentes = dict(reversed(list(parametros.items())))
+        equivalentes['meses_selecionados'] = list(reversed(parametros['meses_selecionados']))
+        # Parâmetros recuperados da sessão trazem as datas como strings ISO
+        equivalentes['data_inicio'] = parametros['data_inicio'].isoformat()
+        self.assertEqual(chave_parametros(parametros), chave_parametros(equivalentes))
+        self.assertNotEqual(chave_parametros(parametros), chave_parametros(parametros_consumo(semente=124)))
+        self.assertNotEqual(chave_parametros(parametros), chave_parametros(parametros_consumo(data_fim=date(2024, 12, 30))))
+
+    def test_registro_da_geracao_inclui_os_contadores_do_cache(self):
+        with self.assertLogs('pocos_app.geracao', 'INFO') as registros:
+            with registro_geracao('tabela_consumo', semente=1) as registro:
+                registro['cache'] = obter_cache().obter(('tabela', 'inexistente')) is not None
+        campos = registros.records[0].campos
+        self.assertEqual(campos['tipo'], 'tabela_consumo')
+        self.assertFalse(campos['cache'])
+        self.assertGreaterEqual(campos['cache_faltas'], 1)
+        self.assertLessEqual({'cache_acertos', 'cache_itens', 'cache_bytes'}, set(campos))
+
+
+class MedicaoTests(TestCase):
+    """
+    Medição das requisições por etapa (Server-Timing) e das consultas ao banco.
+    """
+
+    def test_formato_do_cabecalho_server_timing(self):
+        cabecalho = cabecalho_server_timing({'db': [0.0012, 3], 'geracao': [0.5, 1]}, 0.0123)
+        self.assertEqual(cabecalho, 'total;dur=12.3, db;dur=1.2;desc="3 consultas", geracao;dur=500.0')
+
+    def test_middleware_mede_etapas_e_consultas(self):
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            with medir('html'):
+                return HttpResponse('ok')
+
+        with self.assertLogs('pocos_app.medicao', 'INFO') as registros:
+            resposta = MedicaoTempoMiddleware(view)(RequestFactory().get('/dados/consumo/'))
+        partes = [parte.split(';')[0] for parte in resposta['Server-Timing'].split(', ')]
+        self.assertEqual(partes, ['total', 'db', 'html'])
+        self.assertIn('db;dur=', resposta['Server-Timing'])
+        self.assertIn('desc="2 consultas"', resposta['Server-Timing'])
+        campos = registros.records[0].campos
+        self.assertEqual((campos['caminho'], campos['status'], campos['db_consultas']), ('/dados/consumo/', 200, 2))
+        self.assertIn('html_ms', campos)
+        self.assertIsNone(_medicao_atual.get())
+
+    def test_medir_fora_de_uma_requisicao_nao_faz_nada(self):
+        with medir('geracao'):
+            User.objects.count()
+        self.assertIsNone(_medicao_atual.get())
+
+
+class RegistroTests(SimpleTestCase):
+    """
+    Registro estruturado e amostrado (registro.py).
+    """
+
+    logger = logging.getLogger('pocos_app.testes')
+
+    def test_campos_formatados_como_chave_valor(self):
+        with self.assertLogs(self.logger, 'INFO') as registros:
+            registrar(self.logger, 'geracao', linhas=10, duracao_ms=12.345, tipo='com espaço', cache=True)
+        self.assertEqual(registros.records[0].getMessage(), 'evento=geracao linhas=10 duracao_ms=12.3 tipo="com espaço" cache=True')
+        self.assertEqual(registros.records[0].evento, 'geracao')
+        self.assertEqual(registros.records[0].campos['linhas'], 10)
+
+    @override_settings(POCOS_LOG_AMOSTRAGEM={'requisicao': 0.25})
+    def test_amostragem_por_evento(self):
+        with mock.patch('pocos_app.registro.random.random', return_value=0.3):
+            with self.assertNoLogs(self.logger, 'INFO'):
+                registrar(self.logger, 'requisicao', status=200)
+            # Eventos sem taxa configurada são sempre registrados
+            with self.assertLogs(self.logger, 'INFO'):
+                registrar(self.logger, 'geracao', linhas=1)
+        with mock.patch('pocos_app.registro.random.random', return_value=0.2):
+            with self.assertLogs(self.logger, 'INFO'):
+                registrar(self.logger, 'requisicao', status=200)
+
+    @override_settings(POCOS_LOG_AMOSTRAGEM={'requisicao': 0.0, 'distribuicao_impossivel': 0.0})
+    def test_avisos_e_erros_nunca_sao_amostrados(self):
+        with self.assertLogs(self.logger, 'WARNING') as registros:
+            registrar(self.logger, 'distribuicao_impossivel', logging.WARNING, total=10)
+            registrar(self.logger, 'requisicao', logging.ERROR, status=500)
+        self.assertEqual([registro.levelno for registro in registros.records], [logging.WARNING, logging.ERROR])
+
+    def test_nivel_desabilitado_nao_monta_o_registro(self):
+        self.logger.setLevel(logging.WARNING)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+        with mock.patch('pocos_app.registro.taxa_amostragem') as taxa, mock.patch.object(self.logger, 'log') as log:
+            registrar(self.logger, 'geracao', linhas=1)
+        taxa.assert_not_called()
+        log.assert_not_called()
+
+
+class RenderizacaoTests(SimpleTestCase):
+    """
+    Formatação das tabelas HTML com as mesmas casas decimais e o mesmo arredondamento da planilha.
+    """
+
+    def test_casas_decimais_iguais_aos_formatos_da_planilha(self):
+        for cabecalho, formato in zip(CABECALHOS_XLSX, FORMATOS_XLSX):
+            if formato is not None:
+                self.assertEqual(CASAS_CONSUMO[cabecalho], len(formato.split('.')[1]), cabecalho)
+
+    def test_meio_para_longe_do_zero(self):
+        valores = [1.235, 2.675, 1.005, -1.235, -2.675, 0.125, 1234567.125, -0.004, 0.0]
+        self.assertEqual(
+            formatar_decimais(valores, 2).tolist(),
+            ['1.24', '2.68', '1.01', '-1.24', '-2.68', '0.13', '1234567.13', '0.00', '0.00'],
+        )
+        self.assertEqual(formatar_decimais([0.0005, 9.9995, -7.5], 3).tolist(), ['0.001', '10.000', '-7.500'])
+        self.assertEqual(formatar_decimais([2.5, -2.5, 3.49], 0).tolist(), ['3', '-3', '3'])
+
+    def test_igual_ao_arredondamento_decimal_dos_valores_com_3_casas(self):
+        # Valores como os da tabela (milésimos exatos) formatados com 2 casas, como "0.00" no Excel
+        valores = np.random.default_rng(8).integers(-10 ** 7, 10 ** 7, 5000) / 1000
+        esperados = [str(Decimal(repr(valor)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)) for valor in valores.tolist()]
+        esperados = ['0.00' if esperado == '-0.00' else esperado for esperado in esperados]
+        self.assertEqual(formatar_decimais(valores, 2).tolist(), esperados)
+
+    def test_nan_vira_celula_vazia(self):
+        self.assertEqual(formatar_decimais([np.nan, 1.5], 2).tolist(), ['', '1.50'])
+        html = renderizar_tabela({'Nível Estático (NE)': np.array([np.nan, 10.0])}, CASAS_CONSUMO)
+        self.assertIn('<tr><td></td></tr><tr><td>10.00</td></tr>', html)
+
+    def test_texto_e_cabecalhos_escapados(self):
+        html = renderizar_tabela({
+            'Observação <i>': np.array(['<script>alert(1)</script>', 'A & B', None], dtype=object),
+            'Valor': np.array([1.0, 2.0, 3.0]),
+            'Linhas': np.array([1, 2, 3]),
+        }, CASAS_CONSUMO, classes='table "x"')
+        self.assertNotIn('<script>', html)
+        self.assertIn('<td>&lt;script&gt;alert(1)&lt;/script&gt;</td>', html)
+        self.assertIn('<td>A &amp; B</td>', html)
+        self.assertIn('<th>Observação &lt;i&gt;</th>', html)
+        self.assertIn('<th data-casas="2">Valor</th><th>Linhas</th>', html)
+        self.assertIn('<tr><td></td><td>3.00</td><td>3</td></tr>', html)
+        self.assertIn('class="table &quot;x&quot;"', html)
+
+
+class ExportacoesEspeculativasTests(TestCase):
+    """
+    Planilhas montadas de forma especulativa: limite de tarefas simultâneas, descarte e download do anexo.
+    """
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.armazenamento = ArmazenamentoResultados(diretorio.name, ttl=60, max_bytes=10 ** 9)
+        patcher = mock.patch('pocos_app.armazenamento._armazenamento', self.armazenamento)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def esperar(self, tarefa):
+        limite = time.monotonic() + 5
+        while tarefa.concluida_em is None and time.monotonic() < limite:
+            time.sleep(0.01)
+        self.assertIsNotNone(tarefa.concluida_em)
+
+    def test_sessao_expirada_nao_esta_ativa(self):
+        sessao = SessionStore()
+        sessao['resultado_id'] = 'x'
+        sessao.create()
+        self.assertTrue(sessao_ativa(sessao.session_key))
+        # Expirada, mas ainda não apagada por clearsessions
+        Session.objects.filter(session_key=sessao.session_key).update(expire_date=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(sessao_ativa(sessao.session_key))
+        self.assertFalse(sessao_ativa('inexistente'))
+
+    def test_limite_de_tarefas_especulativas(self):
+        fila = FilaExportacoes(max_workers=2, ttl=60, max_especulativas=1)
+        liberar = threading.Event()
+        # A validação segura a primeira tarefa em execução e então a descarta
+        primeira = fila.enfileirar(
+            lambda tarefa, destino: None, 'a.xlsx', 'application/octet-stream',
+            especulativa=True, valida=lambda: liberar.wait(5) and False,
+        )
+        self.assertIsNotNone(primeira)
+        self.assertIsNone(fila.enfileirar(lambda tarefa, destino: None, 'b.xlsx', 'application/octet-stream', especulativa=True))
+        # O limite vale só para as especulativas
+        comum = fila.enfileirar(lambda tarefa, destino: destino.write(b'ok'), 'c.xlsx', 'application/octet-stream')
+        self.esperar(comum)
+        self.assertEqual(comum.estado, CONCLUIDA)
+        liberar.set()
+        self.esperar(primeira)
+        self.assertEqual(primeira.estado, DESCARTADA)
+        self.assertIsNotNone(fila.enfileirar(
+            lambda tarefa, destino: None, 'd.xlsx', 'application/octet-stream', especulativa=True, valida=lambda: False,
+        ))
+
+    def test_tarefa_descartada_sem_resultado(self):
+        fila = FilaExportacoes(max_workers=1, ttl=60)
+        exportar = mock.Mock()
+        tarefa = fila.enfileirar(exportar, 'a.xlsx', 'application/octet-stream', anexo=('resultadoinexistente0', 'xlsx'), especulativa=True)
+        self.esperar(tarefa)
+        self.assertEqual(tarefa.estado, DESCARTADA)
+        exportar.assert_not_called()
+        self.assertIsNone(tarefa.chave_arquivo)
+
+    def test_exportacao_serve_a_planilha_preparada(self):
+        usuario = User.objects.create_user('operador')
+        PermissaoModulo.objects.create(usuario=usuario, modulo=Modulo.objects.create(nome='Gerar Tabela de Consumo'))
+        self.client.force_login(usuario)
+        form = ParametrosForm(dados_formulario(semente='918275'))
+        self.assertTrue(form.is_valid())
+        resultado_id = self.armazenamento.salvar({'consumo': pd.DataFrame({'Valor': [1.0]})})
+        self.armazenamento.anexar_arquivo(resultado_id, 'xlsx', lambda destino: destino.write(b'PK planilha'))
+        sessao = self.client.session
+        sessao['parametros'] = _parametros_para_sessao(form.cleaned_data)
+        sessao['resultado_id'] = resultado_id
+        sessao.save()
+
+        with mock.patch('pocos_app.utils.escrever_xlsx') as escrever:
+            resposta = self.client.get(reverse('exportar_xlsx'))
+            self.assertEqual(b''.join(resposta.streaming_content), b'PK planilha')
+            self.assertIn('dados_poco.xlsx', resposta['Content-Disposition'])
+            resposta = self.client.get(reverse('exportar_xlsx'), {'assincrono': '1'})
+            self.assertEqual(resposta.json()['estado'], 'concluida')
+        escrever.assert_not_called()
+
+
+class FormatosTests(SimpleTestCase):
+    """
+    Convenções do CSV (as mesmas da planilha) e tipos das colunas no Parquet/Arrow.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Virada de mês: NE/ND apenas em 31/01/2024
+        cls.df = gerar_tabela_dados(parametros_consumo(
+            data_inicio=date(2024, 1, 30), data_fim=date(2024, 2, 2),
+            horimetro_final=1010.5, hidrometro_final=20050.25,
+        ))
+
+    def linhas_csv(self, df):
+        texto = b''.join(gerar_csv(df)).decode('utf-8')
+        self.assertTrue(texto.endswith('\r\n'))
+        return [linha.split(';') for linha in texto.split('\r\n')[:-1]]
+
+    def test_cabecalho_e_separador(self):
+        linhas = self.linhas_csv(self.df)
+        self.assertEqual(linhas[0], list(self.df.columns))
+        self.assertEqual(len(linhas), len(self.df) + 1)
+        self.assertTrue(all(len(linha) == len(self.df.columns) for linha in linhas))
+
+    def test_datas_virgula_decimal_e_casas_por_coluna(self):
+        cabecalho, *linhas = self.linhas_csv(self.df)
+        self.assertEqual([linha[0] for linha in linhas], ['30/01/2024', '31/01/2024', '01/02/2024', '02/02/2024'])
+        for nome, casas in CASAS_CONSUMO.items():
+            coluna = cabecalho.index(nome)
+            for linha, valor in zip(linhas, self.df[nome]):
+                if pd.isna(valor):
+                    continue
+                inteiro, _, decimais = linha[coluna].partition(',')
+                self.assertNotIn('.', linha[coluna])
+                self.assertEqual(len(decimais), casas, nome)
+                self.assertAlmostEqual(float(f'{inteiro}.{decimais}'), valor, delta=10 ** -casas / 2 + 1e-9)
+        self.assertEqual(linhas[-1][cabecalho.index('Horimetro')], '1010,500')
+        self.assertEqual(linhas[-1][cabecalho.index('Medidor de Vazão')], '20050,250')
+
+    def test_niveis_vazios_fora_do_fim_do_mes(self):
+        cabecalho, *linhas = self.linhas_csv(self.df)
+        ne, nd = cabecalho.index('Nível Estático (NE)'), cabecalho.index('Nível Dinâmico (ND)')
+        self.assertEqual([(linha[ne], linha[nd]) for linha in linhas], [('', ''), ('10,00', '20,00'), ('', ''), ('', '')])
+
+    def test_blocos_de_linhas(self):
+        with mock.patch('pocos_app.formatos.LINHAS_POR_BLOCO_CSV', 3):
+            blocos = list(gerar_csv(self.df))
+        self.assertEqual(len(blocos), 2)
+        self.assertEqual(b''.join(blocos), b''.join(gerar_csv(self.df)))
+        self.assertEqual(list(gerar_csv(self.df.iloc[:0])), [(';'.join(self.df.columns) + '\r\n').encode('utf-8')])
+
+    @skipUnless(parquet_disponivel(), 'pyarrow não instalado')
+    def test_tipos_das_colunas_arrow(self):
+        import pyarrow as pa
+
+        tabela = tabela_arrow(self.df)
+        self.assertEqual(tabela.schema.field('Data').type, pa.date32())
+        for nome in CASAS_CONSUMO:
+            self.assertEqual(tabela.schema.field(nome).type, pa.float64(), nome)
+        self.assertTrue(pa.types.is_dictionary(tabela.schema.field('Unidade').type))
+        self.assertEqual(tabela.schema.field('Hora').type, pa.string())
+        self.assertEqual(tabela.column('Data').to_pylist(), [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 2)])
+        self.assertEqual(tabela.column('Nível Estático (NE)').to_pylist(), [None, 10.0, None, None])
+
+    @skipUnless(parquet_disponivel(), 'pyarrow não instalado')
+    def test_leitura_do_parquet_e_do_arrow(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esperada = tabela_arrow(self.df)
+        destino = io.BytesIO()
+        escrever_parquet(self.df, destino)
+        self.assertTrue(pq.read_table(io.BytesIO(destino.getvalue())).equals(esperada))
+        destino = io.BytesIO()
+        escrever_arrow(self.df, destino)
+        self.assertTrue(pa.ipc.open_file(io.BytesIO(destino.getvalue())).read_all().equals(esperada))
+
+
+class ExportacaoCsvViewTests(TestCase):
+    """
+    O registro da geração do CSV em streaming inclui a formatação das linhas.
+    """
+
+    def test_registro_gravado_ao_final_do_envio(self):
+        usuario = User.objects.create_user('operador')
+        modulo = Modulo.objects.create(nome='Gerar Tabela de Consumo')
+        PermissaoModulo.objects.create(usuario=usuario, modulo=modulo)
+        self.client.force_login(usuario)
+        form = ParametrosForm(dados_formulario(semente='918275'))
+        self.assertTrue(form.is_valid())
+        sessao = self.client.session
+        sessao['parametros'] = _parametros_para_sessao(form.cleaned_data)
+        sessao.save()
+        with self.assertLogs('pocos_app.geracao', 'INFO') as registros:
+            resposta = self.client.get(reverse('exportar_dados', args=['csv']))
+            tipos = [registro.campos.get('tipo') for registro in registros.records]
+            self.assertNotIn('csv_consumo', tipos)
+            conteudo = b''.join(resposta.streaming_content)
+        self.assertTrue(conteudo.startswith(b'Data;Hora;'))
+        self.assertEqual(registros.records[-1].campos['tipo'], 'csv_consumo')
@@ -6,7 +6,12 @@ urlpatterns = [
     path('gerar-tabela/', views.gerar_tabela_consumo_view, name='gerar_tabela_consumo'),
     path('gerar-tabela/process/', views.gerar_tabela_consumo_process, name='gerar_tabela_consumo_process'),
     path('exportar-xlsx/', views.exportar_xlsx, name='exportar_xlsx'),
+    path('exportar/<str:formato>/', views.exportar_dados, name='exportar_dados'),
     path('teste-bombeamento/', views.teste_bombeamento_view, name='teste_bombeamento'),
     path('teste-bombeamento/process/', views.teste_bombeamento_process, name='teste_bombeamento_process'),
     path('teste-bombeamento/exportar-xlsx/', views.exportar_teste_xlsx, name='exportar_teste_xlsx'),
+    path('dados/consumo/', views.dados_consumo, name='dados_consumo'),
+    path('dados/teste/<str:tabela>/', views.dados_teste, name='dados_teste'),
+    path('exportacoes/<str:tarefa_id>/', views.status_exportacao, name='status_exportacao'),
+    path('exportacoes/<str:tarefa_id>/arquivo/', views.baixar_exportacao, name='baixar_exportacao'),
 ]
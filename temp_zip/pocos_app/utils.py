@@ -1,13 +1,85 @@
-import random
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta, time, date
-import calendar
 import io
+import logging
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
 from openpyxl.worksheet.properties import WorksheetProperties, PageSetupProperties
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import get_column_letter, column_index_from_string
+from .alocacao import alocar_aleatorio, alocar_tempo_e_volume_inteiros, apportionar_maior_resto, limites_inteiros
+from .aleatorio import obter_gerador
+from .registro import registrar
+
+logger = logging.getLogger(__name__)
+
+# Mapeamento dos códigos de mês usados no formulário para o número do mês
+MESES_MAP = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12
+}
+
+def dias_do_periodo(data_inicio, data_fim):
+    """
+    Gera todos os dias do período como um array numpy (datetime64[D]).
+    
+    Args:
+        data_inicio: Data de início (objeto date)
+        data_fim: Data de fim (objeto date), inclusive
+        
+    Returns:
+        Array numpy datetime64[D] com um elemento por dia (vazio se data_fim < data_inicio)
+    """
+    inicio = np.datetime64(data_inicio, "D")
+    fim = np.datetime64(data_fim, "D")
+    return np.arange(inicio, fim + 1, dtype="datetime64[D]")
+
+def mascara_meses_selecionados(dias, meses_selecionados):
+    """
+    Indica, para cada dia, se o seu mês está entre os meses selecionados.
+    
+    Args:
+        dias: Array numpy datetime64[D]
+        meses_selecionados: Lista de códigos de meses selecionados (ex: ["jan", "fev"])
+        
+    Returns:
+        Array booleano com o mesmo tamanho de dias
+    """
+    meses = dias.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    numeros = [MESES_MAP[codigo] for codigo in meses_selecionados if codigo in MESES_MAP]
+    return np.isin(meses, numeros)
+
+def mascara_consumo(dias, meses_selecionados, registrar_sabados=True, registrar_domingos=True):
+    """
+    Indica quais dias terão consumo (mês selecionado E dia da semana selecionado).
+    
+    Args:
+        dias: Array numpy datetime64[D]
+        meses_selecionados: Lista de códigos de meses selecionados
+        registrar_sabados: Se os sábados devem receber consumo
+        registrar_domingos: Se os domingos devem receber consumo
+        
+    Returns:
+        Array booleano com o mesmo tamanho de dias
+    """
+    mascara = mascara_meses_selecionados(dias, meses_selecionados)
+    # 1970-01-01 foi uma quinta-feira: (dias desde a época + 3) % 7 dá 0 (segunda) a 6 (domingo)
+    dia_semana = (dias.astype(np.int64) + 3) % 7
+    if not registrar_sabados:
+        mascara &= dia_semana != 5
+    if not registrar_domingos:
+        mascara &= dia_semana != 6
+    return mascara
+
+def formatar_datas(dias):
+    """
+    Formata um array datetime64[D] como strings DD/MM/AAAA sem laço por dia.
+    """
+    iso = np.datetime_as_string(dias, unit="D").astype("U10")
+    # Reordena os caracteres de AAAA-MM-DD para DD/MM/AAAA
+    caracteres = iso.view("U1").reshape(-1, 10)[:, [8, 9, 4, 5, 6, 7, 0, 1, 2, 3]]
+    caracteres[:, [2, 5]] = "/"
+    return np.ascontiguousarray(caracteres).view("U10").ravel()
 
 def gerar_datas_periodo(data_inicio, data_fim, meses_selecionados):
     """
@@ -21,36 +93,12 @@ def gerar_datas_periodo(data_inicio, data_fim, meses_selecionados):
     Returns:
         Lista de tuplas (data, mes_selecionado) ordenadas
     """
-    datas = []
-    
-    # Converter códigos de mês para números
-    meses_map = {
-        "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
-        "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12
-    }
-    
-    # Iterar através de todas as datas do período
-    data_atual = data_inicio
-    while data_atual <= data_fim:
-        # Verificar se o mês está selecionado
-        mes_codigo = None
-        for codigo, num in meses_map.items():
-            if num == data_atual.month:
-                mes_codigo = codigo
-                break
-        
-        mes_selecionado = mes_codigo in meses_selecionados if mes_codigo else False
-        
-        # Converter date para datetime para compatibilidade
-        data_datetime = datetime.combine(data_atual, datetime.min.time())
-        datas.append((data_datetime, mes_selecionado))
-        
-        # Avançar para o próximo dia
-        data_atual += timedelta(days=1)
-    
-    return datas
+    dias = dias_do_periodo(data_inicio, data_fim)
+    selecionados = mascara_meses_selecionados(dias, meses_selecionados)
+    # datetime64[s].tolist() devolve objetos datetime (compatibilidade com o formato anterior)
+    return list(zip(dias.astype("datetime64[s]").tolist(), selecionados.tolist()))
 
-def distribuir_valores(total, num_valores, max_valor):
+def distribuir_valores(total, num_valores, max_valor, rng=None):
     """
     Distribui um valor total em um número específico de valores aleatórios,
     respeitando um valor máximo por item.
@@ -59,9 +107,10 @@ def distribuir_valores(total, num_valores, max_valor):
         total: Valor total a ser distribuído
         num_valores: Número de valores a gerar
         max_valor: Valor máximo por item
+        rng: Semente ou numpy.random.Generator (ver aleatorio.obter_gerador)
         
     Returns:
-        Lista de valores que somam o total
+        Lista de valores com 3 casas decimais que somam exatamente o total (em milésimos)
     """
     if num_valores <= 0:
         return []
@@ -75,7 +124,8 @@ def distribuir_valores(total, num_valores, max_valor):
 
     if max_valor * num_valores < total:
         # Se não for possível distribuir, retorna valores proporcionais até o máximo
-        print(f"Aviso: Impossível distribuir {total} em {num_valores} valores com máximo de {max_valor}. Distribuindo proporcionalmente até o máximo.")
+        registrar(logger, 'distribuicao_impossivel', logging.WARNING,
+                  total=total, num_valores=num_valores, max_valor=max_valor)
         valor_medio = total / num_valores
         if valor_medio > max_valor:
              return [max_valor] * num_valores
@@ -83,59 +133,28 @@ def distribuir_valores(total, num_valores, max_valor):
         # Isso não deveria acontecer pela condição inicial, mas por segurança:
         return [min(valor_medio, max_valor)] * num_valores
 
-    # Tentar gerar valores aleatórios que somem o total
-    valores = np.random.rand(num_valores)
-    valores = valores / np.sum(valores) * total
-    
-    # Ajustar valores que excedem o máximo
-    excesso = 0
-    for i in range(num_valores):
-        if valores[i] > max_valor:
-            excesso += valores[i] - max_valor
-            valores[i] = max_valor
-            
-    # Redistribuir o excesso entre os valores abaixo do máximo
-    indices_abaixo_max = [i for i, v in enumerate(valores) if v < max_valor]
-    while excesso > 1e-6 and indices_abaixo_max:
-        distribuir_por_indice = excesso / len(indices_abaixo_max)
-        excesso_restante_iter = 0
-        novos_indices_abaixo_max = []
-        for i in indices_abaixo_max:
-            adicao = min(distribuir_por_indice, max_valor - valores[i])
-            valores[i] += adicao
-            excesso_restante_iter += distribuir_por_indice - adicao
-            if valores[i] < max_valor:
-                 novos_indices_abaixo_max.append(i)
-        excesso = excesso_restante_iter
-        indices_abaixo_max = novos_indices_abaixo_max
-        if not indices_abaixo_max and excesso > 1e-6:
-             # Se não há mais onde distribuir e ainda há excesso, pode indicar problema
-             # print(f"Aviso: Não foi possível redistribuir todo o excesso ({excesso:.4f}). A soma pode não ser exata.")
-             break # Evita loop infinito
-
-    # Ajuste final para garantir a soma exata devido a arredondamentos
-    soma_atual = np.sum(valores)
-    diferenca = total - soma_atual
-    if abs(diferenca) > 1e-6:
-        # Adicionar a diferença a um valor que não exceda o máximo
-        idx_ajuste = -1
-        for i in range(num_valores):
-             if valores[i] + diferenca <= max_valor and valores[i] + diferenca >= 0:
-                  idx_ajuste = i
-                  break
-        if idx_ajuste != -1:
-             valores[idx_ajuste] += diferenca
-        # else: # Se não for possível ajustar sem violar o máximo, a soma pode ficar ligeiramente diferente
-            # print(f"Aviso: Não foi possível ajustar a diferença final ({diferenca:.4f}) sem violar o máximo. Soma final: {np.sum(valores):.4f}")
+    # Projetar pesos aleatórios em {soma = total, 0 <= valor <= max_valor} em milésimos
+    # e arredondar pelo maior resto: arredondar cada valor isoladamente alteraria a soma
+    total_milesimos = int(round(total * 1000))
+    limite_milesimos = int(limites_inteiros(max_valor, total_milesimos, num_valores))
+    valores = alocar_aleatorio(total_milesimos, num_valores, limite_milesimos, rng)
+    milesimos = apportionar_maior_resto(valores, total_milesimos, limite_milesimos)
 
-    return [round(v, 3) for v in valores]
+    return (milesimos / 1000).tolist()
 
-def gerar_tabela_dados(parametros):
+def gerar_tabela_dados(parametros, rng=None):
     """
     Gera a tabela de dados com base nos parâmetros fornecidos.
     
+    Todas as colunas são calculadas de forma vetorizada sobre o array de dias
+    do período (numpy datetime64), sem laços Python por dia. Os incrementos dos
+    medidores são alocados como inteiros (int64) em milésimos pelo método do maior
+    resto, de modo que as somas e as leituras acumuladas são exatas.
+    
     Args:
         parametros: Dicionário com os parâmetros do formulário
+        rng: Semente ou numpy.random.Generator; se omitido, usa parametros["semente"]
+            (a mesma semente e os mesmos parâmetros geram sempre a mesma tabela)
         
     Returns:
         DataFrame pandas com os dados gerados
@@ -157,236 +176,96 @@ def gerar_tabela_dados(parametros):
     ne_valor = parametros.get("ne")
     nd_valor = parametros.get("nd")
     apresentar_niveis = parametros.get("apresentar_niveis", 'mensal')
+    
+    # Gerador aleatório próprio desta geração (não usa o estado global do numpy)
+    rng = obter_gerador(rng if rng is not None else parametros.get("semente"))
 
-    # Gerar todas as datas do período com informação se o mês está selecionado
-    datas_info = gerar_datas_periodo(data_inicio, data_fim, meses_selecionados)
-    if not datas_info:
+    # Gerar todos os dias do período
+    dias = dias_do_periodo(data_inicio, data_fim)
+    num_datas = len(dias)
+    if num_datas == 0:
         return pd.DataFrame() # Retorna DataFrame vazio se não houver datas
     
-    # Filtrar datas que realmente terão consumo (meses selecionados E dias da semana selecionados)
-    datas_para_consumo = []
-    for data_dt, mes_selecionado in datas_info:
-        # data_dt.weekday() retorna 0 (segunda) a 6 (domingo)
-        is_sabado = data_dt.weekday() == 5
-        is_domingo = data_dt.weekday() == 6
-        
-        deve_registrar = mes_selecionado
-        
-        if is_sabado and not registrar_sabados:
-            deve_registrar = False
-        
-        if is_domingo and not registrar_domingos:
-            deve_registrar = False
-            
-        if deve_registrar:
-            datas_para_consumo.append((data_dt, mes_selecionado))
-            
-    num_datas_para_consumo = len(datas_para_consumo)
-    
-    # Separar datas selecionadas para distribuição de valores
-    # A lista datas_info agora contém todas as datas, mas a distribuição será feita apenas para as datas em datas_para_consumo
-    
-    # Calcular diferenças totais
+    # Dias que realmente terão consumo (meses selecionados E dias da semana selecionados)
+    consumo = mascara_consumo(dias, meses_selecionados, registrar_sabados, registrar_domingos)
+    num_datas_para_consumo = int(np.count_nonzero(consumo))
     
     # Calcular diferenças totais
     diferenca_horimetro = horimetro_final - horimetro_inicial
     diferenca_hidrometro = hidrometro_final - hidrometro_inicial
     
+    # Valores diários: zero para dias sem consumo (em milésimos inteiros até a conversão final)
+    escala = 1000
+    valores_horimetro_diario = np.zeros(num_datas, dtype=np.int64)
+    valores_hidrometro_diario = np.zeros(num_datas, dtype=np.int64)
+    
     # Distribuir valores diários apenas para os dias selecionados (meses E dias da semana)
     if num_datas_para_consumo > 0:
-        # 1. Distribuir o Tempo de Captação (Horímetro)
-        valores_horimetro_consumo = distribuir_valores(diferenca_horimetro, num_datas_para_consumo, max_horimetro_diario)
-        
-        # 2. Distribuir o Volume (Hidrômetro) com restrição de Vazão Máxima
-        valores_hidrometro_consumo = distribuir_valores(diferenca_hidrometro, num_datas_para_consumo, max_hidrometro_diario)
-        
-        # 3. Aplicar a restrição de Vazão Máxima Diária (Ajuste Pós-Distribuição)
         vazao_maxima = max_hidrometro_diario / max_horimetro_diario if max_horimetro_diario > 0 else float('inf')
         
-        # O volume diário não pode exceder o tempo diário * vazao_maxima
-        excesso_volume = 0
-        for i in range(num_datas_para_consumo):
-            limite_vazao_volume = valores_horimetro_consumo[i] * vazao_maxima
-            
-            if valores_hidrometro_consumo[i] > limite_vazao_volume:
-                excesso_volume += valores_hidrometro_consumo[i] - limite_vazao_volume
-                valores_hidrometro_consumo[i] = limite_vazao_volume
-                
-        # Redistribuir o excesso de volume (se houver)
-        if excesso_volume > 1e-6:
-            # Redistribuir o excesso entre os dias que ainda não atingiram o limite de vazão
-            indices_abaixo_limite = []
-            for i in range(num_datas_para_consumo):
-                limite_vazao_volume = valores_horimetro_consumo[i] * vazao_maxima
-                if valores_hidrometro_consumo[i] < limite_vazao_volume:
-                    indices_abaixo_limite.append(i)
-                    
-            if indices_abaixo_limite:
-                adicao_por_indice = excesso_volume / len(indices_abaixo_limite)
-                for i in indices_abaixo_limite:
-                    valores_hidrometro_consumo[i] += adicao_por_indice
-                    
-        # Ajuste final para garantir a soma exata (arredondamento)
-        soma_atual = sum(valores_hidrometro_consumo)
-        diferenca = diferenca_hidrometro - soma_atual
-        if abs(diferenca) > 1e-6:
-            # Adicionar a diferença a um valor qualquer (o primeiro que não exceda o limite)
-            for i in range(num_datas_para_consumo):
-                limite_vazao_volume = valores_horimetro_consumo[i] * vazao_maxima
-                if valores_hidrometro_consumo[i] + diferenca <= limite_vazao_volume:
-                    valores_hidrometro_consumo[i] += diferenca
-                    break
-                    
-        # Arredondar os valores
-        # O arredondamento pode causar pequenas violações no limite de vazão.
-        # Vamos arredondar o horímetro primeiro.
-        valores_horimetro_consumo = [round(v, 3) for v in valores_horimetro_consumo]
-        
-        # Em seguida, arredondar o hidrômetro, garantindo que o limite de vazão seja mantido.
-        valores_hidrometro_consumo_arredondado = []
-        for i in range(num_datas_para_consumo):
-            volume_arredondado = round(valores_hidrometro_consumo[i], 3)
-            
-            # Recalcular o limite de vazão com o tempo arredondado
-            limite_vazao_volume_arredondado = valores_horimetro_consumo[i] * vazao_maxima
-            
-            # Garantir que o volume arredondado não exceda o limite de vazão
-            volume_final = min(volume_arredondado, round(limite_vazao_volume_arredondado, 3))
-            
-            valores_hidrometro_consumo_arredondado.append(volume_final)
-            
-        valores_hidrometro_consumo = valores_hidrometro_consumo_arredondado
+        # Distribuir o Tempo de Captação (Horímetro) e, em seguida, o Volume (Hidrômetro)
+        # limitado a min(max_hidrometro_diario, horas * vazao_maxima) em cada dia
+        horas, volumes = alocar_tempo_e_volume_inteiros(
+            diferenca_horimetro, diferenca_hidrometro, num_datas_para_consumo,
+            max_horimetro_diario, max_hidrometro_diario, vazao_maxima, escala=escala, rng=rng,
+        )
         
-        # Ajuste final de soma após o arredondamento (se necessário)
-        soma_atual_final = sum(valores_hidrometro_consumo)
-        diferenca_final = diferenca_hidrometro - soma_atual_final
-        
-        if abs(diferenca_final) > 1e-6:
-            # Adicionar a diferença a um valor qualquer (o primeiro que não exceda o limite)
-            for i in range(num_datas_para_consumo):
-                limite_vazao_volume = valores_horimetro_consumo[i] * vazao_maxima
-                if valores_hidrometro_consumo[i] + diferenca_final <= limite_vazao_volume:
-                    valores_hidrometro_consumo[i] += diferenca_final
-                    valores_hidrometro_consumo[i] = round(valores_hidrometro_consumo[i], 3) # Arredondar novamente
-                    break
-        
-    else:
-        valores_horimetro_consumo = []
-        valores_hidrometro_consumo = []
-    
-    # Criar listas de valores para todas as datas, aplicando zero para dias não selecionados
-    valores_horimetro_diario = []
-    valores_hidrometro_diario = []
-    idx_consumo = 0
+        valores_horimetro_diario[consumo] = horas
+        valores_hidrometro_diario[consumo] = volumes
     
-    for data_dt, mes_selecionado in datas_info:
-        # data_dt.weekday() retorna 0 (segunda) a 6 (domingo)
-        is_sabado = data_dt.weekday() == 5
-        is_domingo = data_dt.weekday() == 6
-        
-        deve_consumir = mes_selecionado
-        
-        if is_sabado and not registrar_sabados:
-            deve_consumir = False
-        
-        if is_domingo and not registrar_domingos:
-            deve_consumir = False
-            
-        if deve_consumir and idx_consumo < len(valores_horimetro_consumo):
-            # Dia de consumo: usar valores distribuídos
-            valores_horimetro_diario.append(valores_horimetro_consumo[idx_consumo])
-            valores_hidrometro_diario.append(valores_hidrometro_consumo[idx_consumo])
-            idx_consumo += 1
-        else:
-            # Dia sem consumo: valores zero
-            valores_horimetro_diario.append(0.0)
-            valores_hidrometro_diario.append(0.0)
-    
-    # Calcular valores acumulados
+    # Calcular valores acumulados a partir das leituras iniciais (na mesma unidade)
+    horimetro_inicial = int(round(horimetro_inicial * escala))
+    hidrometro_inicial = int(round(hidrometro_inicial * escala))
     horimetro_acumulado = np.cumsum(valores_horimetro_diario) + horimetro_inicial
     hidrometro_acumulado = np.cumsum(valores_hidrometro_diario) + hidrometro_inicial
     
-    # Arredondar para 3 casas decimais
-    horimetro_acumulado = [round(v, 3) for v in horimetro_acumulado]
-    hidrometro_acumulado = [round(v, 3) for v in hidrometro_acumulado]
-    
-    # Preparar dados para o DataFrame
-    datas_str = [info[0].strftime("%d/%m/%Y") for info in datas_info]
-    num_datas = len(datas_info)
+    # Horário aleatório da leitura (8:10 a 8:59)
+    minutos = rng.integers(10, 60, size=num_datas)
+    hora_list = np.char.add("8:", minutos.astype("U2"))
     
-    # Mapeamento reverso de meses
-    meses_map_rev = {v: k for k, v in {
-        "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
-        "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12
-    }.items()}
+    # Calcular vazão (evitar divisão por zero)
+    vazoes = np.round(np.divide(
+        valores_hidrometro_diario, valores_horimetro_diario,
+        out=np.zeros(num_datas), where=valores_horimetro_diario != 0,
+    ), 2)
     
-    volume_acumulado_mensal = {}
-    volume_diario_list = []
-    tempo_diario_list = []
-    volume_acum_mensal_list = []
-    vazoes = []
-    hora_list = []
+    # Calcular Volume acumulado Mensal (m3): soma acumulada agrupada por mês
+    meses = dias.astype("datetime64[M]")
+    inicio_mes = np.empty(num_datas, dtype=bool)
+    inicio_mes[0] = True
+    inicio_mes[1:] = meses[1:] != meses[:-1]
+    acumulado = np.cumsum(valores_hidrometro_diario)
+    acumulado_antes_do_mes = (acumulado - valores_hidrometro_diario)[inicio_mes]
+    volume_acum_mensal = acumulado - acumulado_antes_do_mes[np.cumsum(inicio_mes) - 1]
     
-    # Novas colunas para Níveis de Água
-    ne_list = []
-    nd_list = []
+    # --- Lógica de Níveis de Água ---
+    # Último dia do mês: o dia seguinte pertence a outro mês
+    ultimo_dia_do_mes = (dias + 1).astype("datetime64[M]") != meses
+    if apresentar_niveis == 'mensal':
+        dias_niveis = ultimo_dia_do_mes
+    elif apresentar_niveis == 'abr_out':
+        # Meses de Abril (4) e Outubro (10)
+        dias_niveis = ultimo_dia_do_mes & mascara_meses_selecionados(dias, ["abr", "out"])
+    else:
+        dias_niveis = np.zeros(num_datas, dtype=bool)
     
-    for i, (data_dt, mes_selecionado) in enumerate(datas_info):
-        mes_num = data_dt.month
-        mes_codigo = meses_map_rev.get(mes_num, "jan")
-        
-        hora = 8
-        minuto = random.randint(10, 59)        
-        horario_aleatorio = (f"{hora}:{minuto}")
-        hora_list.append(horario_aleatorio)
-        
-        # Calcular Volume diário (m3) e Tempo diário
-        volume_diario = valores_hidrometro_diario[i]
-        tempo_diario = valores_horimetro_diario[i]
-        volume_diario_list.append(round(volume_diario, 3))
-        tempo_diario_list.append(round(tempo_diario, 3))
-
-        # Calcular vazão (evitar divisão por zero)
-        if tempo_diario != 0:
-            vazao_calculada = volume_diario / tempo_diario
-            vazoes.append(round(vazao_calculada, 2))
-        else:
-            vazoes.append(0.0)
-
-        # Calcular Volume acumulado Mensal (m3)
-        chave_mes_ano = data_dt.strftime("%Y-%m")
-        volume_acumulado_mensal[chave_mes_ano] = volume_acumulado_mensal.get(chave_mes_ano, 0) + volume_diario
-        volume_acum_mensal_list.append(round(volume_acumulado_mensal[chave_mes_ano], 3))
-        
-        # --- Lógica de Níveis de Água ---
-        ne_dia = None
-        nd_dia = None
-        
-        # Verificar se é o último dia do mês
-        ultimo_dia_do_mes = data_dt.day == calendar.monthrange(data_dt.year, data_dt.month)[1]
-        
-        if ne_valor is not None and nd_valor is not None:
-            if apresentar_niveis == 'mensal' and ultimo_dia_do_mes:
-                ne_dia = ne_valor
-                nd_dia = nd_valor
-            elif apresentar_niveis == 'abr_out':
-                # Meses de Abril (4) e Outubro (10)
-                if data_dt.month in [4, 10] and ultimo_dia_do_mes:
-                    ne_dia = ne_valor
-                    nd_dia = nd_valor
-        
-        ne_list.append(ne_dia)
-        nd_list.append(nd_dia)
+    if ne_valor is not None and nd_valor is not None and dias_niveis.any():
+        ne_list = np.where(dias_niveis, ne_valor, np.nan)
+        nd_list = np.where(dias_niveis, nd_valor, np.nan)
+    else:
+        ne_list = [None] * num_datas
+        nd_list = [None] * num_datas
     
-        # Criar DataFrame com as colunas na ordem desejada pelo template
+    # Criar DataFrame com as colunas na ordem desejada pelo template
     df = pd.DataFrame({
-        "Data": datas_str,
+        "Data": formatar_datas(dias),
         "Hora": hora_list,
-        "Horimetro": horimetro_acumulado,
-        "Medidor de Vazão": hidrometro_acumulado, # Mapeando Hidrômetro para Medidor de Vazão
-        "Tempo de Captação (h)": tempo_diario_list, # Mapeando Horas/Dia
-        "Volume diário (m3)": volume_diario_list,
-        "Volume acumulado Mensal (m3)": volume_acum_mensal_list,
+        # Conversão final para a unidade real com 3 casas decimais
+        "Horimetro": np.round(horimetro_acumulado / escala, 3),
+        "Medidor de Vazão": np.round(hidrometro_acumulado / escala, 3), # Mapeando Hidrômetro para Medidor de Vazão
+        "Tempo de Captação (h)": np.round(valores_horimetro_diario / escala, 3), # Mapeando Horas/Dia
+        "Volume diário (m3)": np.round(valores_hidrometro_diario / escala, 3),
+        "Volume acumulado Mensal (m3)": np.round(volume_acum_mensal / escala, 3),
         "Valor": vazoes, # Mapeando Vazão m³/h para Valor (Vazão Média - diária)
         "Unidade": ["m³/h"] * num_datas, # Unidade para Vazão Média
         "Nível Estático (NE)": ne_list, # Nova Coluna
@@ -396,171 +275,174 @@ def gerar_tabela_dados(parametros):
     
     return df
 
-def exportar_para_xlsx(df, parametros):
+# Colunas de dados da planilha de consumo e formato numérico de cada uma (None = texto/geral)
+CABECALHOS_XLSX = [
+    "Data", "Hora", "Horimetro", "Medidor de Vazão",
+    "Tempo de Captação (h)", "Volume diário (m3)", "Volume acumulado Mensal (m3)",
+    "Valor", "Unidade", "Estático(NE)", "Dinâmico(ND)", "Observação"
+]
+FORMATOS_XLSX = [None, None, "0.000", "0.000", "0.00", "0.000", "0.000", "0.00", None, None, None, None]
+LINHAS_POR_BLOCO_XLSX = 1024
+
+def _registrar_estilos_xlsx(workbook):
     """
-    Exporta o DataFrame para um arquivo XLSX em memória, seguindo o modelo.
+    Registra no workbook os estilos nomeados da planilha de consumo.
+    
+    Os estilos são compartilhados por todas as células, em vez de uma fonte,
+    borda e preenchimento novos por célula.
+    """
+    borda = Border(left=Side(style="thin"), 
+                   right=Side(style="thin"), 
+                   top=Side(style="thin"), 
+                   bottom=Side(style="thin"))
+    fonte_negrito = Font(name="Calibri", size=11, bold=True)
+    centralizado = Alignment(horizontal="center", vertical="center")
+    fill_cinza = PatternFill(fill_type="solid", fgColor="D9D9D9")
+
+    workbook.add_named_style(NamedStyle(name="pocos_titulo", font=fonte_negrito, alignment=centralizado))
+    workbook.add_named_style(NamedStyle(name="pocos_cabecalho", font=fonte_negrito, alignment=centralizado, border=borda, fill=fill_cinza))
+    workbook.add_named_style(NamedStyle(name="pocos_borda", border=borda))
+    for formato in set(filter(None, FORMATOS_XLSX)):
+        workbook.add_named_style(NamedStyle(name=f"pocos_numero_{formato}", border=borda, number_format=formato))
+
+def _larguras_colunas(df, cabecalhos):
+    """
+    Calcula a largura de cada coluna a partir do tamanho dos textos do DataFrame.
+    
+    Números são medidos com 3 casas decimais; como o tamanho de f"{x:.3f}" só
+    cresce com |x|, basta medir o mínimo e o máximo de cada coluna numérica.
     
     Args:
         df: DataFrame pandas com os dados
-        parametros: Dicionário com os parâmetros do formulário (para cabeçalho)
+        cabecalhos: Lista com o cabeçalho de cada coluna
         
     Returns:
-        Bytes do arquivo XLSX
+        Lista com a largura de cada coluna (inclui 2 caracteres de margem)
     """
-    output = io.BytesIO()
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Planilha1"
+    larguras = []
+    for nome_coluna, cabecalho in zip(df.columns, cabecalhos):
+        serie = df[nome_coluna]
+        largura = len(cabecalho)
+        if serie.dtype.kind in "biuf":
+            numeros = serie.to_numpy(dtype=float)
+            textos = None
+        else:
+            # Colunas de objetos podem misturar números, textos e None
+            numeros = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+            textos = serie[np.isnan(numeros) & serie.notna().to_numpy()]
+        finitos = numeros[np.isfinite(numeros)]
+        if finitos.size:
+            largura = max(largura, len(f"{finitos.min():.3f}"), len(f"{finitos.max():.3f}"))
+        if textos is None and finitos.size < numeros.size:
+            largura = max(largura, 3) # "nan"
+        if textos is not None and len(textos):
+            largura = max(largura, int(textos.astype(str).str.len().max()))
+        larguras.append(largura + 2) # Padding
+    return larguras
+
+def escrever_xlsx(df, parametros, destino, progresso=None):
+    """
+    Escreve a planilha de consumo em modo streaming (workbook write-only).
+    
+    As linhas são serializadas à medida que são adicionadas, de modo que a
+    memória usada não cresce com o número de linhas da tabela.
+    
+    Args:
+        df: DataFrame pandas com os dados
+        parametros: Dicionário com os parâmetros do formulário (para cabeçalho)
+        destino: Caminho ou arquivo binário onde o XLSX será gravado
+        progresso: Função chamada com o número de linhas de dados já escritas (opcional)
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    _registrar_estilos_xlsx(workbook)
+    sheet = workbook.create_sheet("Planilha1")
 
     sheet.sheet_properties = WorksheetProperties(
         pageSetUpPr=PageSetupProperties(fitToPage=True)
     )
-
-
-    # --- Estilos --- (Opcional, mas melhora a aparência)
-    sheet.page_setup.orientation = sheet.ORIENTATION_LANDSCAPE
+    sheet.page_setup.orientation = "landscape"
     sheet.page_setup.fitToWidth = 1
     sheet.page_setup.fitToHeight = 0 
     sheet.freeze_panes = "A7"
     sheet.sheet_view.showGridLines = False
-    header_font = Font(name="Calibri", size=11, bold=True)
-    title_font = Font(name="Calibri", size=11, bold=True)
-    center_alignment = Alignment(horizontal="center", vertical="center")
-    left_alignment = Alignment(horizontal="left", vertical="center")
-    thin_border = Border(left=Side(style="thin"), 
-                         right=Side(style="thin"), 
-                         top=Side(style="thin"), 
-                         bottom=Side(style="thin"))
-    fill_cinza = PatternFill(fill_type="solid", fgColor="D9D9D9")
-
-    # --- Cabeçalho Complexo --- 
-    # Linha 1: Título principal
-    sheet.merge_cells("A1:L1")
-    sheet["A1"] = "PLANILHA DE MONITORAMENTO DE VAZÃO"
-    sheet["A1"].font = title_font
-    sheet["A1"].alignment = center_alignment
-
-    # Linha 2: Portaria e versão
-    sheet.merge_cells("A2:B2")
-    sheet.merge_cells("C2:J2")
-    sheet["A2"] = "Portaria"
-    sheet["K2"] = "Versão"
-    sheet["L2"] = "2025.01" # Ou buscar de algum lugar se for dinâmico
-    for col in ["A", "B", "C", "D","E","F","G","H","I","J","K","L"]:
-        cell = sheet[f"{col}2"]
-        cell.border = thin_border
-
-    # Adicionar valor da portaria se disponível nos parâmetros
-    # sheet["I2"] = parametros.get("portaria", "") 
-
-    # Linha 3: Tipo de Medidor
-    sheet.merge_cells("C3:L3")
-    sheet["A3"] = "Tipo de Medidor"
-    for col in ["A", "B", "C", "D","E","F","G","H","I","J","K","L"]:
-        cell = sheet[f"{col}3"]
-        cell.border = thin_border
-
-    # Adicionar valor se disponível
-    # sheet["I3"] = parametros.get("tipo_medidor", "")
-
-    # Linha 4: Data de Instalação
-    sheet.merge_cells("C4:L4")
-    sheet["A4"] = "Data de Instalação"
-    for col in ["A", "B", "C", "D","E","F","G","H","I","J","K","L"]:
-        cell = sheet[f"{col}4"]
-        cell.border = thin_border
-
-    # Adicionar valor se disponível
-    # sheet["I4"] = parametros.get("data_instalacao", "")
-
-    # Linha 5: Cabeçalhos de Seção
-    sheet.merge_cells("A5:D5")
-    sheet["A5"] = "Leitura Equipamento"
-    sheet["A5"].font = header_font
-    sheet["A5"].alignment = center_alignment
-    for col in ["A", "B", "C", "D"]:
-        cell = sheet[f"{col}5"]
-        cell.border = thin_border
-        cell.fill = fill_cinza
 
-    sheet.merge_cells("E5:G5")
-    sheet["E5"] = "Resultados"
-    sheet["E5"].font = header_font
-    sheet["E5"].alignment = center_alignment
-    for col in ["E", "F", "G"]:
-        cell = sheet[f"{col}5"]
-        cell.border = thin_border
-        cell.fill = fill_cinza
+    # No modo write-only as larguras e mesclagens precisam ser definidas antes das linhas
+    for col_idx, largura in enumerate(_larguras_colunas(df, CABECALHOS_XLSX), 1):
+        sheet.column_dimensions[get_column_letter(col_idx)].width = largura
 
-    sheet.merge_cells("H5:I5")
-    sheet["H5"] = "Vazão Média"
-    sheet["H5"].font = header_font
-    sheet["H5"].alignment = center_alignment
-    for col in ["H", "J"]:
-        cell = sheet[f"{col}5"]
-        cell.border = thin_border
-        cell.fill = fill_cinza
-
-
-    sheet.merge_cells("J5:L5")
-    sheet["J5"] = "Níveis"
-    sheet["J5"].font = header_font
-    sheet["J5"].alignment = center_alignment
-    for col in ["J","K","L"]:
-        cell = sheet[f"{col}5"]
-        cell.border = thin_border
-        cell.fill = fill_cinza    
-    
+    # --- Cabeçalho Complexo --- 
+    # Linhas 1 a 5: {coluna: valor} e o estilo de cada intervalo (mesclado) ou célula
+    cabecalho = [
+        # Linha 1: Título principal
+        ({"A": "PLANILHA DE MONITORAMENTO DE VAZÃO"}, [("A1:L1", "pocos_titulo")]),
+        # Linha 2: Portaria e versão
+        ({"A": "Portaria", "K": "Versão", "L": "2025.01"},
+         [("A2:B2", "pocos_borda"), ("C2:J2", "pocos_borda"), ("K2", "pocos_borda"), ("L2", "pocos_borda")]),
+        # Linha 3: Tipo de Medidor
+        ({"A": "Tipo de Medidor"}, [("A3", "pocos_borda"), ("B3", "pocos_borda"), ("C3:L3", "pocos_borda")]),
+        # Linha 4: Data de Instalação
+        ({"A": "Data de Instalação"}, [("A4", "pocos_borda"), ("B4", "pocos_borda"), ("C4:L4", "pocos_borda")]),
+        # Linha 5: Cabeçalhos de Seção
+        ({"A": "Leitura Equipamento", "E": "Resultados", "H": "Vazão Média", "J": "Níveis"},
+         [("A5:D5", "pocos_cabecalho"), ("E5:G5", "pocos_cabecalho"), ("H5:I5", "pocos_cabecalho"), ("J5:L5", "pocos_cabecalho")]),
+    ]
+    linhas_cabecalho = []
+    for valores, intervalos in cabecalho:
+        linha = []
+        for intervalo, estilo in intervalos:
+            inicio, mesclado, fim = intervalo.partition(":")
+            if mesclado:
+                sheet.merged_cells.add(intervalo)
+            else:
+                fim = inicio
+            for col_idx in range(column_index_from_string(inicio[0]), column_index_from_string(fim[0]) + 1):
+                cell = WriteOnlyCell(sheet, valores.get(get_column_letter(col_idx)))
+                cell.style = estilo
+                linha.append(cell)
+        linhas_cabecalho.append(linha)
+
+    for linha in linhas_cabecalho:
+        sheet.append(linha)
 
     # Linha 6: Cabeçalhos das Colunas de Dados
-    data_headers = [
-        "Data", "Hora", "Horimetro", "Medidor de Vazão",
-        "Tempo de Captação (h)", "Volume diário (m3)", "Volume acumulado Mensal (m3)",
-        "Valor", "Unidade", "Estático(NE)", "Dinâmico(ND)", "Observação"
-    ]
-    sheet.append(data_headers)
-    for col_idx, header in enumerate(data_headers, 1):
-        cell = sheet.cell(row=6, column=col_idx)
-        cell.font = header_font
-        cell.alignment = center_alignment
-        cell.border = thin_border
-        cell.fill = fill_cinza
+    linha = []
+    for header in CABECALHOS_XLSX:
+        cell = WriteOnlyCell(sheet, header)
+        cell.style = "pocos_cabecalho"
+        linha.append(cell)
+    sheet.append(linha)
 
     # --- Escrever Dados --- 
-    start_row = 7
-    for r_idx, row in enumerate(df.itertuples(index=False), start=start_row):
-        sheet.append(list(row))
-        # Aplicar formatação de número se necessário
-        sheet.cell(row=r_idx, column=3).number_format = "0.000" # Horimetro
-        sheet.cell(row=r_idx, column=4).number_format = "0.000" # Medidor de Vazão
-        sheet.cell(row=r_idx, column=5).number_format = "0.00"  # Tempo de Captação
-        sheet.cell(row=r_idx, column=6).number_format = "0.000" # Volume diário
-        sheet.cell(row=r_idx, column=7).number_format = "0.000" # Volume acumulado
-        sheet.cell(row=r_idx, column=8).number_format = "0.00"  # Valor (Vazão Média)
-
-        for c_idx in range(1, len(row) + 1):
-            cell = sheet.cell(row=r_idx, column=c_idx)
-            cell.border = thin_border
-
+    # Uma célula estilizada por coluna, reaproveitada em todas as linhas: no modo
+    # write-only a linha é serializada dentro do append, então só o valor muda
+    celulas = []
+    for formato in FORMATOS_XLSX:
+        cell = WriteOnlyCell(sheet)
+        cell.style = f"pocos_numero_{formato}" if formato else "pocos_borda"
+        celulas.append(cell)
+    # As colunas são convertidas em listas por blocos, para não materializar a tabela inteira
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO_XLSX):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO_XLSX]
+        for row in zip(*(bloco[nome_coluna].tolist() for nome_coluna in bloco.columns)):
+            for cell, valor in zip(celulas, row):
+                cell.value = valor
+            sheet.append(celulas)
+        if progresso is not None:
+            progresso(inicio + len(bloco))
+
+    workbook.save(destino)
 
-
-    # --- Ajustar Largura das Colunas --- 
-    for col_idx, header in enumerate(data_headers, 1):
-        column_letter = get_column_letter(col_idx)
-        max_length = len(header) + 2 # Padding
-        for row_idx in range(start_row, sheet.max_row + 1):
-            cell_value = sheet.cell(row=row_idx, column=col_idx).value
-            if cell_value is not None:
-                 # Considerar formatação de número ao calcular largura
-                 if isinstance(cell_value, (int, float)):
-                      cell_str = f"{cell_value:.3f}" # Ajustar formato conforme a coluna
-                 else:
-                      cell_str = str(cell_value)                      
-                 max_length = max(max_length, len(cell_str) + 2)
-        sheet.column_dimensions[column_letter].width = max_length
-
-    # Salvar o arquivo em memória
-    workbook.save(output)
-    output.seek(0)
+def exportar_para_xlsx(df, parametros):
+    """
+    Exporta o DataFrame para um arquivo XLSX em memória, seguindo o modelo.
+    
+    Args:
+        df: DataFrame pandas com os dados
+        parametros: Dicionário com os parâmetros do formulário (para cabeçalho)
+        
+    Returns:
+        Bytes do arquivo XLSX
+    """
+    output = io.BytesIO()
+    escrever_xlsx(df, parametros, output)
     return output.getvalue()
-
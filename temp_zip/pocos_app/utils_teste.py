@@ -6,6 +6,7 @@ from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from .aleatorio import obter_gerador
 
 def gerar_intervalos_tempo(tempo_total_horas, tempo_estabilizacao_min):
     """
@@ -56,9 +57,11 @@ def gerar_intervalos_tempo(tempo_total_horas, tempo_estabilizacao_min):
             
     return intervalos
 
-def simular_progresso_randomico(num_leituras, valor_inicial, valor_final):
+def simular_progresso_randomico(num_leituras, valor_inicial, valor_final, rng=None):
     """
     Gera uma série de valores progressivos e randômicos entre valor_inicial e valor_final.
+    
+    O parâmetro rng aceita uma semente ou um numpy.random.Generator (ver aleatorio.obter_gerador).
     """
     if num_leituras <= 1:
         return [valor_final]
@@ -75,31 +78,36 @@ def simular_progresso_randomico(num_leituras, valor_inicial, valor_final):
         diferenca = valor_final - valor_inicial
         sinal = 1
         
+    rng = obter_gerador(rng)
+    
     # Gera num_leituras - 1 passos aleatórios que somam 1 (para garantir a progressão total)
-    passos_relativos = np.random.rand(num_leituras - 1)
+    passos_relativos = rng.random(num_leituras - 1)
     passos_relativos /= passos_relativos.sum()
     
     # Converte para passos absolutos
     passos_absolutos = passos_relativos * diferenca * sinal
     
+    # Adiciona um pequeno ruído randômico a cada passo para simular a leitura
+    ruido = rng.uniform(-0.01, 0.01, size=num_leituras - 1) # Ruído de +/- 0.01
+    
     # Calcula os valores progressivos
-    valores = [valor_inicial]
-    valor_atual = valor_inicial
-    for passo in passos_absolutos:
-        # Adiciona um pequeno ruído randômico para simular a leitura
-        ruido = np.random.uniform(-0.01, 0.01) # Ruído de +/- 0.01
-        valor_atual += passo + ruido
-        valores.append(valor_atual)
+    valores = np.empty(num_leituras)
+    valores[0] = valor_inicial
+    valores[1:] = valor_inicial + np.cumsum(passos_absolutos + ruido)
         
     # Garante que o último valor seja exatamente o valor_final
     valores[-1] = valor_final
     
-    return valores
+    return valores.tolist()
 
-def gerar_teste_bombeamento(params_bombeamento):
+def gerar_teste_bombeamento(params_bombeamento, rng=None):
     """
     Gera o DataFrame para o Teste de Bombeamento.
+    
+    O parâmetro rng aceita uma semente ou um numpy.random.Generator; se omitido,
+    usa params_bombeamento['semente'] (se houver).
     """
+    rng = obter_gerador(rng if rng is not None else params_bombeamento.get('semente'))
     data_hora_inicial = datetime.combine(params_bombeamento['data_inicio'], params_bombeamento['hora_inicial'])
     nivel_inicial = params_bombeamento['nivel_inicial']
     nivel_final = params_bombeamento['nivel_final']
@@ -138,12 +146,12 @@ def gerar_teste_bombeamento(params_bombeamento):
     
 # Simular a progressão do Nível (de nivel_inicial a nivel_final)
 # A primeira leitura de nível é nivel_inicial, então a progressão deve começar na segunda leitura.
-    niveis_progressivos_completo = simular_progresso_randomico(num_leituras_progressivas + 1, nivel_inicial, nivel_final)
+    niveis_progressivos_completo = simular_progresso_randomico(num_leituras_progressivas + 1, nivel_inicial, nivel_final, rng)
     niveis_progressivos = niveis_progressivos_completo[1:] # Exclui o nivel_inicial (que já está na linha 0)
     
     # Simular a progressão da Vazão (de vazao_inicial a vazao_final)
     # A primeira vazão é 0, a segunda é vazao_inicial, então precisamos de num_leituras_progressivas - 1 passos
-    vazoes_progressivas = simular_progresso_randomico(num_leituras_progressivas, vazao_inicial, vazao_final)
+    vazoes_progressivas = simular_progresso_randomico(num_leituras_progressivas, vazao_inicial, vazao_final, rng)
     
     # 5. Preencher as leituras
     tempo_acumulado = 0
@@ -186,10 +194,14 @@ def gerar_teste_bombeamento(params_bombeamento):
     
     return df
 
-def gerar_teste_recuperacao(params_recuperacao, nivel_inicial_rec, nivel_final_rec):
+def gerar_teste_recuperacao(params_recuperacao, nivel_inicial_rec, nivel_final_rec, rng=None):
     """
     Gera o DataFrame para o Teste de Recuperação.
+    
+    O parâmetro rng aceita uma semente ou um numpy.random.Generator; se omitido,
+    usa params_recuperacao['semente'] (se houver).
     """
+    rng = obter_gerador(rng if rng is not None else params_recuperacao.get('semente'))
     data_hora_inicial = datetime.combine(params_recuperacao['data_inicio'], params_recuperacao['hora_inicial'])
     data_hora_final = datetime.combine(params_recuperacao['data_inicio'], params_recuperacao['hora_final'])
     tempo_estabilizacao_min = params_recuperacao['tempo_estabilizacao_min']
@@ -212,7 +224,7 @@ def gerar_teste_recuperacao(params_recuperacao, nivel_inicial_rec, nivel_final_r
     
 # Simular a progressão do Nível (de nivel_inicial_rec a nivel_final_rec)
 # A primeira leitura de nível é nivel_inicial_rec, então a progressão deve começar na segunda leitura.
-    niveis_progressivos_completo = simular_progresso_randomico(num_leituras + 1, nivel_inicial_rec, nivel_final_rec)
+    niveis_progressivos_completo = simular_progresso_randomico(num_leituras + 1, nivel_inicial_rec, nivel_final_rec, rng)
     niveis_progressivos = niveis_progressivos_completo[1:] # Exclui o nivel_inicial_rec (que já está na linha 0)
     
     tempo_acumulado = 0
@@ -273,6 +285,15 @@ def gerar_teste_xlsx_file(df_bombeamento, df_recuperacao, params_bombeamento, pa
     Gera o arquivo XLSX com os DataFrames de Teste de Bombeamento e Recuperação.
     """
     output = io.BytesIO()
+    escrever_teste_xlsx(df_bombeamento, df_recuperacao, params_bombeamento, params_recuperacao, nivel_inicial_rec, nivel_final_rec, output)
+    return output.getvalue()
+
+def escrever_teste_xlsx(df_bombeamento, df_recuperacao, params_bombeamento, params_recuperacao, nivel_inicial_rec, nivel_final_rec, destino, progresso=None):
+    """
+    Grava o XLSX dos testes de Bombeamento e Recuperação em um caminho ou arquivo binário (destino).
+    
+    progresso, se informada, é chamada com o número de linhas de dados já escritas (das duas tabelas).
+    """
     wb = Workbook()
     
     # --- Estilos ---
@@ -312,6 +333,8 @@ def gerar_teste_xlsx_file(df_bombeamento, df_recuperacao, params_bombeamento, pa
     # Adicionar o DataFrame
     for r_idx, row in enumerate(dataframe_to_rows(df_bombeamento, header=True, index=False)):
         ws_bombeamento.append(row)
+    if progresso is not None:
+        progresso(len(df_bombeamento))
         
     # Aplicar estilos ao cabeçalho da tabela
     header_row = ws_bombeamento[ws_bombeamento.max_row - len(df_bombeamento) - 1]
@@ -358,6 +381,8 @@ def gerar_teste_xlsx_file(df_bombeamento, df_recuperacao, params_bombeamento, pa
     # Adicionar o DataFrame
     for r_idx, row in enumerate(dataframe_to_rows(df_recuperacao, header=True, index=False)):
         ws_recuperacao.append(row)
+    if progresso is not None:
+        progresso(len(df_bombeamento) + len(df_recuperacao))
         
     # Aplicar estilos ao cabeçalho da tabela
     header_row = ws_recuperacao[ws_recuperacao.max_row - len(df_recuperacao) - 1]
@@ -377,6 +402,4 @@ def gerar_teste_xlsx_file(df_bombeamento, df_recuperacao, params_bombeamento, pa
         adjusted_width = (max_length + 2)
         ws_recuperacao.column_dimensions[column].width = adjusted_width
         
-    wb.save(output)
-    output.seek(0)
-    return output.getvalue()
+    wb.save(destino)
@@ -1,13 +1,284 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.urls import reverse
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse, Http404
 from .forms import ParametrosForm
 from .forms_teste import TesteBombeamentoForm, TesteRecuperacaoForm
-from .utils import gerar_tabela_dados, exportar_para_xlsx
-from .utils_teste import gerar_teste_bombeamento, gerar_teste_recuperacao, gerar_teste_xlsx_file
+# Os módulos de geração e exportação (numpy, pandas, openpyxl) são importados dentro das
+# views que os usam: assim o cold start e as páginas leves (login, menu) não os carregam
+from .cache_resultados import chave_parametros, obter_cache
+from .medicao import medir
+from .registro import registro_geracao
 from acesso.utils import acesso_requerido # Importar o decorator
+from contextlib import ExitStack
 from datetime import date, time
-import pandas as pd
-import json # Import json for pretty printing
+from functools import wraps
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Linhas renderizadas nas páginas de resultados; as demais são buscadas na API de dados
+LINHAS_PRIMEIRA_PAGINA = 100
+
+# Exportações em segundo plano guardadas na sessão (as mais recentes)
+MAX_EXPORTACOES_SESSAO = 20
+
+# Formatos de exportação da tabela de Consumo para carga em outras ferramentas: (nome do arquivo, Content-Type)
+FORMATOS_DADOS = {
+    'csv': ('dados_poco.csv', 'text/csv; charset=utf-8'),
+    'parquet': ('dados_poco.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('dados_poco.arrow', 'application/vnd.apache.arrow.file'),
+}
+
+def _parametros_para_sessao(parametros):
+    """
+    Converte os objetos date/time dos parâmetros em strings ISO (a sessão é serializada em JSON).
+    """
+    return {
+        chave: valor.isoformat() if isinstance(valor, (date, time)) else valor
+        for chave, valor in parametros.items()
+    }
+
+def _parametros_da_sessao(parametros):
+    """
+    Converte as strings ISO de data/hora dos parâmetros armazenados na sessão de volta para objetos.
+    """
+    parametros = dict(parametros)
+    for chave in ('data_inicio', 'data_fim'):
+        if isinstance(parametros.get(chave), str):
+            parametros[chave] = date.fromisoformat(parametros[chave])
+    for chave in ('hora_inicial', 'hora_final'):
+        if isinstance(parametros.get(chave), str):
+            # Aceita HH:MM:SS e HH:MM
+            parametros[chave] = time.fromisoformat(parametros[chave])
+    return parametros
+
+def _resposta_arquivo(escrever, nome_arquivo, cache=None, chave_cache=None, tipo_conteudo=TIPO_XLSX, medicao='xlsx'):
+    """
+    Grava o arquivo (XLSX, Parquet...) em um arquivo temporário e o envia ao cliente em blocos (FileResponse).
+    
+    Evita manter o arquivo inteiro (e a cópia de BytesIO.getvalue()) em memória.
+    Se um cache for informado, arquivos pequenos o suficiente também são guardados nele.
+    
+    Args:
+        escrever: Função que recebe o arquivo binário de destino e grava o conteúdo
+        nome_arquivo: Nome do arquivo para o download
+        cache: Cache de resultados (opcional)
+        chave_cache: Chave do arquivo no cache
+        tipo_conteudo: Content-Type do arquivo
+        medicao: Nome da medição (Server-Timing) do tempo de gravação
+    """
+    arquivo = tempfile.TemporaryFile()
+    try:
+        with medir(medicao):
+            escrever(arquivo)
+        tamanho = arquivo.tell()
+        arquivo.seek(0)
+        if cache is not None and cache.aceita(tamanho):
+            cache.guardar(chave_cache, arquivo.read())
+            arquivo.seek(0)
+    except BaseException:
+        arquivo.close()
+        raise
+    # O FileResponse fecha (e assim remove) o arquivo temporário ao final do envio
+    return FileResponse(arquivo, as_attachment=True, filename=nome_arquivo, content_type=tipo_conteudo)
+
+def _parametros_exportacao(request):
+    """
+    Recupera da sessão os parâmetros da tabela de Consumo, convertendo as strings
+    de data de volta para objetos date.
+    
+    Returns:
+        Os parâmetros, ou None se não há parâmetros (com semente) na sessão
+    """
+    # Verificar se há parâmetros na sessão
+    if 'parametros' not in request.session:
+        logger.info('Exportação sem parâmetros na sessão; redirecionando para o formulário.')
+        return None
+    
+    parametros = _parametros_da_sessao(request.session.get('parametros', {}))
+    logger.debug('Parâmetros recuperados da sessão: %s', parametros)
+
+    if not parametros or parametros.get('semente') is None:
+        logger.info('Parâmetros da sessão vazios ou sem semente; redirecionando para o formulário.')
+        return None
+    return parametros
+
+def _exportacao_assincrona(request):
+    """
+    Indica se a exportação foi pedida em segundo plano (?assincrono=1, usado pelo script da página).
+    """
+    return request.GET.get('assincrono') == '1'
+
+def _registrar_tarefa(request, tarefa):
+    """
+    Registra a tarefa de exportação na sessão (apenas a sessão que a criou pode consultá-la).
+    """
+    exportacoes = [tarefa_id for tarefa_id in request.session.get('exportacoes', []) if tarefa_id != tarefa.id]
+    request.session['exportacoes'] = (exportacoes + [tarefa.id])[-MAX_EXPORTACOES_SESSAO:]
+
+def _resposta_tarefa(request, tarefa):
+    """
+    Registra a tarefa de exportação na sessão e responde com o seu estado e a URL de consulta.
+    """
+    _registrar_tarefa(request, tarefa)
+    return JsonResponse(
+        dict(tarefa.como_dicionario(), url_status=reverse('status_exportacao', args=[tarefa.id])),
+        status=202,
+    )
+
+def _tarefa_da_sessao(request, tarefa_id):
+    """
+    Retorna a tarefa de exportação, se ela foi criada nesta sessão e ainda está registrada.
+    """
+    from .exportacoes import obter_fila
+    if tarefa_id not in request.session.get('exportacoes', []):
+        return None
+    return obter_fila().obter(tarefa_id)
+
+def _preparar_xlsx(request, nome_modulo, chave_sessao, resultado_id, exportar, nome_arquivo, url_arquivo, cache=None, chave_cache=None):
+    """
+    Inicia a montagem especulativa da planilha de um resultado recém-gerado (settings.POCOS_PREPARAR_XLSX).
+    
+    A planilha é gravada como anexo do resultado, de modo que é descartada junto com
+    ele (nova geração ou expiração); a tarefa não começa se a sessão expirou enquanto
+    ela esperava na fila. Se o limite de montagens especulativas foi atingido, nada é feito.
+    
+    Args:
+        request: Requisição que gerou o resultado
+        nome_modulo: Módulo de acesso exigido para acompanhar e baixar a planilha
+        chave_sessao: Chave da sessão em que o id da tarefa é guardado
+        resultado_id: Chave do resultado no armazenamento
+        exportar: Função (tarefa, destino) que grava a planilha
+        nome_arquivo: Nome do arquivo para o download
+        url_arquivo: URL de exportação, que serve o anexo quando pronto
+        cache: Cache de resultados (opcional)
+        chave_cache: Chave da planilha no cache
+    """
+    request.session.pop(chave_sessao, None)
+    if not getattr(settings, 'POCOS_PREPARAR_XLSX', False) or resultado_id is None:
+        return
+    from .exportacoes import obter_fila, sessao_ativa
+    sessao = request.session.session_key
+    tarefa = obter_fila().enfileirar(
+        exportar, nome_arquivo, TIPO_XLSX, cache, chave_cache,
+        anexo=(resultado_id, 'xlsx'), especulativa=True,
+        valida=lambda: sessao is None or sessao_ativa(sessao), nome_modulo=nome_modulo,
+    )
+    if tarefa is None:
+        logger.debug('Limite de planilhas especulativas atingido; %s será montada no clique.', nome_arquivo)
+        return
+    tarefa.url_arquivo = url_arquivo
+    _registrar_tarefa(request, tarefa)
+    request.session[chave_sessao] = tarefa.id
+
+def _resposta_xlsx_preparado(request, chave_sessao, resultado_id, nome_arquivo, url_arquivo):
+    """
+    Responde com a planilha montada de forma especulativa, se ela já está pronta
+    ou (em exportações em segundo plano) ainda está sendo montada.
+    
+    Returns:
+        A resposta, ou None se não há planilha preparada para o resultado
+    """
+    from .armazenamento import obter_armazenamento
+    from .exportacoes import EXECUTANDO, PENDENTE
+    caminho = obter_armazenamento().caminho_anexo(resultado_id, 'xlsx')
+    if caminho is not None:
+        if _exportacao_assincrona(request):
+            return JsonResponse({'estado': 'concluida', 'percentual': 100, 'url_arquivo': url_arquivo})
+        try:
+            arquivo = open(caminho, 'rb')
+        except FileNotFoundError:
+            # Removido junto com o resultado depois da verificação
+            return None
+        return FileResponse(arquivo, as_attachment=True, filename=nome_arquivo, content_type=TIPO_XLSX)
+    if _exportacao_assincrona(request):
+        tarefa = _tarefa_da_sessao(request, request.session.get(chave_sessao))
+        if tarefa is not None and tarefa.estado in (PENDENTE, EXECUTANDO):
+            # Acompanhar a montagem já iniciada em vez de começar outra
+            return _resposta_tarefa(request, tarefa)
+    return None
+
+def _tabela_consumo(cache, chave, parametros, resultado_id):
+    """
+    Obtém a tabela de Consumo do cache ou do armazenamento de resultados; se o resultado
+    expirou (ou foi gravado em outra instância), regenera-a a partir da semente.
+    
+    Returns:
+        Tupla (df, origem), com origem 'cache', 'armazenamento' ou 'regenerada'
+    """
+    from .armazenamento import obter_armazenamento
+    from .utils import gerar_tabela_dados
+    df = cache.obter(('tabela', chave))
+    if df is not None:
+        return df, 'cache'
+    df = obter_armazenamento().carregar(resultado_id, 'consumo')
+    if df is not None:
+        return df, 'armazenamento'
+    with medir('geracao'):
+        df = gerar_tabela_dados(parametros)
+    cache.guardar(('tabela', chave), df)
+    return df, 'regenerada'
+
+def _formulario_com_erro(request, parametros, erro):
+    """
+    Volta ao formulário da tabela de Consumo, preenchido com os parâmetros da sessão,
+    quando a tabela não pode ser regenerada a partir deles.
+    """
+    logger.warning('Parâmetros da sessão inviáveis para a tabela de consumo (semente %s): %s', parametros.get('semente'), erro)
+    request.session.pop('parametros', None)
+    form = ParametrosForm(parametros)
+    form.is_valid()
+    form.add_error(None, f'Não foi possível distribuir os totais com os parâmetros informados: {erro}')
+    return render(request, 'pocos_app/index.html', {'form': form})
+
+def _tabelas_teste(resultado_id, params_bombeamento, params_recuperacao):
+    """
+    Obtém as tabelas dos testes do armazenamento de resultados ou as regenera a partir da semente.
+    
+    Returns:
+        Tupla (df_bombeamento, df_recuperacao)
+    """
+    from .armazenamento import obter_armazenamento
+    armazenamento = obter_armazenamento()
+    df_bombeamento = armazenamento.carregar(resultado_id, 'bombeamento')
+    df_recuperacao = armazenamento.carregar(resultado_id, 'recuperacao')
+    if df_bombeamento is None or df_recuperacao is None:
+        df_bombeamento, df_recuperacao, _, _ = _gerar_testes(params_bombeamento, params_recuperacao)
+    return df_bombeamento, df_recuperacao
+
+def _gerar_testes(params_bombeamento, params_recuperacao):
+    """
+    Gera os DataFrames dos testes de Bombeamento e Recuperação.
+    
+    Os dois testes usam o mesmo gerador, criado a partir de params_bombeamento['semente'],
+    de modo que os mesmos parâmetros reproduzem sempre as mesmas tabelas.
+    
+    Returns:
+        Tupla (df_bombeamento, df_recuperacao, nivel_inicial_rec, nivel_final_rec)
+    """
+    from .aleatorio import obter_gerador
+    from .utils_teste import gerar_teste_bombeamento, gerar_teste_recuperacao
+    rng = obter_gerador(params_bombeamento['semente'])
+    
+    # 1. Gerar Teste de Bombeamento
+    with medir('geracao'):
+        df_bombeamento = gerar_teste_bombeamento(params_bombeamento, rng)
+    
+    # 2. Determinar Níveis para o Teste de Recuperação
+    # Nível Inicial da Recuperação = Nível Final do Bombeamento
+    nivel_inicial_rec = params_bombeamento['nivel_final']
+    # Nível Final da Recuperação = Nível Inicial do Bombeamento
+    nivel_final_rec = params_bombeamento['nivel_inicial']
+    
+    # 3. Gerar Teste de Recuperação
+    with medir('geracao'):
+        df_recuperacao = gerar_teste_recuperacao(params_recuperacao, nivel_inicial_rec, nivel_final_rec, rng)
+    
+    return df_bombeamento, df_recuperacao, nivel_inicial_rec, nivel_final_rec
 
 @acesso_requerido(nome_modulo='Menu Principal') # Adicionar um módulo para o menu principal, se necessário
 def menu_principal(request ):
@@ -31,59 +302,58 @@ def teste_bombeamento_process(request):
     """
     View para processar os formulários e gerar o relatório de teste.
     """
+    from .aleatorio import nova_semente
+    from .armazenamento import obter_armazenamento
+    from .renderizacao import CASAS_TESTE, renderizar_tabela
+    from .utils_teste import escrever_teste_xlsx
     if request.method == 'POST':
         # Adicionar prefixos para evitar conflito de nomes de campos
         form_bombeamento = TesteBombeamentoForm(request.POST, prefix='bombeamento')
         form_recuperacao = TesteRecuperacaoForm(request.POST, prefix='recuperacao')
         
-        if form_bombeamento.is_valid() and form_recuperacao.is_valid():
+        with medir('formulario'):
+            formularios_validos = form_bombeamento.is_valid() and form_recuperacao.is_valid()
+        if formularios_validos:
             params_bombeamento = form_bombeamento.cleaned_data
             params_recuperacao = form_recuperacao.cleaned_data
             
-            # 1. Gerar Teste de Bombeamento
-            df_bombeamento = gerar_teste_bombeamento(params_bombeamento)
-            
-            # A coluna 'Data/Hora' já deve estar formatada como string em utils_teste.py.
-            # Se não estiver, a conversão para string será feita implicitamente pelo to_dict('records').
-            # O erro de .dt.strftime() ocorre porque a coluna já é string.
-            # Removendo a conversão explícita aqui.
+            # Registrar a semente junto aos parâmetros para permitir regenerar os testes
+            if params_bombeamento.get('semente') is None:
+                params_bombeamento['semente'] = nova_semente()
             
-            # 2. Determinar Níveis para o Teste de Recuperação
-            # Nível Inicial da Recuperação = Nível Final do Bombeamento
-            nivel_inicial_rec = params_bombeamento['nivel_final']
-            # Nível Final da Recuperação = Nível Inicial do Bombeamento
-            nivel_final_rec = params_bombeamento['nivel_inicial']
+            with registro_geracao('teste_bombeamento', semente=params_bombeamento['semente'], cache=False) as registro:
+                df_bombeamento, df_recuperacao, nivel_inicial_rec, nivel_final_rec = _gerar_testes(params_bombeamento, params_recuperacao)
+                registro['linhas'] = len(df_bombeamento) + len(df_recuperacao)
             
-            # 3. Gerar Teste de Recuperação
-            df_recuperacao = gerar_teste_recuperacao(params_recuperacao, nivel_inicial_rec, nivel_final_rec)
+            # Guardar as tabelas no armazenamento de resultados e, na sessão, apenas a chave
+            # e os parâmetros (com a semente), usados para regenerar os testes se o resultado expirar
+            armazenamento = obter_armazenamento()
+            armazenamento.remover(request.session.get('resultado_teste_id'))
+            request.session['resultado_teste_id'] = armazenamento.salvar(
+                {'bombeamento': df_bombeamento, 'recuperacao': df_recuperacao}
+            )
+            request.session['params_bombeamento'] = _parametros_para_sessao(params_bombeamento)
+            request.session['params_recuperacao'] = _parametros_para_sessao(params_recuperacao)
             
-            # A coluna 'Data/Hora' já deve estar formatada como string em utils_teste.py.
-            # Se não estiver, a conversão para string será feita implicitamente pelo to_dict('records').
-            # O erro de .dt.strftime() ocorre porque a coluna já é string.
-            # Removendo a conversão explícita aqui.
+            # Começar a montar a planilha enquanto o usuário vê os resultados (se habilitado)
+            def exportar(tarefa, destino):
+                tarefa.registrar_progresso(0, len(df_bombeamento) + len(df_recuperacao))
+                escrever_teste_xlsx(df_bombeamento, df_recuperacao, params_bombeamento, params_recuperacao, nivel_inicial_rec, nivel_final_rec, destino, tarefa.registrar_progresso)
             
-            # Armazenar dados na sessão para exportação
-            request.session['teste_bombeamento'] = df_bombeamento.to_dict('records')
-            request.session['teste_recuperacao'] = df_recuperacao.to_dict('records')
-            # Converter objetos date/time nos parâmetros para string antes de salvar na sessão
-            for key, value in params_bombeamento.items():
-                if isinstance(value, (date, time)):
-                    params_bombeamento[key] = str(value)
-            
-            for key, value in params_recuperacao.items():
-                if isinstance(value, (date, time)):
-                    params_recuperacao[key] = str(value)
-            
-            request.session['params_bombeamento'] = params_bombeamento
-            request.session['params_recuperacao'] = params_recuperacao
-            request.session['nivel_inicial_rec'] = nivel_inicial_rec
-            request.session['nivel_final_rec'] = nivel_final_rec
+            _preparar_xlsx(
+                request, 'Teste de Bombeamento', 'xlsx_teste_preparado', request.session['resultado_teste_id'], exportar,
+                'teste_bombeamento_recuperacao.xlsx', reverse('exportar_teste_xlsx'),
+            )
             
             # Preparar contexto para a página de resultados
-            context = {
-                'df_bombeamento_html': df_bombeamento.to_html(classes='table table-striped table-hover text-center', index=False),
-                'df_recuperacao_html': df_recuperacao.to_html(classes='table table-striped table-hover text-center', index=False),
-            }
+            with medir('html'):
+                context = {
+                    'df_bombeamento_html': renderizar_tabela(df_bombeamento.head(LINHAS_PRIMEIRA_PAGINA), CASAS_TESTE, classes='table table-striped table-hover text-center'),
+                    'df_recuperacao_html': renderizar_tabela(df_recuperacao.head(LINHAS_PRIMEIRA_PAGINA), CASAS_TESTE, classes='table table-striped table-hover text-center'),
+                    'linhas_bombeamento': len(df_bombeamento),
+                    'linhas_recuperacao': len(df_recuperacao),
+                    'semente': params_bombeamento['semente'],
+                }
             
             # Redirecionar para a página de resultados
             return render(request, 'pocos_app/teste_bombeamento_resultados.html', context)
@@ -102,45 +372,50 @@ def exportar_teste_xlsx(request):
     """
     View para exportar os testes de Bombeamento e Recuperação para XLSX.
     """
-    if 'teste_bombeamento' not in request.session or 'teste_recuperacao' not in request.session:
+    from .utils_teste import escrever_teste_xlsx
+    if 'params_bombeamento' not in request.session or 'params_recuperacao' not in request.session:
         return redirect('teste_bombeamento')
-        
-    df_bombeamento = pd.DataFrame(request.session.get('teste_bombeamento', []))
-    df_recuperacao = pd.DataFrame(request.session.get('teste_recuperacao', []))
     
-    params_bombeamento = request.session.get('params_bombeamento', {})
-    params_recuperacao = request.session.get('params_recuperacao', {})
-    nivel_inicial_rec = request.session.get('nivel_inicial_rec')
-    nivel_final_rec = request.session.get('nivel_final_rec')
+    # Parâmetros (com a semente) armazenados na sessão
+    params_bombeamento = _parametros_da_sessao(request.session['params_bombeamento'])
+    params_recuperacao = _parametros_da_sessao(request.session['params_recuperacao'])
+    if params_bombeamento.get('semente') is None:
+        return redirect('teste_bombeamento')
+    
+    # Nível Inicial/Final da Recuperação = Nível Final/Inicial do Bombeamento
+    nivel_inicial_rec = params_bombeamento['nivel_final']
+    nivel_final_rec = params_bombeamento['nivel_inicial']
+    
+    resultado_id = request.session.get('resultado_teste_id')
     
-    # Converter strings de data/hora de volta para objetos
-    from datetime import datetime, time, date
+    # Planilha montada de forma especulativa após a geração
+    response = _resposta_xlsx_preparado(
+        request, 'xlsx_teste_preparado', resultado_id,
+        'teste_bombeamento_recuperacao.xlsx', reverse('exportar_teste_xlsx'),
+    )
+    if response is not None:
+        return response
     
-    def convert_to_datetime_object(params):
-        for key in ['data_inicio']:
-            if key in params and isinstance(params[key], str):
-                params[key] = datetime.strptime(params[key], '%Y-%m-%d').date()
-        for key in ['hora_inicial', 'hora_final']:
-            if key in params and isinstance(params[key], str):
-                # Assumindo que o timefield retorna string no formato HH:MM:SS
-                try:
-                    params[key] = datetime.strptime(params[key], '%H:%M:%S').time()
-                except ValueError:
-                    params[key] = datetime.strptime(params[key], '%H:%M').time()
-        return params
-
-    params_bombeamento = convert_to_datetime_object(params_bombeamento)
-    params_recuperacao = convert_to_datetime_object(params_recuperacao)
+    if _exportacao_assincrona(request):
+        from .exportacoes import obter_fila
+        
+        def exportar(tarefa, destino):
+            df_bombeamento, df_recuperacao = _tabelas_teste(resultado_id, params_bombeamento, params_recuperacao)
+            tarefa.registrar_progresso(0, len(df_bombeamento) + len(df_recuperacao))
+            escrever_teste_xlsx(df_bombeamento, df_recuperacao, params_bombeamento, params_recuperacao, nivel_inicial_rec, nivel_final_rec, destino, tarefa.registrar_progresso)
+        
+        return _resposta_tarefa(request, obter_fila().enfileirar(
+            exportar, 'teste_bombeamento_recuperacao.xlsx', TIPO_XLSX, nome_modulo='Teste de Bombeamento',
+        ))
     
-    xlsx_data = gerar_teste_xlsx_file(df_bombeamento, df_recuperacao, params_bombeamento, params_recuperacao, nivel_inicial_rec, nivel_final_rec)
+    # Carregar as tabelas exibidas do armazenamento de resultados; se o resultado
+    # expirou (ou foi gravado em outra instância), regenerá-las a partir da semente
+    df_bombeamento, df_recuperacao = _tabelas_teste(resultado_id, params_bombeamento, params_recuperacao)
     
-    response = HttpResponse(
-        xlsx_data,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return _resposta_arquivo(
+        lambda destino: escrever_teste_xlsx(df_bombeamento, df_recuperacao, params_bombeamento, params_recuperacao, nivel_inicial_rec, nivel_final_rec, destino),
+        'teste_bombeamento_recuperacao.xlsx',
     )
-    response['Content-Disposition'] = 'attachment; filename=teste_bombeamento_recuperacao.xlsx'
-    return response
-    return render(request, 'pocos_app/menu.html')
 
 @acesso_requerido(nome_modulo='Gerar Tabela de Consumo')
 def gerar_tabela_consumo_view(request):
@@ -155,36 +430,80 @@ def gerar_tabela_consumo_process(request):
     """
     View para processar o formulário e gerar a tabela de dados.
     """
+    from .aleatorio import nova_semente
+    from .armazenamento import obter_armazenamento
+    from .formatos import parquet_disponivel
+    from .renderizacao import CASAS_CONSUMO, renderizar_tabela
+    from .utils import escrever_xlsx, gerar_tabela_dados
     if request.method == 'POST':
         form = ParametrosForm(request.POST)
-        if form.is_valid():
-            # Armazenar os dados do formulário na sessão
-            # Certificar que os dados são serializáveis para JSON (necessário para sessão)
-            parametros_cleaned = form.cleaned_data.copy()
+        with medir('formulario'):
+            formulario_valido = form.is_valid()
+        if formulario_valido:
+            # Registrar a semente junto aos parâmetros para permitir regenerar a mesma tabela
+            if form.cleaned_data.get('semente') is None:
+                form.cleaned_data['semente'] = nova_semente()
             
-            # Converter objetos date para strings para serialização JSON
-            if 'data_inicio' in parametros_cleaned and parametros_cleaned['data_inicio']:
-                parametros_cleaned['data_inicio'] = parametros_cleaned['data_inicio'].isoformat()
-            if 'data_fim' in parametros_cleaned and parametros_cleaned['data_fim']:
-                parametros_cleaned['data_fim'] = parametros_cleaned['data_fim'].isoformat()
+            # Armazenar apenas os parâmetros (com a semente) na sessão;
+            # a exportação regenera a mesma tabela a partir deles
+            # Certificar que os dados são serializáveis para JSON (necessário para sessão)
+            parametros_cleaned = _parametros_para_sessao(form.cleaned_data)
             
             request.session['parametros'] = parametros_cleaned
-            print("--- Parâmetros salvos na sessão (gerar_tabela) ---")
-            # Use json.dumps for better readability if needed, but ensure data types are session-compatible
-            # print(json.dumps(parametros_cleaned, indent=2, default=str)) 
-            print(parametros_cleaned)
-            print("--------------------------------------------------")
+            logger.debug('Parâmetros salvos na sessão: %s', parametros_cleaned)
+            
+            # Gerar a tabela de dados (usando os dados originais com objetos date);
+            # os mesmos parâmetros e semente reaproveitam a tabela do cache
+            cache = obter_cache()
+            chave = chave_parametros(form.cleaned_data)
+            chave_cache = ('tabela', chave)
+            with registro_geracao('tabela_consumo', semente=form.cleaned_data['semente']) as registro:
+                df = cache.obter(chave_cache)
+                registro['cache'] = df is not None
+                if df is None:
+                    try:
+                        with medir('geracao'):
+                            df = gerar_tabela_dados(form.cleaned_data)
+                    except ValueError as e:
+                        # Totais que não cabem nos limites diários: volta ao formulário com o erro
+                        logger.warning('Parâmetros inviáveis para a tabela de consumo (semente %s): %s', form.cleaned_data['semente'], e)
+                        registro['erro'] = True
+                        request.session.pop('parametros', None)
+                        form.add_error(None, f'Não foi possível distribuir os totais com os parâmetros informados: {e}')
+                        return render(request, 'pocos_app/index.html', {'form': form})
+                    cache.guardar(chave_cache, df)
+                registro['linhas'] = len(df)
             
-            # Gerar a tabela de dados (usando os dados originais com objetos date)
-            df = gerar_tabela_dados(form.cleaned_data)
+            # Guardar a tabela no armazenamento de resultados; a sessão guarda apenas a chave
+            armazenamento = obter_armazenamento()
+            armazenamento.remover(request.session.get('resultado_id'))
+            request.session['resultado_id'] = armazenamento.salvar({'consumo': df})
             
-            # Armazenar a tabela na sessão (convertendo para dicionário)
-            request.session['tabela'] = df.to_dict('records')
+            # Começar a montar a planilha enquanto o usuário vê a tabela (se habilitado e
+            # se a planilha destes parâmetros ainda não estiver no cache)
+            if not df.empty and cache.obter(('xlsx', chave)) is None:
+                parametros = dict(form.cleaned_data)
+                
+                def exportar(tarefa, destino):
+                    tarefa.registrar_progresso(0, len(df))
+                    escrever_xlsx(df, parametros, destino, tarefa.registrar_progresso)
+                
+                _preparar_xlsx(
+                    request, 'Gerar Tabela de Consumo', 'xlsx_preparado', request.session['resultado_id'], exportar,
+                    'dados_poco.xlsx', reverse('exportar_xlsx'), cache, ('xlsx', chave),
+                )
+            else:
+                request.session.pop('xlsx_preparado', None)
             
             # Renderizar a página de resultados
+            with medir('html'):
+                tabela = renderizar_tabela(df.head(LINHAS_PRIMEIRA_PAGINA), CASAS_CONSUMO, classes='table table-striped')
             return render(request, 'pocos_app/resultados.html', {
-                'tabela': df.to_html(classes='table table-striped', index=False),
-                'form': form
+                'tabela': tabela,
+                'total_linhas': len(df),
+                'form': form,
+                'semente': form.cleaned_data['semente'],
+                'parquet_disponivel': parquet_disponivel(),
             })
     else:
         # Se não for POST, redirecionar para a página inicial
@@ -197,63 +516,238 @@ def gerar_tabela_consumo_process(request):
 def exportar_xlsx(request):
     """
     View para exportar a tabela de Consumo para XLSX.
+    
+    A planilha de exportações anteriores com os mesmos parâmetros e semente é
+    servida do cache. Caso contrário, a tabela é lida do cache ou do armazenamento
+    de resultados (chave na sessão) ou, se não estiver mais disponível, regenerada
+    a partir dos parâmetros e da semente.
     """
-    """
-    View para exportar a tabela para XLSX.
-    """
-    print("--- Tentando exportar XLSX ---")
-    # Verificar se há dados na sessão
-    if 'tabela' not in request.session or 'parametros' not in request.session:
-        print("Erro: 'tabela' ou 'parametros' não encontrados na sessão.")
+    from .utils import escrever_xlsx
+    parametros = _parametros_exportacao(request)
+    if parametros is None:
         return redirect('gerar_tabela_consumo')
     
-    # Recuperar a tabela e os parâmetros da sessão
-    tabela_dict = request.session.get('tabela', [])
-    parametros = request.session.get('parametros', {}).copy()
-    
-    # Converter strings de data de volta para objetos date
-    from datetime import datetime
-    if 'data_inicio' in parametros and isinstance(parametros['data_inicio'], str):
-        parametros['data_inicio'] = datetime.fromisoformat(parametros['data_inicio']).date()
-    if 'data_fim' in parametros and isinstance(parametros['data_fim'], str):
-        parametros['data_fim'] = datetime.fromisoformat(parametros['data_fim']).date()
-    
-    print("--- Parâmetros recuperados da sessão (exportar_xlsx) ---")
-    # print(json.dumps(parametros, indent=2, default=str))
-    print(parametros)
-    print("------------------------------------------------------")
-    print(f"Tipo de 'parametros': {type(parametros)}")
-    print(f"'parametros' é um dicionário? {isinstance(parametros, dict)}")
-
-    if not isinstance(parametros, dict) or not parametros:
-        print("Erro: 'parametros' recuperados da sessão não são um dicionário válido ou estão vazios.")
-        # Talvez redirecionar ou mostrar um erro mais específico
-        return redirect('gerar_tabela_consumo') 
+    cache = obter_cache()
+    chave = chave_parametros(parametros)
+    with registro_geracao('xlsx_consumo', semente=parametros['semente']) as registro:
+        # Planilha já montada para os mesmos parâmetros e semente
+        xlsx_data = cache.obter(('xlsx', chave))
+        registro['cache'] = xlsx_data is not None
+        if xlsx_data is not None:
+            if _exportacao_assincrona(request):
+                # Pronta: a página baixa direto do cache pela URL de exportação
+                return JsonResponse({'estado': 'concluida', 'percentual': 100, 'url_arquivo': reverse('exportar_xlsx')})
+            response = HttpResponse(xlsx_data, content_type=TIPO_XLSX)
+            response['Content-Disposition'] = 'attachment; filename=dados_poco.xlsx'
+            return response
+
+        resultado_id = request.session.get('resultado_id')
         
-    df = pd.DataFrame(tabela_dict)
+        # Planilha montada de forma especulativa após a geração
+        response = _resposta_xlsx_preparado(request, 'xlsx_preparado', resultado_id, 'dados_poco.xlsx', reverse('exportar_xlsx'))
+        if response is not None:
+            registro['preparada'] = True
+            return response
+        
+        if _exportacao_assincrona(request):
+            from .exportacoes import obter_fila
+            registro['assincrona'] = True
+            
+            def exportar(tarefa, destino):
+                df, _ = _tabela_consumo(cache, chave, parametros, resultado_id)
+                if df.empty:
+                    raise ValueError('A tabela regenerada a partir da sessão está vazia.')
+                tarefa.registrar_progresso(0, len(df))
+                escrever_xlsx(df, parametros, destino, tarefa.registrar_progresso)
+            
+            return _resposta_tarefa(request, obter_fila().enfileirar(
+                exportar, 'dados_poco.xlsx', TIPO_XLSX, cache, ('xlsx', chave), nome_modulo='Gerar Tabela de Consumo',
+            ))
+
+        # Usar a tabela do cache ou do armazenamento de resultados; se o resultado
+        # expirou (ou foi gravado em outra instância), regenerá-la a partir da semente
+        try:
+            df, registro['origem_tabela'] = _tabela_consumo(cache, chave, parametros, resultado_id)
+        except ValueError as e:
+            registro['erro'] = True
+            return _formulario_com_erro(request, parametros, e)
+        registro['linhas'] = len(df)
+        
+        if df.empty:
+            logger.warning('Tabela regenerada a partir da sessão está vazia (semente %s).', parametros['semente'])
+            return redirect('gerar_tabela_consumo')
+
+        try:
+            # Exportar para XLSX, passando os parâmetros, e enviar o arquivo em blocos
+            response = _resposta_arquivo(
+                lambda destino: escrever_xlsx(df, parametros, destino),
+                'dados_poco.xlsx', cache, ('xlsx', chave),
+            )
+        except Exception as e:
+            logger.exception('Erro ao gerar o XLSX da tabela de consumo (semente %s).', parametros['semente'])
+            registro['erro'] = True
+            return HttpResponse(f"Erro ao gerar o arquivo Excel: {e}", status=500)
+
+    return response
+
+@acesso_requerido(nome_modulo='Gerar Tabela de Consumo')
+def exportar_dados(request, formato):
+    """
+    View para exportar a tabela de Consumo em CSV (streaming), Parquet ou Arrow,
+    formatos mais rápidos de gerar e de carregar em outras ferramentas que o XLSX.
     
-    if df.empty:
-        print("Erro: DataFrame criado a partir da sessão está vazio.")
+    A tabela é a mesma da página e da planilha: lida do cache ou do armazenamento
+    de resultados ou, se não estiver mais disponível, regenerada a partir da semente.
+    """
+    from .formatos import escrever_arrow, escrever_parquet, gerar_csv, parquet_disponivel
+    if formato not in FORMATOS_DADOS:
+        raise Http404('Formato de exportação desconhecido.')
+    if formato != 'csv' and not parquet_disponivel():
+        return HttpResponse('A exportação em Parquet/Arrow requer o pacote pyarrow, que não está instalado.', status=501)
+    parametros = _parametros_exportacao(request)
+    if parametros is None:
         return redirect('gerar_tabela_consumo')
+    
+    nome_arquivo, tipo_conteudo = FORMATOS_DADOS[formato]
+    cache = obter_cache()
+    chave = chave_parametros(parametros)
+    with ExitStack() as pilha:
+        registro = pilha.enter_context(registro_geracao(f'{formato}_consumo', semente=parametros['semente']))
+        try:
+            df, registro['origem_tabela'] = _tabela_consumo(cache, chave, parametros, request.session.get('resultado_id'))
+        except ValueError as e:
+            registro['erro'] = True
+            return _formulario_com_erro(request, parametros, e)
+        registro['linhas'] = len(df)
+        if df.empty:
+            logger.warning('Tabela regenerada a partir da sessão está vazia (semente %s).', parametros['semente'])
+            return redirect('gerar_tabela_consumo')
+        
+        if formato == 'csv':
+            # Enviado à medida que cada bloco de linhas é formatado; o registro da geração
+            # passa para o envio e só é gravado ao final, incluindo a formatação
+            response = StreamingHttpResponse(_enviar_e_registrar(gerar_csv(df), pilha.pop_all()), content_type=tipo_conteudo)
+            response['Content-Disposition'] = f'attachment; filename={nome_arquivo}'
+            return response
+        
+        escrever = escrever_parquet if formato == 'parquet' else escrever_arrow
+        return _resposta_arquivo(
+            lambda destino: escrever(df, destino), nome_arquivo,
+            tipo_conteudo=tipo_conteudo, medicao=formato,
+        )
+
+def _enviar_e_registrar(blocos, pilha):
+    """
+    Envia os blocos de uma resposta em streaming e fecha a pilha (ex: o registro da geração)
+    quando o envio termina ou é interrompido.
+    """
+    with pilha:
+        yield from blocos
 
+def _resposta_pagina(request, colunas):
+    """
+    Responde com uma página (JSON) das colunas de um resultado armazenado.
+    
+    Parâmetros da query string: offset, limit, colunas (pode repetir) e mes (AAAA-MM).
+    """
+    from .paginacao import ParametrosPaginaInvalidos, pagina_de_colunas
+    if colunas is None:
+        return JsonResponse({'erro': 'Resultado não encontrado. Gere a tabela novamente.'}, status=404)
     try:
-        print("Chamando exportar_para_xlsx(df, parametros)...")
-        # Exportar para XLSX, passando os parâmetros
-        xlsx_data = exportar_para_xlsx(df, parametros)
-        print("exportar_para_xlsx executado com sucesso.")
-    except Exception as e:
-        print(f"Erro ao chamar exportar_para_xlsx: {e}")
-        import traceback
-        traceback.print_exc() # Imprime o traceback completo no console do servidor
-        # Retornar uma resposta de erro para o usuário seria ideal aqui
-        return HttpResponse(f"Erro ao gerar o arquivo Excel: {e}", status=500)
+        pagina = pagina_de_colunas(
+            colunas,
+            offset=request.GET.get('offset'),
+            limit=request.GET.get('limit'),
+            nomes=request.GET.getlist('colunas'),
+            mes=request.GET.get('mes'),
+        )
+    except ParametrosPaginaInvalidos as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+    return JsonResponse(pagina)
 
+@acesso_requerido(nome_modulo='Gerar Tabela de Consumo')
+def dados_consumo(request):
+    """
+    API de dados: faixa de linhas da tabela de Consumo da sessão.
     
-    # Criar a resposta HTTP com o arquivo XLSX
-    response = HttpResponse(
-        xlsx_data,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=dados_poco.xlsx'
-    print("Enviando resposta com o arquivo XLSX.")
-    return response
+    Se o resultado expirou (ou foi gravado em outra instância), a tabela é
+    regenerada a partir dos parâmetros e da semente e armazenada novamente.
+    """
+    from .armazenamento import obter_armazenamento
+    armazenamento = obter_armazenamento()
+    colunas = armazenamento.colunas(request.session.get('resultado_id'), 'consumo')
+    if colunas is None and 'parametros' in request.session:
+        parametros = _parametros_da_sessao(request.session['parametros'])
+        if parametros.get('semente') is not None:
+            try:
+                df, _ = _tabela_consumo(obter_cache(), chave_parametros(parametros), parametros, None)
+            except ValueError as e:
+                return JsonResponse({'erro': f'Não foi possível regenerar a tabela: {e}'}, status=400)
+            request.session['resultado_id'] = armazenamento.salvar({'consumo': df})
+            colunas = armazenamento.colunas(request.session['resultado_id'], 'consumo')
+    return _resposta_pagina(request, colunas)
+
+@acesso_requerido(nome_modulo='Teste de Bombeamento')
+def dados_teste(request, tabela):
+    """
+    API de dados: faixa de linhas do teste de bombeamento ou de recuperação da sessão.
+    
+    Se o resultado expirou, os testes são regenerados a partir dos parâmetros e da semente.
+    """
+    from .armazenamento import obter_armazenamento
+    if tabela not in ('bombeamento', 'recuperacao'):
+        raise Http404('Tabela inexistente.')
+    armazenamento = obter_armazenamento()
+    colunas = armazenamento.colunas(request.session.get('resultado_teste_id'), tabela)
+    if colunas is None and 'params_bombeamento' in request.session and 'params_recuperacao' in request.session:
+        params_bombeamento = _parametros_da_sessao(request.session['params_bombeamento'])
+        params_recuperacao = _parametros_da_sessao(request.session['params_recuperacao'])
+        if params_bombeamento.get('semente') is not None:
+            df_bombeamento, df_recuperacao, _, _ = _gerar_testes(params_bombeamento, params_recuperacao)
+            request.session['resultado_teste_id'] = armazenamento.salvar(
+                {'bombeamento': df_bombeamento, 'recuperacao': df_recuperacao}
+            )
+            colunas = armazenamento.colunas(request.session['resultado_teste_id'], tabela)
+    return _resposta_pagina(request, colunas)
+
+def _acesso_a_exportacao(view_func):
+    """
+    Decorator das views de exportações em segundo plano: aplica acesso_requerido com o
+    módulo da view que iniciou a exportação, de modo que um usuário que perdeu o acesso
+    ao módulo não acompanha nem baixa exportações iniciadas antes.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, tarefa_id):
+        tarefa = _tarefa_da_sessao(request, tarefa_id)
+        if tarefa is None:
+            # A própria view responde que a exportação não foi encontrada
+            return view_func(request, tarefa_id)
+        return acesso_requerido(nome_modulo=tarefa.nome_modulo)(view_func)(request, tarefa_id)
+    return _wrapped_view
+
+@_acesso_a_exportacao
+def status_exportacao(request, tarefa_id):
+    """
+    Estado de uma exportação em segundo plano (JSON), com a URL do arquivo quando concluída.
+    """
+    tarefa = _tarefa_da_sessao(request, tarefa_id)
+    if tarefa is None:
+        return JsonResponse({'erro': 'Exportação não encontrada.'}, status=404)
+    estado = tarefa.como_dicionario()
+    if estado['estado'] == 'concluida':
+        estado['url_arquivo'] = tarefa.url_arquivo or reverse('baixar_exportacao', args=[tarefa.id])
+    return JsonResponse(estado)
+
+@_acesso_a_exportacao
+def baixar_exportacao(request, tarefa_id):
+    """
+    Envia o arquivo de uma exportação em segundo plano concluída.
+    """
+    from .armazenamento import obter_armazenamento
+    tarefa = _tarefa_da_sessao(request, tarefa_id)
+    if tarefa is None or tarefa.chave_arquivo is None:
+        raise Http404('Exportação não encontrada.')
+    caminho = obter_armazenamento().caminho_arquivo(tarefa.chave_arquivo)
+    if caminho is None:
+        raise Http404('O arquivo da exportação expirou.')
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=tarefa.nome_arquivo, content_type=tarefa.tipo_conteudo)
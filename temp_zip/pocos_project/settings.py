@@ -50,6 +50,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Tempo por etapa no cabeçalho Server-Timing e no log (antes dos demais, para medi-los)
+    'pocos_app.medicao.MedicaoTempoMiddleware',
+    # Compressão (brotli/gzip) das respostas textuais dinâmicas; o Whitenoise cuida dos estáticos
+    'pocos_app.compressao.CompressaoMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +100,19 @@ DATABASES = {'default': {
     }
 }
 
+# Réplica local (SQLite) das tabelas de controle de acesso (opcional)
+# Com ACESSO_REPLICA=True as leituras do app acesso usam uma cópia local, sincronizada
+# no primeiro uso e a cada ACESSO_REPLICA_INTERVALO segundos (ver acesso/replica.py)
+ACESSO_REPLICA = os.environ.get('ACESSO_REPLICA', 'False') == 'True'
+ACESSO_REPLICA_INTERVALO = 300 # segundos
+if ACESSO_REPLICA:
+    import tempfile
+    DATABASES['acesso_replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('ACESSO_REPLICA_ARQUIVO', os.path.join(tempfile.gettempdir(), 'acesso_replica.sqlite3')),
+    }
+    DATABASE_ROUTERS = ['acesso.replica.RoteadorReplicaAcesso']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,3 +159,38 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configuração do Whitenoise
 if not DEBUG:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Sessão serializada em JSON (serializador padrão, com a etapa 'sessao' no Server-Timing)
+SESSION_SERIALIZER = 'pocos_app.medicao.SerializadorSessaoJSON'
+
+# Cache das permissões de acesso (snapshot por usuário, invalidado por sinais)
+ACESSO_CACHE_TTL = 300 # segundos
+
+# Logging: eventos estruturados do pocos_app (ver pocos_app/registro.py) no console,
+# que é o que a Vercel coleta. POCOS_LOG_LEVEL=DEBUG mostra também os parâmetros das views.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simples': {'format': '%(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simples'},
+    },
+    'loggers': {
+        'pocos_app': {
+            'handlers': ['console'],
+            'level': os.environ.get('POCOS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Fração dos eventos registrada, por evento (padrão: 1). Avisos e erros nunca são amostrados.
+POCOS_LOG_AMOSTRAGEM = {
+    'requisicao': float(os.environ.get('POCOS_LOG_AMOSTRAGEM_REQUISICAO', '1')),
+}
+
+# Montagem especulativa da planilha XLSX logo após a geração das tabelas, para que
+# o clique em "Exportar" encontre o arquivo pronto (ver pocos_app/exportacoes.py)
+POCOS_PREPARAR_XLSX = os.environ.get('POCOS_PREPARAR_XLSX', 'False') == 'True'
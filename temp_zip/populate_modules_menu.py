@@ -5,7 +5,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pocos_project.settings')
 django.setup()
 
-from acesso.models import Modulo
+from acesso.gestao import cadastrar_modulos
 
 modulos_existentes = [
     {'nome': 'Gerar Tabela de Consumo', 'descricao': 'Funcionalidade para gerar e exportar a tabela de consumo.'},
@@ -15,15 +15,13 @@ modulos_existentes = [
 
 def populate_modules():
     print("Iniciando a população de módulos...")
+    # Upsert de todo o catálogo de uma vez (a descrição dos módulos existentes é atualizada)
+    criados = cadastrar_modulos(modulos_existentes)
     for modulo_data in modulos_existentes:
-        modulo, created = Modulo.objects.get_or_create(
-            nome=modulo_data['nome'],
-            defaults={'descricao': modulo_data['descricao']}
-        )
-        if created:
-            print(f"Módulo criado: {modulo.nome}")
+        if modulo_data['nome'] in criados:
+            print(f"Módulo criado: {modulo_data['nome']}")
         else:
-            print(f"Módulo já existe: {modulo.nome}")
+            print(f"Módulo já existe: {modulo_data['nome']}")
     print("População de módulos concluída.")
 
 if __name__ == '__main__':
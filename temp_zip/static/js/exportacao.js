@@ -0,0 +1,83 @@
+// Exportações em segundo plano.
+//
+// Os links com data-exportacao pedem a planilha com ?assincrono=1: o servidor
+// enfileira a montagem e responde na hora com a URL de consulta, que é lida
+// a cada segundo para mostrar o andamento no próprio botão. Quando o arquivo
+// fica pronto, o download começa. Se algo falhar (ex: a tarefa não é
+// encontrada), o link é seguido normalmente e a exportação é síncrona.
+(function () {
+    'use strict';
+
+    var INTERVALO_CONSULTA_MS = 1000;
+
+    function pedirJson(url) {
+        return fetch(url, {
+            credentials: 'same-origin',
+            headers: {'Accept': 'application/json'}
+        }).then(function (resposta) {
+            var tipo = resposta.headers.get('Content-Type') || '';
+            if (!resposta.ok || tipo.indexOf('application/json') === -1) {
+                throw new Error(resposta.status);
+            }
+            return resposta.json();
+        });
+    }
+
+    function iniciar(link) {
+        var conteudoOriginal = link.innerHTML;
+        var ocupado = false;
+        var urlStatus = null;
+
+        function restaurar() {
+            ocupado = false;
+            link.innerHTML = conteudoOriginal;
+            link.classList.remove('disabled');
+        }
+
+        function mostrar(texto) {
+            link.textContent = texto;
+        }
+
+        function baixar(url) {
+            restaurar();
+            window.location.href = url;
+        }
+
+        function exportarSincrono() {
+            baixar(link.href);
+        }
+
+        function acompanhar(estado) {
+            if (estado.estado === 'concluida') {
+                baixar(estado.url_arquivo);
+            } else if (estado.estado === 'descartada') {
+                exportarSincrono();
+            } else if (estado.estado === 'erro') {
+                restaurar();
+                window.alert('Erro ao gerar a planilha: ' + (estado.erro || 'erro desconhecido'));
+            } else {
+                mostrar(estado.percentual === null || estado.percentual === undefined
+                    ? 'Gerando planilha...'
+                    : 'Gerando planilha... ' + estado.percentual + '%');
+                urlStatus = estado.url_status || urlStatus;
+                window.setTimeout(function () {
+                    pedirJson(urlStatus).then(acompanhar).catch(exportarSincrono);
+                }, INTERVALO_CONSULTA_MS);
+            }
+        }
+
+        link.addEventListener('click', function (evento) {
+            evento.preventDefault();
+            if (ocupado) {
+                return;
+            }
+            ocupado = true;
+            link.classList.add('disabled');
+            mostrar('Gerando planilha...');
+            var separador = link.href.indexOf('?') === -1 ? '?' : '&';
+            pedirJson(link.href + separador + 'assincrono=1').then(acompanhar).catch(exportarSincrono);
+        });
+    }
+
+    document.querySelectorAll('a[data-exportacao]').forEach(iniciar);
+})();
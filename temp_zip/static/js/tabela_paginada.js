@@ -0,0 +1,104 @@
+// Tabelas paginadas das páginas de resultados.
+//
+// O servidor renderiza apenas a primeira página de cada tabela; as linhas
+// seguintes são buscadas na API de dados (data-url) em blocos, conforme o
+// usuário se aproxima do fim da tabela. data-total informa o número de linhas.
+(function () {
+    'use strict';
+
+    var LINHAS_POR_BLOCO = 200;
+
+    // Casas decimais de cada coluna, informadas pelo servidor no cabeçalho (data-casas)
+    // para que as linhas carregadas depois tenham a mesma formatação da primeira página
+    function casasDecimais(container) {
+        return Array.prototype.map.call(container.querySelectorAll('thead th'), function (coluna) {
+            return coluna.dataset.casas === undefined ? null : parseInt(coluna.dataset.casas, 10);
+        });
+    }
+
+    function formatar(valor, casas) {
+        if (valor === null) {
+            return '';
+        }
+        if (typeof valor === 'number' && casas !== null) {
+            // Meio para longe do zero sobre o valor decimal, como no servidor (renderizacao.py)
+            var escala = Math.pow(10, casas);
+            var arredondado = Math.floor(Math.abs(valor) * escala * (1 + 4 * Number.EPSILON) + 0.5) / escala;
+            return (valor < 0 && arredondado !== 0 ? -arredondado : arredondado).toFixed(casas);
+        }
+        return String(valor);
+    }
+
+    function iniciar(container) {
+        var corpo = container.querySelector('tbody');
+        if (!corpo) {
+            return;
+        }
+        var url = container.dataset.url;
+        var total = parseInt(container.dataset.total, 10) || 0;
+        var carregadas = corpo.rows.length;
+        var casas = casasDecimais(container);
+        var carregando = false;
+        var visivel = false;
+
+        var status = document.createElement('p');
+        status.className = 'text-muted text-center small mt-2';
+        container.after(status);
+
+        function atualizarStatus(mensagem) {
+            status.textContent = mensagem || (carregadas < total
+                ? 'Exibindo ' + carregadas + ' de ' + total + ' linhas. Role para carregar mais.'
+                : 'Exibindo todas as ' + total + ' linhas.');
+        }
+
+        function carregar() {
+            if (carregando || carregadas >= total) {
+                return;
+            }
+            carregando = true;
+            atualizarStatus('Carregando linhas...');
+            fetch(url + '?offset=' + carregadas + '&limit=' + LINHAS_POR_BLOCO, {
+                credentials: 'same-origin',
+                headers: {'Accept': 'application/json'}
+            }).then(function (resposta) {
+                if (!resposta.ok) {
+                    throw new Error(resposta.status);
+                }
+                return resposta.json();
+            }).then(function (pagina) {
+                var fragmento = document.createDocumentFragment();
+                pagina.linhas.forEach(function (valores) {
+                    var linha = document.createElement('tr');
+                    valores.forEach(function (valor, indice) {
+                        var celula = document.createElement('td');
+                        celula.textContent = formatar(valor, casas[indice]);
+                        linha.appendChild(celula);
+                    });
+                    fragmento.appendChild(linha);
+                });
+                corpo.appendChild(fragmento);
+                carregadas += pagina.linhas.length;
+                total = pagina.linhas.length ? pagina.total : carregadas;
+                carregando = false;
+                atualizarStatus();
+                // O fim da tabela pode continuar visível após o bloco (telas altas)
+                if (visivel) {
+                    carregar();
+                }
+            }).catch(function () {
+                carregando = false;
+                atualizarStatus('Não foi possível carregar mais linhas. Role novamente para tentar de novo.');
+            });
+        }
+
+        atualizarStatus();
+        new IntersectionObserver(function (entradas) {
+            visivel = entradas.some(function (entrada) { return entrada.isIntersecting; });
+            if (visivel) {
+                carregar();
+            }
+        }, {rootMargin: '600px 0px'}).observe(status);
+    }
+
+    document.querySelectorAll('.tabela-paginada').forEach(iniciar);
+})();